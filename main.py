@@ -5,7 +5,7 @@ import logging
 from os import path
 from string import Template
 
-from pad.converter import app, writer
+from pad.converter import app, entidade, writer
 
 # Configurações
 
@@ -19,6 +19,46 @@ output_base_dir = Template(r'C:\Users\Everton\OneDrive - independencia.rs.gov.br
 # Destino dos arquivos para funcionar como um atalho para o mês corrente
 # current_base_dir = r'C:\Users\Everton\Desktop\Prefeitura\PAD\v2\current'
 current_base_dir = r'C:\Users\Everton\OneDrive - independencia.rs.gov.br\Prefeitura\PAD\current'
+# Motor de leitura dos txt: 'pandas' (pd.read_fwf) ou 'numpy' (leitor de registros de tamanho fixo, bem mais rápido)
+engine = 'pandas'
+# Linhas por bloco para processar os txt em modo streaming (memória limitada pelo bloco). None lê cada arquivo inteiro.
+chunk_size = None
+# Mantém os valores em centavos (int64) do txt até os writers, que convertem para reais. Deixa as somas exatas.
+cents = False
+# Mantém as tabelas em tipos compactos (inteiros anuláveis estreitos e categorias) até os writers. Ocupa bem menos memória.
+compact = False
+# Quantidade de processos para executar os parsers em paralelo (por exemplo, os.cpu_count()). None executa um de cada vez.
+workers = None
+# Quantidade de processos para cada parser ler em paralelo faixas de um mesmo txt grande. None lê cada arquivo de uma vez.
+file_workers = None
+# Salva cada tabela também no cache em disco, como ponto de controle. False mantém as tabelas somente na memória.
+checkpoint = True
+# Reaproveita do cache as tabelas cujos txt não mudaram desde a última execução, em vez de convertê-las de novo. Com
+# False, o cache é apagado no início de cada execução, o que também invalida tudo o que o modo incremental guardou.
+incremental = False
+# Formato do cache em disco: 'pickle' ou 'arrow' (Arrow IPC lido por mapeamento de memória). No 'arrow', somente as
+# colunas numéricas sem valores ausentes são lidas sem cópia; os textos e as colunas com ausentes são copiados na leitura.
+cache_format = 'pickle'
+# Quantidade de escritas (tabela e formato) simultâneas. O xlsx roda em processos à parte. None escreve uma de cada vez.
+writer_workers = None
+# Limite de escritas simultâneas por formato, por exemplo {'xlsx': 2} (cada processo do xlsx ocupa um núcleo).
+writer_limits = None
+# Escreve os xlsx em modo streaming (write-only), em lotes, com a memória limitada mesmo nas tabelas grandes.
+xlsx_streaming = False
+# Opções do parquet: compression, compression_level, row_group_size, dictionary, sort_by e partition_cols. Por exemplo,
+# {'compression': 'zstd', 'sort_by': writer.CHAVES_NATURAIS, 'partition_cols': ('entidade', 'orgao')}.
+parquet_options = {}
+# Diretório do dataset parquet com o histórico de todos os meses (TABELA/ano=AAAA/mes=M/...), do qual cada execução
+# substitui somente a partição do seu mês. Leia com writer.open_dataset. None não grava o dataset.
+parquet_dataset_dir = None
+# Códigos usados para identificar a entidade (pm, cm ou fpsm) de cada linha. Adapte para a sua realidade.
+entidades = {
+    'cnpj_camara': '12292535000162',  # CNPJ da câmara
+    'fontes_rpps': (800, 801, 802, 803),  # Fontes de recurso do RPPS
+    'orgao_camara': 1,  # Órgão da câmara
+    'orgao_rpps': 12,  # Órgão do RPPS
+    'entidade_empenho_rpps': 1,  # Código do campo entidade_empenho para os empenhos do RPPS
+}
 
 
 def main():
@@ -53,14 +93,22 @@ def main():
     # wccsv = writer.CsvWriter(logger, path.join(current_base_dir, 'csv'))  # CSV writer
     # wpickle = writer.PickleWriter(logger, path.join(output_dir, 'pickle'))  # Pickle writer
     # wcpickle = writer.PickleWriter(logger, path.join(current_base_dir, 'pickle'))  # Pickle writer
-    wparquet = writer.ParquetWriter(logger, path.join(output_dir, 'parquet'))  # Parquet writer
+    wparquet = writer.ParquetWriter(logger, path.join(output_dir, 'parquet'), **parquet_options)  # Parquet writer
     # wcparquet = writer.ParquetWriter(logger, path.join(current_base_dir, 'parquet'))  # Parquet writer
-    wxlsx = writer.XlsxWriter(logger, path.join(output_dir, 'excel'))  # Xlsx writer
+    wxlsx = writer.XlsxWriter(logger, path.join(output_dir, 'excel'), streaming=xlsx_streaming)  # Xlsx writer
     # wcxlsx = writer.XlsxWriter(logger, path.join(current_base_dir, 'excel'))  # Xlsx writer
+    writers = [wparquet, wxlsx]
+    if parquet_dataset_dir is not None:
+        # Parquet writer do histórico, com a partição do mês
+        writers.append(writer.ParquetWriter(logger, parquet_dataset_dir, ano=ano, mes=int(mes), **parquet_options))
 
     # Executa o módulo principal do programa
     # running = app.App(logger, [pm_input_dir, cm_input_dir], [wparquet, wcparquet, wxlsx, wcxlsx], mes, ano)
-    running = app.App(logger, [pm_input_dir, cm_input_dir], [wparquet, wxlsx], mes, ano)
+    running = app.App(logger, [pm_input_dir, cm_input_dir], writers, mes, ano, engine=engine,
+                      chunk_size=chunk_size, entidades=entidade.EntityClassifier(**entidades), cents=cents, compact=compact,
+                      workers=workers, file_workers=file_workers, checkpoint=checkpoint,
+                      incremental=incremental, cache_format=cache_format, writer_workers=writer_workers,
+                      writer_limits=writer_limits)
     running.run()
 
 
@@ -1,14 +1,94 @@
 """Módulo principal do conversor.
 """
 
+import copy
 import os.path
+import sys
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import ExitStack
 from datetime import datetime
+import numpy as np
 import pandas as pd
 from pad.converter.parser import empenho, liquidac, pagament, balrec, receita, baldesp, diario, balver, bverenc, \
     rdextra, decreto, brecant, recant, brubant, bver_ant, bvmovant, orgao, uniorcam, programa, projativ, rubrica, recurso, \
     credor, ctadisp, ctaoper
+from pad.converter.entidade import EntityClassifier, REGRAS_ORGAO
+from pad.converter import empenhos
+from pad.converter.empenhos import EmpenhoDimension, EmpenhoIndex, TABELAS
+from pad.converter.parser import LogBuffer
+from pad.converter.parser import decoder, fwf
+from pad.converter.parser.decoder import CENTAVOS, arredonda, valor_zero
+from pad.converter.scheduler import StageLogger, StageScheduler
+from pad.converter.store import FORMATOS, TableStore, digest, file_digest, source_digest
 
 
+def run_parser(parser_class, sources, options):
+    """Executa um parser em um processo do pool de App._parse.
+
+    Com checkpoint, o pandas.DataFrame convertido não é devolvido: ele já fica no cache em disco, de onde é lido pelo
+    App somente se alguma etapa precisar dele.
+
+    :param parser_class Classe herdeira de pad.converter.parser.ParserBase.
+    :param sources Lista de diretórios de origem dos dados.
+    :param options Opções para ParserBase.configure().
+
+    :return Tupla (mensagens de log, exceção levantada pelo parser ou None, pandas.DataFrame ou None).
+    """
+    logger = LogBuffer()
+    parser = parser_class(logger, sources).configure(**options)
+    try:
+        df = parser.parse()
+    except Exception as e:
+        return logger.records, e, None
+    return logger.records, None, None if parser._checkpoint else df
+
+
+def run_writer(writer, name, df=None, file=None, parts=None, cache_format='pickle'):
+    """Executa um writer em um processo do pool de writers de App._write_with.
+
+    A tabela vem de uma das fontes: o próprio pandas.DataFrame, o arquivo da tabela inteira no cache em disco ou as
+    partes de uma tabela salva em blocos. Ler do cache evita copiar a tabela entre os processos.
+
+    :param writer Cópia do writer, sem o logger.
+    :param name Nome do arquivo/tabela para salvar os dados.
+    :param df pandas.DataFrame ou None.
+    :param file Caminho do arquivo da tabela no cache ou None.
+    :param parts Lista com os caminhos das partes da tabela no cache ou None.
+    :param cache_format Formato dos arquivos do cache, um de pad.converter.store.FORMATOS.
+
+    :return Tupla (mensagens de log, exceção levantada pelo writer ou None).
+    """
+    logger = LogBuffer()
+    writer._logger = logger
+    read = FORMATOS[cache_format].read
+    try:
+        if parts is not None:
+            write_parts(writer, name, parts, read)
+        else:
+            writer.write(df if df is not None else read(file), name)
+    except Exception as e:
+        return logger.records, e
+    return logger.records, None
+
+
+def write_parts(writer, name, parts, read):
+    """Executa um writer para uma tabela salva em blocos no cache.
+
+    Os blocos são lidos um a um se o writer possui o método write_chunks. Se não, são juntados em um único
+    pandas.DataFrame.
+
+    :param writer Objeto writer.
+    :param name Nome do arquivo/tabela para salvar os dados.
+    :param parts Lista com os caminhos das partes da tabela no cache.
+    :param read Função que lê um arquivo do cache.
+    """
+    chunks = (read(p) for p in parts)
+    if hasattr(writer, 'write_chunks'):
+        writer.write_chunks(chunks, name)
+    else:
+        writer.write(decoder.concat_chunks(chunks), name)
+
 
 class App:
     """Classe principal do programa.
@@ -19,8 +99,33 @@ class App:
     _month = 0 # Mês em processamento
     _year = 0 # Ano em processamento
     _cache = 'cache' # Diretório de cache para o processamento
-
-    def __init__(self, logger, sources: list, writers: list, month: int, year: int):
+    _engine = None # Motor de leitura dos txt para todos os parsers. Se None, cada parser usa o seu.
+    _chunk_size = None # Linhas por bloco no modo streaming dos parsers. Se None, os arquivos são lidos inteiros.
+    _entidades = None # Classificador que identifica a entidade de cada linha, usado pelos parsers e pelas tabelas derivadas.
+    _cents = False # Se os valores de EMPENHO, LIQUIDAC, PAGAMENT, BAL_VER, BAL_DESP e RECEITA (e das tabelas derivadas) ficam em centavos (int64) até os writers.
+    _compact = False # Se as tabelas ficam em tipos compactos (inteiros anuláveis estreitos e categorias) até os writers.
+    _workers = None # Quantidade de processos para executar os parsers em paralelo. Se None, executa um parser de cada vez.
+    _pool = None # concurrent.futures.ProcessPoolExecutor dos parsers durante o run, se houver workers
+    _store = None # pad.converter.store.TableStore com as tabelas da execução
+    _checkpoint = True # Se as tabelas também são salvas no cache em disco. As processadas em blocos sempre são.
+    _cache_format = 'pickle' # Formato dos arquivos do cache em disco, um de pad.converter.store.FORMATOS
+    _index = None # pad.converter.empenhos.EmpenhoIndex das tabelas de empenho já concatenadas, montado no primeiro uso
+    _dimension = None # pad.converter.empenhos.EmpenhoDimension de EMPENHO, montada no primeiro uso
+    _index_lock = None # threading.Lock que garante que o índice e a dimensão sejam montados uma única vez
+    _empenho_readers = 0 # Quantidade de etapas que ainda vão usar o índice e a dimensão, liberados depois da última
+    _datas = None # pad.converter.parser.decoder.DateDecoder da execução, repassado aos parsers
+    _contas = None # pad.converter.parser.decoder.CodeDictionary da execução (ou o seu proxy, com workers), repassado aos parsers
+    _incremental = False # Se as tabelas que não mudaram desde a última execução são reaproveitadas do cache em disco.
+    _file_workers = None # Quantidade de processos para cada parser ler em paralelo faixas de um mesmo arquivo. Se None, lê o arquivo de uma vez.
+    _writer_workers = None # Quantidade de escritas simultâneas (tabela e writer). Se None, os writers de cada tabela rodam um após o outro.
+    _writer_limits = {} # Quantidade máxima de escritas simultâneas de cada formato (_format do writer)
+    _writer_pool = None # concurrent.futures.ProcessPoolExecutor dos writers com _processes durante o run, se houver writer_workers
+
+    def __init__(self, logger, sources: list, writers: list, month: int, year: int, engine: str = None,
+                 chunk_size: int = None, entidades: EntityClassifier = None, cents: bool = False,
+                 compact: bool = False, workers: int = None,
+                 file_workers: int = None, checkpoint: bool = True, incremental: bool = False,
+                 cache_format: str = 'pickle', writer_workers: int = None, writer_limits: dict = None):
         """Construtor da classe principal.
 
         :param logger Objeto logger.
@@ -28,22 +133,89 @@ class App:
         :param writers Lista com instâncias dos writers
         :param month Mês que será processado
         :param year Ano que será processado
+        :param engine Motor de leitura dos txt ('pandas' ou 'numpy'). Se None, cada parser usa o seu.
+        :param chunk_size Quantidade de linhas por bloco para ler os txt em modo streaming. Se None, lê cada arquivo inteiro.
+        :param entidades Classificador de entidades com os códigos (CNPJ, fontes, órgãos) da sua realidade. Se None, usa os padrão.
+        :param cents Se True, os valores são mantidos em centavos (int64) e somente os writers os convertem para reais.
+        :param compact Se True, as colunas são mantidas nos menores tipos que comportam a largura dos campos (inteiros anuláveis e categorias) e somente os writers as convertem para os tipos padrão.
+        :param workers Quantidade de processos para executar os parsers em paralelo. Se None, executa um parser de cada vez.
+        :param file_workers Quantidade de processos para cada parser ler em paralelo faixas de um mesmo arquivo grande. Se None, lê o arquivo de uma vez.
+        :param checkpoint Se True, as tabelas também são salvas no cache em disco, como ponto de controle. Se False, ficam somente na memória, exceto as processadas em blocos.
+        :param incremental Se True, reaproveita do cache em disco as tabelas cujos txt, código e opções não mudaram desde a última execução. Exige checkpoint.
+        :param cache_format Formato dos arquivos do cache em disco: 'pickle' ou 'arrow' (Arrow IPC, lido por mapeamento de memória).
+        :param writer_workers Quantidade de escritas (tabela e writer) executadas ao mesmo tempo, em threads, ou em um pool de processos para os writers com _processes (como o xlsx). Se None, os writers de cada tabela rodam um após o outro.
+        :param writer_limits Dicionário {formato: quantidade máxima de escritas simultâneas} para limitar formatos específicos, como {'xlsx': 2}. Os demais usam writer_workers.
         """
         self._logger = logger
         self._sources = sources
         self._writers = writers
         self._month = month
         self._year = year
+        self._engine = engine
+        self._chunk_size = chunk_size
+        self._entidades = entidades if entidades is not None else EntityClassifier()
+        self._cents = cents
+        self._compact = compact
+        if workers is not None and (not isinstance(workers, int) or workers < 1):
+            raise ValueError(f'A quantidade de processos deve ser um inteiro positivo, mas foi informado {workers}.')
+        self._workers = workers
+        self._file_workers = file_workers
+        self._checkpoint = checkpoint
+        if incremental and not checkpoint:
+            raise ValueError('O modo incremental reaproveita o cache em disco e exige checkpoint.')
+        self._incremental = incremental
+        if cache_format not in FORMATOS:
+            raise ValueError(f'Formato de cache {cache_format} desconhecido. Use um de {tuple(FORMATOS)}.')
+        self._cache_format = cache_format
+        for n in [writer_workers, *(writer_limits or {}).values()]:
+            if n is not None and (not isinstance(n, int) or n < 1):
+                raise ValueError(f'A quantidade de escritas simultâneas deve ser um inteiro positivo, mas foi informado {n}.')
+        self._writer_workers = writer_workers
+        self._writer_limits = dict(writer_limits or {})
 
 
     def run(self):
         """Executa a rotina principal da conversão.
+
+        A conversão, as rotinas de finalização e os writers são etapas de um pad.converter.scheduler.StageScheduler:
+        cada uma começa assim que as tabelas de que ela depende ficam prontas. Com workers, os parsers rodam em um pool
+        de processos e as demais etapas em threads, de modo que as tabelas derivadas e a escrita das tabelas prontas
+        andam junto com a conversão das outras. Com writer_workers, cada writer de cada tabela é uma etapa e os writers
+        com _processes rodam em um segundo pool de processos.
+
+        Os parsers compartilham um dicionário das contas contábeis da execução, para que os códigos das contas sejam
+        os mesmos em todas as tabelas. Com workers, o dicionário fica em um processo à parte (ContasManager), usado
+        pelos parsers de todos os processos. No modo incremental, ele continua o dicionário salvo no cache.
         """
         self._logger.info('Iniciando o processamento...')
+        self._store = TableStore(self._cache, self._checkpoint, self._cache_format)
         self._before() # Executa ações preparatórias.
-        self._parse() # Executa a conversão propriamente dita.
-        self._after() # Executa rotinas de finalização.
-        self._run_writers() # Executa os writers
+        self._index = None
+        self._dimension = None
+        self._index_lock = threading.Lock()
+        self._datas = decoder.DateDecoder()
+        self._logger.info('Executando a conversão, as atividades finais e a escrita dos dados...')
+        logger = self._logger
+        self._logger = StageLogger(logger)  # Mantém o log na ordem das etapas, mesmo com as etapas em paralelo.
+        contas = self._store.contas() if self._incremental else ()
+        try:
+            with ExitStack() as pools:
+                if self._workers is not None and self._workers > 1:
+                    manager = pools.enter_context(decoder.ContasManager())  # Encerrado depois do pool dos parsers.
+                    self._contas = manager.CodeDictionary(contas)
+                    self._pool = pools.enter_context(ProcessPoolExecutor(max_workers=self._workers))
+                else:
+                    self._contas = decoder.CodeDictionary(contas)
+                processes = self._writer_processes()
+                if processes:
+                    self._writer_pool = pools.enter_context(ProcessPoolExecutor(max_workers=processes))
+                self._stages().run()
+        finally:
+            self._logger = logger
+            self._pool = None
+            self._writer_pool = None
+            self._datas = None  # Libera o cache de datas da execução.
+            self._contas = None
         self._logger.info('Processamento terminado!')
 
     def _before(self):
@@ -54,51 +226,222 @@ class App:
         self._logger.info('Preparando tudo...')
         self._del_cache()
 
-    def _after(self):
-        """Controlador de rotinas de finalização.
+    def _stages(self):
+        """Monta as etapas do processamento e as dependências entre elas.
+
+        Cada parser é uma etapa sem dependências, com prioridade pelo tamanho dos seus txt. As rotinas de finalização
+        dependem das tabelas que leem e a escrita de cada tabela depende da última etapa que a altera. Cada tabela
+        fica na memória somente até a última etapa que a lê terminar (veja _reading). No modo incremental, as etapas
+        das tabelas que não mudaram são puladas (veja _incremental_stages).
+
+        Com writer_workers, a escrita de cada tabela com cada writer é uma etapa e o escalonador ganha writer_workers
+        threads a mais. Os parsers continuam limitados a workers etapas ao mesmo tempo e cada formato, a writer_limits.
+
+        :return pad.converter.scheduler.StageScheduler
+        """
+        threads = self._workers or 1
+        limits = {'parsers': threads}  # Limite de etapas simultâneas de cada grupo
+        if self._writer_workers is not None:
+            threads += self._writer_workers
+            for w in self._writers:
+                limits[f'writers:{self._writer_format(w)}'] = self._writer_limit(w)
+        scheduler = StageScheduler(self._logger, threads, limits)
+        parsers = {c._file_name for c in self._parsers()}
+        stages = []  # (etapa, função, dependências, prioridade, tabela alterada)
+        for parser_class in self._parsers():
+            name = parser_class._file_name
+            stages.append((name, lambda c=parser_class: self._parse(c), (), self._input_size(parser_class), name))
+        finais = ('EMPENHO', 'LIQUIDAC_EMPENHO', 'PAGAMENT_EMPENHO')  # Tabelas de empenho já concatenadas
+        stages += [
+            ('LIQUIDAC_EMPENHO', self._liquidac_empenho_concat, ('LIQUIDAC', 'EMPENHO'), 0, 'LIQUIDAC'),
+            ('PAGAMENT_EMPENHO', self._pagament_empenho_concat, ('PAGAMENT', 'EMPENHO'), 0, 'PAGAMENT'),
+            ('RESTOS_PAGAR', self._restos_pagar, finais, 0, 'RESTOS_PAGAR'),
+            ('MOVIEMP', self._moviemp, finais, 0, 'MOVIEMP'),
+        ]
+        tables = {}  # Última etapa que altera cada tabela
+        altered = {}  # Tabela alterada por cada etapa
+        for name, function, inputs, priority, table in stages:
+            tables[table] = name
+            altered[name] = table
+        reads = {name: {altered[i] for i in inputs} - {table} for name, function, inputs, priority, table in stages}
+        writers = 1 if self._writer_workers is None else len(self._writers)
+        for table in tables:
+            self._store.expect(table, writers + sum(table in r for r in reads.values()))
+        self._empenho_readers = sum('EMPENHO' in r for r in reads.values())
+        if self._incremental:
+            stages = self._incremental_stages(stages, tables)
+        for name, function, inputs, priority, table in stages:
+            function = self._reading(function, reads[name], 'EMPENHO' in reads[name])
+            scheduler.add(name, function, inputs, priority, 'parsers' if name in parsers else None)
+        for table, stage in tables.items():
+            if self._writer_workers is None:
+                scheduler.add(f'writers:{table}', self._reading(lambda t=table: self._write_table(t), {table}),
+                              (stage,))
+                continue
+            for i, w in enumerate(self._writers):
+                function = self._reading(lambda t=table, w=w: self._write_table(t, [w]), {table})
+                scheduler.add(f'writers:{table}:{i}', function, (stage,), group=f'writers:{self._writer_format(w)}')
+        return scheduler
+
+    def _reading(self, function, tables, empenhos=False):
+        """Monta a função de uma etapa que, ao terminar, libera as tabelas que leu.
+
+        Cada tabela sai da memória do armazém quando a última etapa que a lê (os seus writers e as rotinas de
+        finalização que dependem dela, como RESTOS_PAGAR e MOVIEMP) termina. O índice e a dimensão dos empenhos são
+        liberados junto com a última etapa que os usa.
+
+        :param function Função original da etapa.
+        :param tables Tabelas lidas pela etapa, além da que ela altera.
+        :param empenhos Se a etapa usa o índice e a dimensão dos empenhos.
+
+        :return Função sem parâmetros.
+        """
+        def run():
+            function()
+            for table in tables:
+                self._store.release(table)
+            if empenhos:
+                with self._index_lock:
+                    self._empenho_readers -= 1
+                    if self._empenho_readers == 0:
+                        self._index = None
+                        self._dimension = None
+        return run
+
+    def _incremental_stages(self, stages, tables):
+        """Adapta as etapas para o modo incremental.
+
+        A chave de cada parser junta o hash dos seus txt com a impressão digital do seu _spec, do seu código e das opções
+        que mudam o resultado. A das demais etapas junta as chaves das etapas de que elas dependem com a impressão digital
+        deste módulo. Se a chave da última etapa que altera uma tabela é a mesma registrada no cache, todas as etapas
+        que alteram a tabela são puladas e ela é lida do cache somente quando alguma etapa precisar dela. Assim, as
+        tabelas derivadas (como RESTOS_PAGAR e MOVIEMP) são recalculadas sempre que alguma das suas entradas muda.
+
+        :param stages Lista de (etapa, função, dependências, prioridade, tabela alterada).
+        :param tables Dicionário com a última etapa que altera cada tabela.
+
+        :return Lista de (etapa, função, dependências, prioridade, tabela alterada).
+        """
+        parsers = {c._file_name: c for c in self._parsers()}
+        codigo = source_digest(sys.modules[__name__], empenhos)
+        keys = {}  # Chave de cada etapa
+        for name, function, inputs, priority, table in stages:
+            if name in parsers:
+                keys[name] = self._parser_key(parsers[name])
+            else:
+                keys[name] = digest(name, codigo, self._year, *(keys[i] for i in inputs))
+        fresh = {table: self._store.fresh(table, keys[stage]) for table, stage in tables.items()}
+        adapted = []
+        started = set()  # Tabelas cuja primeira etapa já foi adaptada
+        for name, function, inputs, priority, table in stages:
+            function = self._incremental_stage(function, table, keys[tables[table]], fresh[table],
+                                               table not in started, tables[table] == name)
+            adapted.append((name, function, inputs, priority, table))
+            started.add(table)
+        return adapted
+
+    def _incremental_stage(self, function, table, key, fresh, first, last):
+        """Monta a função de uma etapa no modo incremental.
+
+        :param function Função original da etapa.
+        :param table Tabela alterada pela etapa.
+        :param key Chave da última etapa que altera a tabela.
+        :param fresh Se a tabela no cache já foi gerada com essa chave.
+        :param first Se é a primeira etapa que altera a tabela.
+        :param last Se é a última etapa que altera a tabela.
+
+        :return Função sem parâmetros.
+        """
+        def run():
+            if fresh:
+                if first:
+                    self._logger.info(f'{table} não mudou desde a última execução. Usando o cache...')
+                return
+            if first:
+                self._store.forget(table)
+            function()
+            if last:
+                self._store.save_contas(self._contas.contas())  # A tabela pode usar contas que acabaram de entrar.
+                self._store.record(table, key)
+        return run
+
+    def _parser_key(self, parser_class):
+        """Calcula a chave de um parser para o modo incremental.
+
+        :param parser_class Classe herdeira de pad.converter.parser.ParserBase
+
+        :return str
+        """
+        modules = [sys.modules[c.__module__] for c in parser_class.__mro__ if c.__module__.startswith('pad.')]
+        files = (os.path.join(s, f'{parser_class._file_name}.txt') for s in self._sources)
+        modules += [decoder, fwf, sys.modules[EntityClassifier.__module__]]
+        return digest(repr(parser_class._spec), source_digest(*modules),
+                      sorted(vars(self._entidades).items()), self._cents, self._compact, self._cache_format,
+                      *(file_digest(f) for f in files))
+
+    def _parse(self, parser_class):
+        """Executa um parser, no pool de processos se houver workers.
 
-        As rotinas de finalização englobam quaisquer processamentos extras que precisem ser feitos somente com todos os arquivos já convertidos e outras rotinas pós-conversão.
+        :param parser_class Classe herdeira de pad.converter.parser.ParserBase
         """
-        self._logger.info('Executando atividades finais...')
-        self._liquidac_empenho_concat()
-        self._pagament_empenho_concat()
-        self._restos_pagar()
-        self._moviemp()
-
-    def _parse(self):
-        """Controlador da conversão.
+        if self._pool is None:
+            df = self._run_parser(parser_class(self._logger, self._sources))
+        else:
+            records, error, df = self._pool.submit(run_parser, parser_class, self._sources,
+                                                   self._parser_options()).result()
+            for level, msg in records:
+                self._logger.log(level, msg)
+            if error is not None:
+                raise error
+        if df is not None:  # O parser já salvou a tabela no cache em disco, se for o caso.
+            self._store.put(parser_class._file_name, df, save=False)
+
+    def _parsers(self):
+        """Lista os parsers a executar, na ordem da conversão.
+
+        :return Lista de classes herdeiras de pad.converter.parser.ParserBase
         """
-        self._logger.info('Executando a conversão...')
-        # Aqui eu optei por uma certa repetição de código para cada arquivo a ser convertido, pois, é possível que,
-        # no futuro, algum arquivo necessite de alguma rotina mais específica.
-        # Como não se espera grandes mudanças em termos de arquivos a processar, penso que seja uma solução adequada.
-        # Entretanto, talvez eu refatore isso no futuro fazendo um loop numa lista de parsers.
-        df = self._run_parser(empenho.Empenho(self._logger, self._sources))
-        df = self._run_parser(liquidac.Liquidac(self._logger, self._sources))
-        df = self._run_parser(pagament.Pagament(self._logger, self._sources))
-        df = self._run_parser(balrec.BalRec(self._logger, self._sources))
-        df = self._run_parser(receita.Receita(self._logger, self._sources))
-        df = self._run_parser(baldesp.BalDesp(self._logger, self._sources))
-        df = self._run_parser(diario.DiarioContabil(self._logger, self._sources))
-        df = self._run_parser(balver.BalVer(self._logger, self._sources))
+        parsers = [
+            empenho.Empenho,
+            liquidac.Liquidac,
+            pagament.Pagament,
+            balrec.BalRec,
+            receita.Receita,
+            baldesp.BalDesp,
+            diario.DiarioContabil,
+            balver.BalVer,
+        ]
         if self._month == '12': # O arquivo BVER_ENC somente é gerado no mês 12
-            df = self._run_parser(bverenc.BVerEnc(self._logger, self._sources))
-        df = self._run_parser(rdextra.RDExtra(self._logger, self._sources))
-        df = self._run_parser(decreto.Decreto(self._logger, self._sources))
-        df = self._run_parser(brecant.BRecAnt(self._logger, self._sources))
-        df = self._run_parser(recant.RecAnt(self._logger, self._sources))
-        df = self._run_parser(brubant.BRubAnt(self._logger, self._sources))
-        df = self._run_parser(bver_ant.BVerAnt(self._logger, self._sources))
-        df = self._run_parser(bvmovant.BVMovAnt(self._logger, self._sources))
-        df = self._run_parser(orgao.Orgao(self._logger, self._sources))
-        df = self._run_parser(uniorcam.UniOrcam(self._logger, self._sources))
-        df = self._run_parser(programa.Programa(self._logger, self._sources))
-        df = self._run_parser(projativ.ProjAtiv(self._logger, self._sources))
-        df = self._run_parser(rubrica.Rubrica(self._logger, self._sources))
-        df = self._run_parser(recurso.Recurso(self._logger, self._sources))
-        df = self._run_parser(credor.Credor(self._logger, self._sources))
-        df = self._run_parser(ctadisp.CtaDisp(self._logger, self._sources))
-        df = self._run_parser(ctaoper.CtaOper(self._logger, self._sources))
+            parsers.append(bverenc.BVerEnc)
+        parsers += [
+            rdextra.RDExtra,
+            decreto.Decreto,
+            brecant.BRecAnt,
+            recant.RecAnt,
+            brubant.BRubAnt,
+            bver_ant.BVerAnt,
+            bvmovant.BVMovAnt,
+            orgao.Orgao,
+            uniorcam.UniOrcam,
+            programa.Programa,
+            projativ.ProjAtiv,
+            rubrica.Rubrica,
+            recurso.Recurso,
+            credor.Credor,
+            ctadisp.CtaDisp,
+            ctaoper.CtaOper,
+        ]
+        return parsers
+
+    def _input_size(self, parser_class):
+        """Calcula o tamanho, em bytes, dos txt que um parser vai ler.
+
+        :param parser_class Classe herdeira de pad.converter.parser.ParserBase
+
+        :return int
+        """
+        files = (os.path.join(s, f'{parser_class._file_name}.txt') for s in self._sources)
+        return sum(os.path.getsize(f) for f in files if os.path.exists(f))
 
     def _run_parser(self, parser):
         """Executa um parser específico.
@@ -107,417 +450,307 @@ class App:
 
         :return pandas.DataFrame
         """
-        return parser.parse()
+        return parser.configure(**self._parser_options()).parse()
+
+    def _parser_options(self):
+        """Monta as opções de execução dos parsers.
 
-    def _write(self, df, name):
-        """Executa os writers.
+        :return Dicionário com as opções para ParserBase.configure().
+        """
+        options = {'entidades': self._entidades, 'cents': self._cents, 'compact': self._compact,
+                   'checkpoint': self._checkpoint, 'cache_format': self._cache_format}
+        if self._datas is not None:
+            options['datas'] = self._datas
+        if self._contas is not None:
+            options['contas'] = self._contas
+        if self._engine is not None:
+            options['engine'] = self._engine
+        if self._chunk_size is not None:
+            options['chunk_size'] = self._chunk_size
+        if self._file_workers is not None:
+            options['workers'] = self._file_workers
+        return options
+
+    def _writer_limit(self, writer):
+        """Retorna a quantidade máxima de escritas simultâneas com o formato de um writer.
+
+        :param writer Objeto writer.
+
+        :return int
+        """
+        return self._writer_limits.get(self._writer_format(writer), self._writer_workers)
 
-        :param df pandas.DataFrame
+    def _writer_format(self, writer):
+        """Retorna o formato de um writer, pelo seu _format ou, se ele não tiver, pelo nome da sua classe.
+
+        :param writer Objeto writer.
+
+        :return str
+        """
+        return getattr(writer, '_format', type(writer).__name__)
+
+    def _writer_processes(self):
+        """Calcula o tamanho do pool de processos dos writers com _processes.
+
+        :return int, zero se não houver writer_workers ou writers com _processes.
+        """
+        if self._writer_workers is None:
+            return 0
+        return sum({self._writer_format(w): self._writer_limit(w) for w in self._writers
+                    if getattr(w, '_processes', False)}.values())
+
+    def _write_with(self, writer, name):
+        """Executa um writer para uma tabela do armazém.
+
+        :param writer Objeto writer.
         :param name Nome do arquivo/tabela para salvar os dados.
         """
-        for w in self._writers:
-            w.write(df, name)
+        chunked = self._store.chunked(name) and not self._store.loaded(name)
+        if self._writer_pool is not None and getattr(writer, '_processes', False):
+            source = {}  # Fonte da tabela para o processo: o cache em disco, se estiver atualizado, ou a memória
+            if chunked:
+                source['parts'] = self._store.parts(name)
+            elif self._checkpoint and os.path.exists(self._store.file(name)):
+                source['file'] = self._store.file(name)
+            else:
+                source['df'] = self._store.get(name)
+            writer = copy.copy(writer)
+            writer._logger = None  # O logger não é copiado para o processo.
+            records, error = self._writer_pool.submit(run_writer, writer, name, cache_format=self._cache_format,
+                                                      **source).result()
+            for level, msg in records:
+                self._logger.log(level, msg)
+            if error is not None:
+                raise error
+        elif chunked:
+            write_parts(writer, name, self._store.parts(name), self._store.read)
+        else:
+            writer.write(self._store.get(name), name)
 
     def _del_cache(self):
         """Apaga os arquivos em cache.
+
+        No modo incremental, o cache é mantido: cada tabela é invalidada sozinha quando a chave dela muda (veja
+        _incremental_stages). Para converter tudo de novo, basta executar uma vez sem o modo incremental.
         """
+        if self._incremental:
+            self._logger.debug(f'Mantendo o cache em {self._cache} para o modo incremental')
+            return
         self._logger.debug(f'Limpando cache em {self._cache}')
+        self._store.clear()
 
     def _liquidac_empenho_concat(self):
         """Concatena os dados de cada liquidação com os respectivos empenhos.
         """
         self._logger.debug('Concatenando LIQUIDAC X EMPENHOS...')
-        liquidac = pd.read_pickle(os.path.join(self._cache, 'LIQUIDAC.pkl'))
-        empenho = pd.read_pickle(os.path.join(self._cache, 'EMPENHO.pkl'))
-        empenho = empenho[['orgao',
-                           'uniorcam',
-                           'funcao',
-                           'subfuncao',
-                           'programa',
-                           'projativ',
-                           'rubrica',
-                           'recurso_vinculado',
-                           'contrapartida_recurso_vinculado',
-                           'numero_empenho',
-                           'credor',
-                           'caracteristica_peculiar_despesa',
-                           'registro_precos',
-                           'numero_licitacao',
-                           'ano_licitacao',
-                           'forma_contratacao',
-                           'base_legal_contratacao',
-                           'despesa_funcionario',
-                           'licitacao_compartilhada',
-                           'cnpj_gerenciador',
-                           'complemento_recurso_vinculado',
-                           'indicador_exercicio_fonte_recurso',
-                           'fonte_recurso',
-                           'codigo_acompanhamento_orcamentario']]
-        empenho = empenho.drop_duplicates()
-        liquidac = pd.merge(liquidac, empenho, on='numero_empenho', how='left', suffixes=('', '_r'))
-        liquidac.to_pickle(os.path.join(self._cache, 'LIQUIDAC.pkl'))
+        liquidac = self._store.get('LIQUIDAC')
+        attrs = liquidac.attrs  # A junção descarta os attrs quando eles diferem entre as tabelas.
+        liquidac = self._empenho_dimension().join(liquidac)
+        liquidac.attrs = attrs
+        self._store.put('LIQUIDAC', liquidac)
 
     def _pagament_empenho_concat(self):
         """Concatena os dados de cada pagamento com os respectivos empenhos.
         """
         self._logger.debug('Concatenando PAGAMENT X EMPENHOS...')
-        pagament = pd.read_pickle(os.path.join(self._cache, 'PAGAMENT.pkl'))
-        empenho = pd.read_pickle(os.path.join(self._cache, 'EMPENHO.pkl'))
-        empenho = empenho[[
-            'orgao',
-            'uniorcam',
-            'funcao',
-            'subfuncao',
-            'programa',
-            'projativ',
-            'rubrica',
-            'recurso_vinculado',
-            'contrapartida_recurso_vinculado',
-            'numero_empenho',
-            'credor',
-            'caracteristica_peculiar_despesa',
-            'registro_precos',
-            'numero_licitacao',
-            'ano_licitacao',
-            'forma_contratacao',
-            'base_legal_contratacao',
-            'despesa_funcionario',
-            'licitacao_compartilhada',
-            'cnpj_gerenciador',
-            'complemento_recurso_vinculado',
-            'indicador_exercicio_fonte_recurso',
-            'fonte_recurso',
-            'codigo_acompanhamento_orcamentario'
-        ]]
-        empenho = empenho.drop_duplicates()
-        pagament = pd.merge(pagament, empenho, on='numero_empenho', how='left', suffixes=('', '_r'))
-        pagament.to_pickle(os.path.join(self._cache, 'PAGAMENT.pkl'))
-
-    def _run_writers(self):
-        """Controlador da escrita dos dados.
+        pagament = self._store.get('PAGAMENT')
+        attrs = pagament.attrs  # A junção descarta os attrs quando eles diferem entre as tabelas.
+        pagament = self._empenho_dimension().join(pagament)
+        pagament.attrs = attrs
+        self._store.put('PAGAMENT', pagament)
+
+    def _write_table(self, name, writers=None):
+        """Executa os writers para uma tabela do armazém, um após o outro.
+
+        Se algum writer falhar, a falha é registrada no log com a tabela e o formato e os writers seguintes não rodam.
+
+        :param name Nome da tabela.
+        :param writers Lista de writers. Se None, todos os do App.
         """
-        self._logger.info('Escrevendo dados...')
-        for f in os.scandir(self._cache):
-            if f.is_file():
-                df = pd.read_pickle(f.path)
-                self._write(df, os.path.splitext(f.name)[0])
+        if writers is None:
+            writers = self._writers
+            self._logger.info(f'Escrevendo {name}...')
+        else:
+            self._logger.info(f'Escrevendo {name} ({", ".join(self._writer_format(w) for w in writers)})...')
+        for w in writers:
+            try:
+                self._write_with(w, name)
+            except Exception as e:
+                self._logger.error(f'Falha ao escrever {name} ({self._writer_format(w)}): {e}')
+                raise
 
     def _restos_pagar(self):
         """Cria um arquivo com os saldos e movimentações de empenhos inscritos em restos a pagar.
+
+        Os valores de EMPENHO, LIQUIDAC e PAGAMENT são somados por empenho (cnpj e número) de uma só vez, antes e depois
+        da data de corte (início do ano), e os saldos são calculados coluna a coluna a partir dessas somas.
         """
         self._logger.debug('Montando RESTOS_PAGAR...')
-        liquidac = pd.read_pickle(os.path.join(self._cache, 'LIQUIDAC.pkl'))
-        pagament = pd.read_pickle(os.path.join(self._cache, 'PAGAMENT.pkl'))
-        empenho = pd.read_pickle(os.path.join(self._cache, 'EMPENHO.pkl'))
-        restos = empenho[[
-            'orgao',
-            'uniorcam',
-            'funcao',
-            'subfuncao',
-            'programa',
-            'projativ',
-            'rubrica',
-            'recurso_vinculado',
-            'contrapartida_recurso_vinculado',
-            'numero_empenho',
-            'ano_empenho',
-            'entidade_empenho',
-            'empenho',
-            'credor',
-            'caracteristica_peculiar_despesa',
-            'registro_precos',
-            'numero_licitacao',
-            'ano_licitacao',
-            'forma_contratacao',
-            'base_legal_contratacao',
-            'despesa_funcionario',
-            'licitacao_compartilhada',
-            'cnpj_gerenciador',
-            'complemento_recurso_vinculado',
-            'indicador_exercicio_fonte_recurso',
-            'fonte_recurso',
-            'codigo_acompanhamento_orcamentario'
-        ]]
-
-        restos = restos.drop_duplicates()
-        restos = restos[restos['ano_empenho'] < int(self._year)]
-
-        restos['saldo_inicial_nao_processados'] = 0.0
-        restos['cancelamento_nao_processados'] = 0.0
-        restos['liquidacao_nao_processados'] = 0.0
-        restos['a_liquidar_nao_processados'] = 0.0
-        restos['pagamento_nao_processados'] = 0.0
-        restos['liquidado_a_pagar_nao_processados'] = 0.0
-        restos['cancelamento_nao_processados_liquidados'] = 0.0
-        restos['saldo_final_nao_processados'] = 0.0
-        restos['saldo_inicial_processados'] = 0.0
-        restos['cancelamento_processados'] = 0.0
-        restos['pagamento_processados'] = 0.0
-        restos['saldo_final_processados'] = 0.0
-        restos['saldo_inicial_nao_processados_inscritos_ultimo_ano'] = 0.0
-        restos['saldo_inicial_nao_processados_inscritos_anos_anteriores'] = 0.0
-        restos['saldo_inicial_processados_inscritos_ultimo_ano'] = 0.0
-        restos['saldo_inicial_processados_inscritos_anos_anteriores'] = 0.0
-        restos['entidade'] = None
-        data_corte = datetime(int(self._year), 1, 1)
-        for i, r in restos.iterrows():
-            if r['orgao'] == 1:
-                restos.at[i, 'entidade'] = 'cm'
-            elif r['orgao'] == 12:
-                restos.at[i, 'entidade'] = 'fpsm'
-            else:
-                restos.at[i, 'entidade'] = 'pm'
-
-            restos.at[i, 'saldo_inicial_nao_processados'] = self._saldo_inicial_nao_processados(r['numero_empenho'],
-                                                                                                empenho, liquidac,
-                                                                                                data_corte)
-            restos.at[i, 'cancelamento_nao_processados'] = self._cancelamento_nao_processados(r['numero_empenho'],
-                                                                                              empenho, data_corte,
-                                                                                              self._year)
-            restos.at[i, 'liquidacao_nao_processados'] = self._liquidacao_nao_processados(r['numero_empenho'], liquidac,
-                                                                                          data_corte, self._year)
-            restos.at[i, 'a_liquidar_nao_processados'] = round(
-                restos.at[i, 'saldo_inicial_nao_processados'] - restos.at[i, 'cancelamento_nao_processados'] -
-                restos.at[i, 'liquidacao_nao_processados'], 2)
-            if restos.at[i, 'saldo_inicial_nao_processados'] > 0.0:
-                restos.at[i, 'pagamento_nao_processados'] = self._pagamento_nao_processados(r['numero_empenho'],
-                                                                                            pagament, data_corte,
-                                                                                            self._year)
-            restos.at[i, 'liquidado_a_pagar_nao_processados'] = round(
-                restos.at[i, 'liquidacao_nao_processados'] - restos.at[i, 'pagamento_nao_processados'], 2)
-            restos.at[i, 'saldo_final_nao_processados'] = round(
-                restos.at[i, 'saldo_inicial_nao_processados'] - restos.at[i, 'cancelamento_nao_processados'] -
-                restos.at[i, 'pagamento_nao_processados'], 2)
-            restos.at[i, 'saldo_inicial_processados'] = self._saldo_inicial_processados(r['numero_empenho'], liquidac,
-                                                                                        pagament, data_corte)
-            restos.at[i, 'cancelamento_processados'] = self._cancelamento_processados(r['numero_empenho'], liquidac,
-                                                                                      data_corte, self._year)
-            if restos.at[i, 'saldo_inicial_processados'] > 0.0:
-                restos.at[i, 'pagamento_processados'] = self._pagamento_processados(r['numero_empenho'], pagament,
-                                                                                    data_corte, self._year)
-            restos.at[i, 'saldo_final_processados'] = round(
-                restos.at[i, 'saldo_inicial_processados'] - restos.at[i, 'cancelamento_processados'] - restos.at[
-                    i, 'pagamento_processados'], 2)
-            if r['ano_empenho'] == (int(self._year) - 1):
-                restos.at[
-                    i, 'saldo_inicial_nao_processados_inscritos_ultimo_ano'] = self._saldo_inicial_nao_processados(
-                    r['numero_empenho'], empenho, liquidac, data_corte)
-                restos.at[i, 'saldo_inicial_processados_inscritos_ultimo_ano'] = self._saldo_inicial_processados(
-                    r['numero_empenho'], liquidac, pagament, data_corte)
-            else:
-                restos.at[
-                    i, 'saldo_inicial_nao_processados_inscritos_anos_anteriores'] = self._saldo_inicial_nao_processados(
-                    r['numero_empenho'], empenho, liquidac, data_corte)
-                restos.at[i, 'saldo_inicial_processados_inscritos_anos_anteriores'] = self._saldo_inicial_processados(
-                    r['numero_empenho'], liquidac, pagament, data_corte)
+        liquidac = self._store.get('LIQUIDAC')
+        pagament = self._store.get('PAGAMENT')
+        empenho = self._store.get('EMPENHO')
+        dimensao = self._empenho_dimension()
+        selecao = dimensao.frame['ano_empenho'] < int(self._year)
+        restos = dimensao.frame[selecao].copy()  # A dimensão é compartilhada entre as etapas.
+        chaves = dimensao.chaves[selecao]
+
+        ano = int(self._year)
+        data_corte = datetime(ano, 1, 1)
+        indice = self._empenho_index()
+        empenhado_antes = indice.sums('EMPENHO', 'valor_empenho', empenho['data_empenho'] < data_corte)
+        empenhado_exercicio = indice.sums('EMPENHO', 'valor_empenho',
+                                          (empenho['data_empenho'] >= data_corte) & (empenho.ano_empenho < ano))
+        liquidado_antes = indice.sums('LIQUIDAC', 'valor_liquidacao', liquidac['data_liquidacao'] < data_corte)
+        exercicio = (liquidac['data_liquidacao'] >= data_corte) & (liquidac.ano_empenho < ano)
+        liquidado_exercicio = indice.sums('LIQUIDAC', 'valor_liquidacao', exercicio)
+        estornado_exercicio = indice.sums('LIQUIDAC', 'valor_liquidacao', exercicio & (liquidac.valor_liquidacao < 0.0))
+        pago_antes = indice.sums('PAGAMENT', 'valor_pagamento', pagament['data_pagamento'] < data_corte)
+        pago_exercicio = indice.sums('PAGAMENT', 'valor_pagamento',
+                                     (pagament['data_pagamento'] >= data_corte) & (pagament.ano_empenho < ano))
+
+        # Empenho de cada linha, -1 (soma zerada) se não tiver número
+        linhas = indice.positions(chaves['cnpj'], chaves['numero_empenho'])
+
+        def por_linha(somas):
+            return np.append(somas, np.zeros(1, dtype=somas.dtype))[linhas]
+
+        zero = valor_zero(self._cents)
+        saldo_inicial_nao_processados = arredonda(por_linha(empenhado_antes) - por_linha(liquidado_antes), self._cents)
+        cancelamento_nao_processados = arredonda(por_linha(empenhado_exercicio) * -1, self._cents)
+        liquidacao_nao_processados = arredonda(por_linha(liquidado_exercicio), self._cents)
+        pagamento = arredonda(por_linha(pago_exercicio), self._cents)
+        pagamento_nao_processados = np.where(saldo_inicial_nao_processados > 0.0, pagamento, zero)
+        saldo_final_nao_processados = arredonda(
+            saldo_inicial_nao_processados - cancelamento_nao_processados - pagamento_nao_processados, self._cents)
+        saldo_inicial_processados = arredonda(por_linha(liquidado_antes) - por_linha(pago_antes), self._cents)
+        cancelamento_processados = arredonda(por_linha(estornado_exercicio) * -1, self._cents)
+        pagamento_processados = np.where(saldo_inicial_processados > 0.0, pagamento, zero)
+        ultimo_ano = (restos['ano_empenho'] == ano - 1).to_numpy(dtype=bool, na_value=False)
+
+        restos['saldo_inicial_nao_processados'] = saldo_inicial_nao_processados
+        restos['cancelamento_nao_processados'] = cancelamento_nao_processados
+        restos['liquidacao_nao_processados'] = liquidacao_nao_processados
+        restos['a_liquidar_nao_processados'] = arredonda(
+            saldo_inicial_nao_processados - cancelamento_nao_processados - liquidacao_nao_processados, self._cents)
+        restos['pagamento_nao_processados'] = pagamento_nao_processados
+        restos['liquidado_a_pagar_nao_processados'] = arredonda(
+            liquidacao_nao_processados - pagamento_nao_processados, self._cents)
+        restos['cancelamento_nao_processados_liquidados'] = zero
+        restos['saldo_final_nao_processados'] = saldo_final_nao_processados
+        restos['saldo_inicial_processados'] = saldo_inicial_processados
+        restos['cancelamento_processados'] = cancelamento_processados
+        restos['pagamento_processados'] = pagamento_processados
+        restos['saldo_final_processados'] = arredonda(
+            saldo_inicial_processados - cancelamento_processados - pagamento_processados, self._cents)
+        restos['saldo_inicial_nao_processados_inscritos_ultimo_ano'] = np.where(
+            ultimo_ano, saldo_inicial_nao_processados, zero)
+        restos['saldo_inicial_nao_processados_inscritos_anos_anteriores'] = np.where(
+            ultimo_ano, zero, saldo_inicial_nao_processados)
+        restos['saldo_inicial_processados_inscritos_ultimo_ano'] = np.where(ultimo_ano, saldo_inicial_processados, zero)
+        restos['saldo_inicial_processados_inscritos_anos_anteriores'] = np.where(
+            ultimo_ano, zero, saldo_inicial_processados)
+        restos['entidade'] = self._entidades.classify(restos, REGRAS_ORGAO)
 
         restos = self._ajusta_cancelamento_restos(restos)
+        if self._cents:
+            restos.attrs[CENTAVOS] = list(restos.loc[:, 'saldo_inicial_nao_processados':
+                                                        'saldo_inicial_processados_inscritos_anos_anteriores'].columns)
 
-        restos.to_pickle(os.path.join(self._cache, 'RESTOS_PAGAR.pkl'))
+        self._store.put('RESTOS_PAGAR', restos)
 
     def _ajusta_cancelamento_restos(self, restos):
-        for i, r in restos.iterrows():
-            if restos.at[i, 'cancelamento_processados'] > restos.at[i, 'saldo_final_nao_processados']:
-                diff = restos.at[i, 'cancelamento_processados'] - restos.at[i, 'saldo_final_nao_processados'];
-                # restos.at[i, 'cancelamento_nao_processados'] += diff
-                restos.at[i, 'cancelamento_processados'] -= diff
-                restos.at[i, 'cancelamento_nao_processados_liquidados'] = diff
-                # restos.at[i, 'saldo_final_nao_processados'] -= diff
-                restos.at[i, 'saldo_final_processados'] += diff
-        return restos
+        """Transfere para cancelamento_nao_processados_liquidados a parte do cancelamento_processados que excede o
+        saldo_final_nao_processados.
 
-    def _pagamento_processados(self, numero_empenho, pagament, data_corte, ano):
-        """Método auxiliar para _restos_pagar
-        """
-        valor_pago = pagament[
-            (pagament.numero_empenho == numero_empenho) & (pagament['data_pagamento'] >= data_corte) & (
-                        pagament.ano_empenho < int(ano))]['valor_pagamento'].sum()
-        return round(valor_pago, 2)
+        :param restos pandas.DataFrame de RESTOS_PAGAR.
 
-    def _cancelamento_processados(self, numero_empenho, liquidac, data_corte, ano):
-        """Método auxiliar para _restos_pagar
-        """
-        valor_cancelado = liquidac[
-            (liquidac.numero_empenho == numero_empenho) & (liquidac['data_liquidacao'] >= data_corte) & (
-                        liquidac.valor_liquidacao < 0.0) & (liquidac.ano_empenho < int(ano))]['valor_liquidacao'].sum()
-        return round(valor_cancelado * -1, 2)
-
-    def _saldo_inicial_processados(self, numero_empenho, liquidac, pagament, data_corte):
-        """Método auxiliar para _restos_pagar
-        """
-        valor_liquidacao = \
-        liquidac[(liquidac.numero_empenho == numero_empenho) & (liquidac['data_liquidacao'] < data_corte)][
-            'valor_liquidacao'].sum()
-        valor_pago = pagament[(pagament.numero_empenho == numero_empenho) & (pagament['data_pagamento'] < data_corte)][
-            'valor_pagamento'].sum()
-        saldo = valor_liquidacao - valor_pago
-        return round(saldo, 2)
-
-    def _pagamento_nao_processados(self, numero_empenho, pagament, data_corte, ano):
-        """Método auxiliar para _restos_pagar
-        """
-        valor_pago = pagament[
-            (pagament.numero_empenho == numero_empenho) & (pagament['data_pagamento'] >= data_corte) & (
-                        pagament.ano_empenho < int(ano))]['valor_pagamento'].sum()
-        return round(valor_pago, 2)
-
-    def _liquidacao_nao_processados(self, numero_empenho, liquidac, data_corte, ano):
-        """Método auxiliar para _restos_pagar
+        :return pandas.DataFrame
         """
-        valor_liquidado = liquidac[
-            (liquidac.numero_empenho == numero_empenho) & (liquidac['data_liquidacao'] >= data_corte) & (
-                        liquidac.ano_empenho < int(ano))]['valor_liquidacao'].sum()
-        return round(valor_liquidado, 2)
+        cancelado = restos['cancelamento_processados'].to_numpy()
+        saldo_final = restos['saldo_final_nao_processados'].to_numpy()
+        excede = cancelado > saldo_final
+        diff = cancelado - saldo_final
+        restos['cancelamento_processados'] = np.where(excede, cancelado - diff, cancelado)
+        restos['cancelamento_nao_processados_liquidados'] = np.where(
+            excede, diff, restos['cancelamento_nao_processados_liquidados'])
+        restos['saldo_final_processados'] = np.where(excede, restos['saldo_final_processados'] + diff,
+                                                     restos['saldo_final_processados'])
+        return restos
 
-    def _saldo_inicial_nao_processados(self, numero_empenho, empenho, liquidac, data_corte):
-        """Método auxiliar para _restos_pagar
-        """
-        valor_empenho = empenho[(empenho.numero_empenho == numero_empenho) & (empenho['data_empenho'] < data_corte)][
-            'valor_empenho'].sum()
-        valor_liquidacao = \
-        liquidac[(liquidac.numero_empenho == numero_empenho) & (liquidac['data_liquidacao'] < data_corte)][
-            'valor_liquidacao'].sum()
-        saldo = valor_empenho - valor_liquidacao
-        return round(saldo, 2)
-
-    def _cancelamento_nao_processados(self, numero_empenho, empenho, data_corte, ano):
-        """Método auxiliar para _restos_pagar
-        """
-        valor_cancelado = empenho[
-            # (empenho.numero_empenho == numero_empenho) & (empenho['data_empenho'] >= data_corte) & (
-            #             empenho.valor_empenho < 0.0) & (empenho.ano_empenho < int(ano))]['valor_empenho'].sum()
-            # O comando acima não funciona quando ocorre o estorno de um cancelamento. O que funciona é o de baixo.
-            (empenho.numero_empenho == numero_empenho) & (empenho['data_empenho'] >= data_corte) & (empenho.ano_empenho < int(ano))]['valor_empenho'].sum()
-        return round(valor_cancelado * -1, 2)
+    def _empenho_dimension(self):
+        """Retorna a dimensão dos empenhos, montando-a na primeira chamada.
 
-    def _moviemp(self):
-        """Cria um arquivo com os saldos e movimentações de empenhos do ano.
+        :return pad.converter.empenhos.EmpenhoDimension
         """
-        self._logger.debug('Montando MOVIEMP...')
-        liquidac = pd.read_pickle(os.path.join(self._cache, 'LIQUIDAC.pkl'))
-        pagament = pd.read_pickle(os.path.join(self._cache, 'PAGAMENT.pkl'))
-        empenho = pd.read_pickle(os.path.join(self._cache, 'EMPENHO.pkl'))
-        moviemp = empenho[[
-            'orgao',
-            'uniorcam',
-            'funcao',
-            'subfuncao',
-            'programa',
-            'projativ',
-            'rubrica',
-            'recurso_vinculado',
-            'contrapartida_recurso_vinculado',
-            'numero_empenho',
-            'ano_empenho',
-            'entidade_empenho',
-            'empenho',
-            'credor',
-            'caracteristica_peculiar_despesa',
-            'registro_precos',
-            'numero_licitacao',
-            'ano_licitacao',
-            'forma_contratacao',
-            'base_legal_contratacao',
-            'despesa_funcionario',
-            'licitacao_compartilhada',
-            'cnpj_gerenciador',
-            'complemento_recurso_vinculado',
-            'indicador_exercicio_fonte_recurso',
-            'fonte_recurso',
-            'codigo_acompanhamento_orcamentario'
-        ]]
-
-        moviemp = moviemp.drop_duplicates()
-        moviemp = moviemp[moviemp['ano_empenho'] == int(self._year)]
-
-        moviemp['empenhado_bruto'] = 0.0
-        moviemp['estorno_empenhado'] = 0.0
-        moviemp['empenhado_liquido'] = 0.0
-        moviemp['liquidacao_bruto'] = 0.0
-        moviemp['estorno_liquidacao'] = 0.0
-        moviemp['liquidacao_liquido'] = 0.0
-        moviemp['pagamento_bruto'] = 0.0
-        moviemp['estorno_pagamento'] = 0.0
-        moviemp['pagamento_liquido'] = 0.0
-        moviemp['empenhado_a_liquidar'] = 0.0
-        moviemp['empenhado_a_pagar'] = 0.0
-        moviemp['liquidacao_a_pagar'] = 0.0
-        moviemp['entidade'] = None
-        data_corte = datetime(int(self._year), 1, 1)
-        for i, r in moviemp.iterrows():
-            if r['orgao'] == 1:
-                moviemp.at[i, 'entidade'] = 'cm'
-            elif r['orgao'] == 12:
-                moviemp.at[i, 'entidade'] = 'fpsm'
-            else:
-                moviemp.at[i, 'entidade'] = 'pm'
+        with self._index_lock:
+            if self._dimension is None:
+                self._dimension = EmpenhoDimension(self._logger, self._store.get('EMPENHO'))
+            return self._dimension
 
-            moviemp.at[i, 'empenhado_bruto'] = self._empenhado_bruto(r['numero_empenho'], empenho, data_corte)
-            moviemp.at[i, 'estorno_empenhado'] = self._estorno_empenhado(r['numero_empenho'], empenho, data_corte)
-            moviemp.at[i, 'empenhado_liquido'] = round(moviemp.at[i, 'empenhado_bruto'] - moviemp.at[i, 'estorno_empenhado'], 2)
+    def _empenho_index(self):
+        """Retorna o índice por empenho de EMPENHO, LIQUIDAC e PAGAMENT, montando-o na primeira chamada.
 
-            moviemp.at[i, 'liquidacao_bruto'] = self._liquidacao_bruto(r['numero_empenho'], liquidac, data_corte)
-            moviemp.at[i, 'estorno_liquidacao'] = self._estorno_liquidacao(r['numero_empenho'], liquidac, data_corte)
-            moviemp.at[i, 'liquidacao_liquido'] = round(moviemp.at[i, 'liquidacao_bruto'] - moviemp.at[i, 'estorno_liquidacao'], 2)
+        Deve ser chamado somente depois da concatenação de LIQUIDAC e PAGAMENT com os empenhos.
 
-            moviemp.at[i, 'pagamento_bruto'] = self._pagamento_bruto(r['numero_empenho'], pagament, data_corte)
-            moviemp.at[i, 'estorno_pagamento'] = self._estorno_pagamento(r['numero_empenho'], pagament, data_corte)
-            moviemp.at[i, 'pagamento_liquido'] = round(moviemp.at[i, 'pagamento_bruto'] - moviemp.at[i, 'estorno_pagamento'], 2)
-
-            moviemp.at[i, 'empenhado_a_liquidar'] = round(
-                moviemp.at[i, 'empenhado_liquido'] - moviemp.at[i, 'liquidacao_liquido'], 2)
-            moviemp.at[i, 'empenhado_a_pagar'] = round(
-                moviemp.at[i, 'empenhado_liquido'] - moviemp.at[i, 'pagamento_liquido'], 2)
-            moviemp.at[i, 'liquidacao_a_pagar'] = round(
-                moviemp.at[i, 'liquidacao_liquido'] - moviemp.at[i, 'pagamento_liquido'], 2)
-
-        moviemp.to_pickle(os.path.join(self._cache, 'MOVIEMP.pkl'))
-
-
-    def _empenhado_bruto(self, numero_empenho, empenho, data_corte):
-        """Método auxiliar para _moviemp
+        :return pad.converter.empenhos.EmpenhoIndex
         """
-        valor = empenho[
-            (empenho.numero_empenho == numero_empenho) & (empenho['data_empenho'] >= data_corte) & (
-                        empenho.valor_empenho > 0.0)]['valor_empenho'].sum()
-        return round(valor, 2)
+        with self._index_lock:
+            if self._index is None:
+                self._index = EmpenhoIndex(self._store.get('EMPENHO'), self._store.get('LIQUIDAC'),
+                                           self._store.get('PAGAMENT'))
+            return self._index
 
-    def _estorno_empenhado(self, numero_empenho, empenho, data_corte):
-        """Método auxiliar para _moviemp
-        """
-        valor = empenho[
-            (empenho.numero_empenho == numero_empenho) & (empenho['data_empenho'] >= data_corte) & (
-                        empenho.valor_empenho < 0.0)]['valor_empenho'].sum()
-        return round(valor * -1, 2)
-
-    def _liquidacao_bruto(self, numero_empenho, liquidac, data_corte):
-        """Método auxiliar para _moviemp
-        """
-        valor = liquidac[
-            (liquidac.numero_empenho == numero_empenho) & (liquidac['data_liquidacao'] >= data_corte) & (
-                    liquidac.valor_liquidacao > 0.0)]['valor_liquidacao'].sum()
-        return round(valor, 2)
-
-    def _estorno_liquidacao(self, numero_empenho, liquidac, data_corte):
-        """Método auxiliar para _moviemp
-        """
-        valor = liquidac[
-            (liquidac.numero_empenho == numero_empenho) & (liquidac['data_liquidacao'] >= data_corte) & (
-                    liquidac.valor_liquidacao < 0.0)]['valor_liquidacao'].sum()
-        return round(valor * -1, 2)
+    def _moviemp(self):
+        """Cria um arquivo com os saldos e movimentações de empenhos do ano.
 
-    def _pagamento_bruto(self, numero_empenho, pagament, data_corte):
-        """Método auxiliar para _moviemp
+        Os valores positivos (bruto) e negativos (estorno) de EMPENHO, LIQUIDAC e PAGAMENT desde a data de corte (início
+        do ano) são somados por empenho (cnpj e número) de uma só vez e ligados às linhas dos empenhos pela chave.
         """
-        valor = pagament[
-            (pagament.numero_empenho == numero_empenho) & (pagament['data_pagamento'] >= data_corte) & (
-                    pagament.valor_pagamento > 0.0)]['valor_pagamento'].sum()
-        return round(valor, 2)
+        self._logger.debug('Montando MOVIEMP...')
+        dimensao = self._empenho_dimension()
+        selecao = dimensao.frame['ano_empenho'] == int(self._year)
+        moviemp = dimensao.frame[selecao].copy()  # A dimensão é compartilhada entre as etapas.
+        chaves = dimensao.chaves[selecao]
 
-    def _estorno_pagamento(self, numero_empenho, pagament, data_corte):
-        """Método auxiliar para _moviemp
-        """
-        valor = pagament[
-            (pagament.numero_empenho == numero_empenho) & (pagament['data_pagamento'] >= data_corte) & (
-                    pagament.valor_pagamento < 0.0)]['valor_pagamento'].sum()
-        return round(valor * -1, 2)
\ No newline at end of file
+        data_corte = datetime(int(self._year), 1, 1)
+        indice = self._empenho_index()
+        # Empenho de cada linha, -1 (soma zerada) se não tiver número
+        linhas = indice.positions(chaves['cnpj'], chaves['numero_empenho'])
+
+        def movimento(name):
+            """Soma, por linha de moviemp, os valores positivos (bruto) e os negativos (estorno, com o sinal trocado)
+            desde a data de corte.
+            """
+            data, valor = TABELAS[name]
+            df = indice.table(name)
+            exercicio = df[data] >= data_corte
+            bruto = indice.sums(name, valor, exercicio & (df[valor] > 0.0))
+            estorno = indice.sums(name, valor, exercicio & (df[valor] < 0.0))
+            zero = np.zeros(1, dtype=bruto.dtype)
+            return (arredonda(np.append(bruto, zero)[linhas], self._cents),
+                    arredonda(np.append(estorno, zero)[linhas] * -1, self._cents))
+
+        empenhado_bruto, estorno_empenhado = movimento('EMPENHO')
+        liquidacao_bruto, estorno_liquidacao = movimento('LIQUIDAC')
+        pagamento_bruto, estorno_pagamento = movimento('PAGAMENT')
+        empenhado_liquido = arredonda(empenhado_bruto - estorno_empenhado, self._cents)
+        liquidacao_liquido = arredonda(liquidacao_bruto - estorno_liquidacao, self._cents)
+        pagamento_liquido = arredonda(pagamento_bruto - estorno_pagamento, self._cents)
+
+        moviemp['empenhado_bruto'] = empenhado_bruto
+        moviemp['estorno_empenhado'] = estorno_empenhado
+        moviemp['empenhado_liquido'] = empenhado_liquido
+        moviemp['liquidacao_bruto'] = liquidacao_bruto
+        moviemp['estorno_liquidacao'] = estorno_liquidacao
+        moviemp['liquidacao_liquido'] = liquidacao_liquido
+        moviemp['pagamento_bruto'] = pagamento_bruto
+        moviemp['estorno_pagamento'] = estorno_pagamento
+        moviemp['pagamento_liquido'] = pagamento_liquido
+        moviemp['empenhado_a_liquidar'] = arredonda(empenhado_liquido - liquidacao_liquido, self._cents)
+        moviemp['empenhado_a_pagar'] = arredonda(empenhado_liquido - pagamento_liquido, self._cents)
+        moviemp['liquidacao_a_pagar'] = arredonda(liquidacao_liquido - pagamento_liquido, self._cents)
+        moviemp['entidade'] = self._entidades.classify(moviemp, REGRAS_ORGAO)
+
+        if self._cents:
+            moviemp.attrs[CENTAVOS] = list(moviemp.loc[:, 'empenhado_bruto':'liquidacao_a_pagar'].columns)
+        self._store.put('MOVIEMP', moviemp)
@@ -0,0 +1,402 @@
+"""Índice por empenho (pela CHAVE_EMPENHO) das tabelas EMPENHO, LIQUIDAC e PAGAMENT.
+
+O índice é montado uma única vez por execução e guarda, para cada tabela, as linhas agrupadas por empenho (na ordem
+original das linhas dentro de cada empenho), os deslocamentos de início e fim de cada empenho e as somas acumuladas dos
+valores em ordem de data. Com ele, as linhas e os totais de um empenho saem em O(1) e o saldo em uma data ou o movimento
+em um período, em O(log n), sem filtrar a tabela inteira a cada consulta.
+
+Os empenhos são identificados pelo cnpj da entidade e pelo número, já que a prefeitura e a câmara podem usar os mesmos
+números. Exemplo de consulta avulsa, a partir das tabelas salvas no cache:
+
+    indice = EmpenhoIndex(empenho, liquidac, pagament)
+    cnpj = '87612826000190'
+    indice.balance('LIQUIDAC', cnpj, '2022000000123', datetime(2023, 1, 1))  # Liquidado até o fim de 2022
+    indice.movement('PAGAMENT', cnpj, '2022000000123', datetime(2023, 1, 1), datetime(2023, 7, 1))  # Pago no 1º semestre
+"""
+import numpy as np
+import pandas as pd
+
+# Colunas de EMPENHO que descrevem cada empenho, na ordem em que entram em RESTOS_PAGAR e MOVIEMP
+COLUNAS_EMPENHO = [
+    'orgao',
+    'uniorcam',
+    'funcao',
+    'subfuncao',
+    'programa',
+    'projativ',
+    'rubrica',
+    'recurso_vinculado',
+    'contrapartida_recurso_vinculado',
+    'numero_empenho',
+    'ano_empenho',
+    'entidade_empenho',
+    'empenho',
+    'credor',
+    'caracteristica_peculiar_despesa',
+    'registro_precos',
+    'numero_licitacao',
+    'ano_licitacao',
+    'forma_contratacao',
+    'base_legal_contratacao',
+    'despesa_funcionario',
+    'licitacao_compartilhada',
+    'cnpj_gerenciador',
+    'complemento_recurso_vinculado',
+    'indicador_exercicio_fonte_recurso',
+    'fonte_recurso',
+    'codigo_acompanhamento_orcamentario',
+]
+# Colunas de EMPENHO que entram em LIQUIDAC e PAGAMENT
+COLUNAS_JUNCAO = [c for c in COLUNAS_EMPENHO if c not in ('ano_empenho', 'entidade_empenho', 'empenho')]
+# Chave da dimensão dos empenhos: o número do empenho dentro dos txt de cada entidade (identificados pelo cnpj do
+# cabeçalho), já que a prefeitura e a câmara numeram os seus empenhos separadamente
+CHAVE_EMPENHO = ['cnpj', 'numero_empenho']
+
+# Colunas de data e de valor de cada tabela do índice
+TABELAS = {
+    'EMPENHO': ('data_empenho', 'valor_empenho'),
+    'LIQUIDAC': ('data_liquidacao', 'valor_liquidacao'),
+    'PAGAMENT': ('data_pagamento', 'valor_pagamento'),
+}
+
+
+def key_codes(frames, columns):
+    """Códigos da chave (a combinação das colunas) de cada linha de várias tabelas, comparáveis entre as tabelas.
+
+    Os valores ausentes contam como um valor da chave, como no pandas.merge.
+
+    :param frames Lista de pandas.DataFrame com as colunas da chave.
+    :param columns Colunas da chave.
+
+    :return Lista com um numpy.ndarray de códigos (int64) por tabela.
+    """
+    sizes = [len(df) for df in frames]
+    codes = np.zeros(sum(sizes), dtype=np.int64)
+    for column in columns:
+        values = np.concatenate([np.asarray(df[column], dtype=object) for df in frames])
+        column_codes, uniques = pd.factorize(values, use_na_sentinel=False)
+        codes, _ = pd.factorize(codes * len(uniques) + column_codes)
+    return np.split(codes, np.cumsum(sizes)[:-1])
+
+
+def valores(column):
+    """Valores de uma coluna de valor como numpy.ndarray: float64 (em reais, com NaN) ou int64 (em centavos, com os
+    valores ausentes das colunas Int64 como zero, como os NaN nas somas do pandas).
+
+    :param column pandas.Series
+
+    :return numpy.ndarray
+    """
+    if column.dtype.kind == 'f':
+        return column.to_numpy(dtype=np.float64, na_value=np.nan)
+    return column.to_numpy(dtype=np.int64, na_value=0)
+
+
+def centavos(values):
+    """Converte valores em reais (float) para centavos (int64), com os NaN como zero. Os valores que já estão em
+    centavos (inteiros, no modo centavos) voltam como estão.
+
+    Os valores dos txt têm duas casas decimais, então a conversão é exata.
+
+    :param values numpy.ndarray com os valores.
+
+    :return numpy.ndarray
+    """
+    if values.dtype.kind != 'f':
+        return values
+    return np.rint(np.where(np.isnan(values), 0.0, values) * 100).astype(np.int64)
+
+
+def group_sum(values, groups, size):
+    """Soma os valores de cada grupo.
+
+    Os valores em reais são somados em centavos (int64) e convertidos de volta no fim, então a soma é exata, não depende
+    da ordem das parcelas e já sai arredondada nos centavos. Os NaN são somados como 0, como no pandas.
+
+    :param values numpy.ndarray com os valores.
+    :param groups numpy.ndarray com o grupo (de 0 a size - 1) de cada valor.
+    :param size Quantidade de grupos.
+
+    :return numpy.ndarray com a soma de cada grupo, do tipo de values, e zero para os grupos sem valores.
+    """
+    parcelas = centavos(values)
+    result = np.zeros(size, dtype=parcelas.dtype)
+    np.add.at(result, groups, parcelas)
+    return result / 100 if values.dtype.kind == 'f' else result
+
+
+class EmpenhoIndex:
+    """Índice por CHAVE_EMPENHO (cnpj e numero_empenho) de EMPENHO, LIQUIDAC e PAGAMENT.
+
+    As tabelas indexadas são compartilhadas com quem as passou e não devem ser alteradas enquanto o índice for usado.
+    """
+    _chaves = None  # pandas.MultiIndex com as chaves dos empenhos das três tabelas, sem repetições
+    _tables = {}  # pandas.DataFrame de cada tabela
+    _order = {}  # Linhas de cada tabela agrupadas por empenho, na ordem original dentro de cada empenho
+    _groups = {}  # Empenho (posição em _chaves) de cada linha de _order
+    _offsets = {}  # Início (e, na posição seguinte, fim) das linhas de cada empenho em _order
+    _dates = {}  # Datas (datetime64[ns]) de cada tabela, agrupadas por empenho e em ordem de data dentro de cada um
+    _cumsum = {}  # Soma acumulada dos valores (em centavos) dentro de cada empenho, na ordem de _dates
+    _reais = {}  # Se os valores de cada tabela estão em reais (float), e não em centavos
+    _date_offsets = {}  # Início (e, na posição seguinte, fim) das linhas de cada empenho em _dates
+
+    def __init__(self, empenho, liquidac, pagament):
+        """Construtor do índice.
+
+        :param empenho pandas.DataFrame de EMPENHO.
+        :param liquidac pandas.DataFrame de LIQUIDAC.
+        :param pagament pandas.DataFrame de PAGAMENT.
+        """
+        self._tables = {'EMPENHO': empenho, 'LIQUIDAC': liquidac, 'PAGAMENT': pagament}
+        chaves = pd.concat([df.loc[df['numero_empenho'].notna(), CHAVE_EMPENHO].astype(object)
+                            for df in self._tables.values()])
+        self._chaves = pd.MultiIndex.from_frame(chaves).unique()
+        self._order = {}
+        self._groups = {}
+        self._offsets = {}
+        self._dates = {}
+        self._cumsum = {}
+        self._reais = {}
+        self._date_offsets = {}
+        for name, df in self._tables.items():
+            self._index_table(name, df)
+
+    def _index_table(self, name, df):
+        """Monta as estruturas de uma tabela.
+
+        :param name Nome da tabela.
+        :param df pandas.DataFrame
+        """
+        data, valor = TABELAS[name]
+        groups = self.positions(df['cnpj'], df['numero_empenho'])
+        order = np.argsort(groups, kind='stable')
+        order = order[groups[order] >= 0]
+        self._order[name] = order
+        self._groups[name] = groups[order]
+        self._offsets[name] = np.searchsorted(self._groups[name], np.arange(len(self._chaves) + 1))
+
+        dates = df[data].to_numpy(dtype='datetime64[ns]')
+        dated = (groups >= 0) & ~np.isnat(dates)
+        by_date = np.lexsort((dates, groups))
+        by_date = by_date[dated[by_date]]
+        values = valores(df[valor])[by_date]
+        self._reais[name] = values.dtype.kind == 'f'
+        self._dates[name] = dates[by_date]
+        self._cumsum[name] = pd.Series(centavos(values)).groupby(groups[by_date]).cumsum().to_numpy()
+        self._date_offsets[name] = np.searchsorted(groups[by_date], np.arange(len(self._chaves) + 1))
+
+    @property
+    def chaves(self):
+        """Chaves (cnpj e numero_empenho) dos empenhos das três tabelas, sem repetições.
+
+        :return pandas.MultiIndex
+        """
+        return self._chaves
+
+    def table(self, name):
+        """Retorna uma das tabelas indexadas.
+
+        :param name EMPENHO, LIQUIDAC ou PAGAMENT.
+
+        :return pandas.DataFrame
+        """
+        return self._tables[name]
+
+    def rows(self, name, cnpj, numero):
+        """Retorna as linhas de um empenho em uma tabela, na ordem original.
+
+        :param name EMPENHO, LIQUIDAC ou PAGAMENT.
+        :param cnpj CNPJ da entidade do empenho.
+        :param numero Número do empenho.
+
+        :return pandas.DataFrame
+        """
+        if (cnpj, numero) not in self._chaves:
+            return self._tables[name].iloc[:0]
+        g = self._chaves.get_loc((cnpj, numero))
+        offsets = self._offsets[name]
+        return self._tables[name].iloc[self._order[name][offsets[g]:offsets[g + 1]]]
+
+    def sums(self, name, column, mask=None, chaves=None):
+        """Soma uma coluna das linhas selecionadas de uma tabela, por empenho.
+
+        A soma é exata (veja group_sum): o resultado de cada empenho é o de filtrar a tabela pelo cnpj e pelo número do
+        empenho e pela máscara, somar a coluna com o pandas e arredondar para os centavos.
+
+        :param name EMPENHO, LIQUIDAC ou PAGAMENT.
+        :param column Coluna de valor.
+        :param mask Máscara (alinhada com as linhas da tabela) das linhas que entram na soma. Se None, todas.
+        :param chaves pandas.DataFrame com as colunas da CHAVE_EMPENHO dos empenhos. Se None, todos os do índice, na
+        ordem de chaves.
+
+        :return numpy.ndarray com a soma de cada empenho, zero para os empenhos sem linhas.
+        """
+        order = self._order[name]
+        values = valores(self._tables[name][column])[order]
+        groups = self._groups[name]
+        if mask is not None:
+            mask = pd.Series(mask).to_numpy(dtype=bool, na_value=False)[order]
+            values = values[mask]
+            groups = groups[mask]
+        sums = group_sum(values, groups, len(self._chaves))
+        if chaves is None:
+            return sums
+        positions = self.positions(chaves['cnpj'], chaves['numero_empenho'])
+        return np.append(sums, np.zeros(1, dtype=sums.dtype))[positions]
+
+    def positions(self, cnpjs, numeros):
+        """Posição da chave de cada empenho em chaves, para ligar os resultados de sums a outras tabelas.
+
+        :param cnpjs Sequência com o CNPJ da entidade de cada empenho.
+        :param numeros Sequência com o número de cada empenho, alinhada com cnpjs, com ou sem repetições.
+
+        :return numpy.ndarray com a posição de cada chave ou -1 para as que não estão no índice ou não têm número.
+        """
+        numeros = np.asarray(numeros, dtype=object)
+        chaves = pd.MultiIndex.from_arrays([np.asarray(cnpjs, dtype=object), numeros], names=CHAVE_EMPENHO)
+        positions = self._chaves.get_indexer(chaves)
+        positions[pd.isna(numeros)] = -1
+        return positions
+
+    def balance(self, name, cnpj, numero, data):
+        """Soma os valores de um empenho em uma tabela com data anterior à informada.
+
+        A soma sai da soma acumulada em centavos, em ordem de data, e é exata como a de sums.
+
+        :param name EMPENHO, LIQUIDAC ou PAGAMENT.
+        :param cnpj CNPJ da entidade do empenho.
+        :param numero Número do empenho.
+        :param data Data (exclusive) até a qual os valores são somados.
+
+        :return Soma dos valores ou zero se não houver nenhum.
+        """
+        return self._valor(name, self._acumulado(name, cnpj, numero, data))
+
+    def movement(self, name, cnpj, numero, inicio, fim):
+        """Soma os valores de um empenho em uma tabela com data no período [inicio, fim).
+
+        :param name EMPENHO, LIQUIDAC ou PAGAMENT.
+        :param cnpj CNPJ da entidade do empenho.
+        :param numero Número do empenho.
+        :param inicio Data inicial (inclusive).
+        :param fim Data final (exclusive).
+
+        :return Soma dos valores no período, exata como a de balance.
+        """
+        return self._valor(name, self._acumulado(name, cnpj, numero, fim) - self._acumulado(name, cnpj, numero, inicio))
+
+    def _acumulado(self, name, cnpj, numero, data):
+        """Soma acumulada, em centavos, dos valores de um empenho em uma tabela com data anterior à informada.
+
+        :param name EMPENHO, LIQUIDAC ou PAGAMENT.
+        :param cnpj CNPJ da entidade do empenho.
+        :param numero Número do empenho.
+        :param data Data (exclusive) até a qual os valores são somados.
+
+        :return Soma em centavos ou zero se não houver nenhum valor.
+        """
+        zero = self._cumsum[name].dtype.type(0)
+        if (cnpj, numero) not in self._chaves:
+            return zero
+        g = self._chaves.get_loc((cnpj, numero))
+        start, end = self._date_offsets[name][g], self._date_offsets[name][g + 1]
+        k = np.searchsorted(self._dates[name][start:end], np.datetime64(pd.Timestamp(data), 'ns'), side='left')
+        return self._cumsum[name][start + k - 1] if k else zero
+
+    def _valor(self, name, soma):
+        """Converte uma soma em centavos para o tipo dos valores da tabela: reais, se eles estão em reais, ou centavos.
+
+        :param name EMPENHO, LIQUIDAC ou PAGAMENT.
+        :param soma Soma em centavos.
+
+        :return Soma no tipo dos valores da tabela.
+        """
+        return soma / 100 if self._reais[name] else soma
+
+
+class EmpenhoDimension:
+    """Dimensão dos empenhos: uma linha por empenho (pela CHAVE_EMPENHO), montada uma única vez por execução.
+
+    Cada chave fica com a primeira linha em que aparece em EMPENHO. Todas as linhas de EMPENHO com a mesma chave
+    deveriam ter os mesmos dados em COLUNAS_EMPENHO: as chaves que aparecem com dados diferentes são registradas no log
+    como aviso. As junções com LIQUIDAC e PAGAMENT são feitas pela posição da chave de cada linha na dimensão.
+    """
+    _frame = None  # pandas.DataFrame com as colunas de COLUNAS_EMPENHO, uma linha por chave
+    _chaves = None  # pandas.DataFrame com a CHAVE_EMPENHO de cada linha de _frame, com o mesmo índice
+    _join = None  # pandas.DataFrame com a CHAVE_EMPENHO e as colunas de COLUNAS_JUNCAO, com índice 0..n-1
+
+    def __init__(self, logger, empenho):
+        """Construtor da dimensão.
+
+        :param logger Objeto logger, para avisar das chaves que aparecem com dados diferentes em EMPENHO.
+        :param empenho pandas.DataFrame de EMPENHO.
+        """
+        codes, = key_codes([empenho], CHAVE_EMPENHO)
+        _, first = np.unique(codes, return_index=True)
+        first.sort()  # Primeira linha de cada chave, na ordem em que aparecem em EMPENHO
+        self._check_unique(logger, empenho, codes, first)
+        rows = empenho.iloc[first]
+        self._frame = rows[COLUNAS_EMPENHO]
+        self._chaves = rows[CHAVE_EMPENHO]
+        self._join = rows[CHAVE_EMPENHO + [c for c in COLUNAS_JUNCAO if c not in CHAVE_EMPENHO]].reset_index(drop=True)
+
+    @staticmethod
+    def _check_unique(logger, empenho, codes, first):
+        """Verifica se cada chave identifica um único empenho, comparando cada linha com a primeira linha da sua chave,
+        e avisa no log das chaves que aparecem com dados diferentes.
+
+        :param logger Objeto logger.
+        :param empenho pandas.DataFrame de EMPENHO.
+        :param codes Código da chave de cada linha, de key_codes.
+        :param first Primeira linha de cada chave.
+        """
+        if len(first) == len(empenho):
+            return
+        primeira = np.empty(codes.max() + 1, dtype=np.int64)
+        primeira[codes[first]] = first
+        primeira = primeira[codes]  # Primeira linha da chave de cada linha
+        differ = np.zeros(len(empenho), dtype=bool)
+        for column in COLUNAS_EMPENHO:
+            values, _ = pd.factorize(np.asarray(empenho[column], dtype=object), use_na_sentinel=False)
+            differ |= values != values[primeira]
+        if differ.any():
+            chaves = empenho.iloc[np.flatnonzero(differ)][CHAVE_EMPENHO].drop_duplicates()
+            exemplos = ', '.join('/'.join(str(v) for v in chave) for chave in chaves.head(5).itertuples(index=False))
+            logger.warning(f'{len(chaves)} empenhos ({"/".join(CHAVE_EMPENHO)}) aparecem com dados diferentes em '
+                           f'EMPENHO, como {exemplos}. Usando os dados da primeira linha de cada um...')
+
+    @property
+    def frame(self):
+        """Empenhos sem linhas repetidas, na ordem em que aparecem em EMPENHO. Não deve ser alterado no lugar.
+
+        :return pandas.DataFrame
+        """
+        return self._frame
+
+    @property
+    def chaves(self):
+        """CHAVE_EMPENHO de cada linha de frame, com o mesmo índice, para ligar as linhas ao EmpenhoIndex. Não deve
+        ser alterado no lugar.
+
+        :return pandas.DataFrame
+        """
+        return self._chaves
+
+    def join(self, df):
+        """Junta as colunas de COLUNAS_JUNCAO às linhas de uma tabela, pela CHAVE_EMPENHO.
+
+        O resultado é o mesmo de pandas.merge(df, ..., on=CHAVE_EMPENHO, how='left', suffixes=('', '_r')) com a
+        dimensão: as linhas de df na ordem original, com NaN nas colunas dos empenhos não encontrados.
+
+        :param df pandas.DataFrame com as colunas da CHAVE_EMPENHO.
+
+        :return pandas.DataFrame com índice 0..n-1.
+        """
+        keys, codes = key_codes([self._join, df], CHAVE_EMPENHO)
+        positions = np.full(max(keys.max(initial=-1), codes.max(initial=-1)) + 1, -1, dtype=np.int64)
+        positions[keys] = np.arange(len(keys))
+        right_rows = positions[codes]  # Linha da dimensão de cada linha de df ou -1
+        left = df.reset_index(drop=True)
+        right = self._join.drop(columns=CHAVE_EMPENHO).reindex(right_rows).reset_index(drop=True)
+        right.columns = [f'{c}_r' if c in left.columns else c for c in right.columns]
+        return pd.concat([left, right], axis=1)
@@ -0,0 +1,113 @@
+"""Identificação da entidade (pm, cm ou fpsm) a que cada linha dos dados se refere.
+
+A identificação é feita por uma tabela de regras avaliada coluna a coluna, sem percorrer as linhas.
+
+ATENÇÃO: se você estiver usando esse programa, terá que adaptar os códigos (CNPJ, fontes de recurso e órgãos) para a
+sua realidade, informando-os ao criar o EntityClassifier. Se tentar usar do jeito que está, não terá a informação
+correta.
+"""
+import numpy as np
+
+# Regras avaliadas antes de todas as outras, sempre que a coluna existir na tabela.
+# Cada regra é (coluna, nome do código configurável, entidade).
+PRIORITARIAS = (
+    ('cnpj', 'cnpj_camara', 'cm'),
+)
+
+# Ramos de regras, na ordem de precedência. Somente o primeiro ramo cuja coluna existe na tabela é avaliado.
+# Cada ramo é (coluna que ativa o ramo, regras, entidade para as linhas que não casarem com nenhuma regra).
+# Cada regra é (coluna, nome do código configurável ou None para qualquer valor, entidade) e é ignorada se a coluna
+# não existir na tabela.
+REGRAS = (
+    ('fonte_recurso', (
+        ('fonte_recurso', 'fontes_rpps', 'fpsm'),
+        ('orgao', 'orgao_rpps', 'fpsm'),
+        ('orgao', None, 'pm'),
+    ), None),
+    ('entidade_empenho', (
+        ('entidade_empenho', 'entidade_empenho_rpps', 'fpsm'),
+        ('entidade_empenho', None, 'pm'),
+    ), None),
+    ('fonte_recurso_suplementacao', (
+        ('fonte_recurso_suplementacao', 'fontes_rpps', 'fpsm'),
+        ('fonte_recurso_suplementacao', None, 'pm'),
+    ), None),
+    ('fonte_recurso_reducao', (
+        ('fonte_recurso_reducao', 'fontes_rpps', 'fpsm'),
+        ('fonte_recurso_reducao', None, 'pm'),
+    ), None),
+    ('orgao', (
+        ('orgao', 'orgao_camara', 'cm'),
+        ('orgao', 'orgao_rpps', 'fpsm'),
+        ('orgao', None, 'pm'),
+    ), None),
+)
+
+# Regras para as tabelas montadas a partir dos empenhos (RESTOS_PAGAR e MOVIEMP), que usam somente o órgão.
+REGRAS_ORGAO = REGRAS[-1:]
+
+SEM_REGRA = ''  # Entidade das linhas de tabelas em que nenhum ramo se aplica
+
+
+class EntityClassifier:
+    """Classificador das linhas de um pandas.DataFrame por entidade.
+    """
+    cnpj_camara = ('12292535000162',)  # CNPJ da câmara
+    fontes_rpps = (800, 801, 802, 803)  # Fontes de recurso do RPPS
+    orgao_camara = (1,)  # Órgão da câmara
+    orgao_rpps = (12,)  # Órgão do RPPS
+    entidade_empenho_rpps = (1,)  # Código do campo entidade_empenho para os empenhos do RPPS
+
+    def __init__(self, **codes):
+        """Construtor do classificador.
+
+        :param codes Códigos que substituem os padrão, por nome (cnpj_camara, fontes_rpps, orgao_camara, orgao_rpps ou
+        entidade_empenho_rpps). Cada um pode ser um valor único ou uma sequência de valores.
+        """
+        for name, value in codes.items():
+            if not hasattr(EntityClassifier, name) or name.startswith('_') or callable(getattr(EntityClassifier, name)):
+                raise ValueError(f'Código {name} desconhecido para a identificação da entidade.')
+            if isinstance(value, (str, int)):
+                value = (value,)
+            setattr(self, name, tuple(value))
+
+    def classify(self, df, rules=REGRAS):
+        """Identifica a entidade de cada linha.
+
+        :param df pandas.DataFrame
+        :param rules Ramos de regras, no formato de REGRAS.
+
+        :return numpy.ndarray de objetos com a entidade de cada linha.
+        """
+        masks = []
+        values = []
+        for column, code, entity in PRIORITARIAS:
+            if column in df:
+                masks.append(self._match(df, column, code))
+                values.append(entity)
+        default = SEM_REGRA
+        for column, branch, otherwise in rules:
+            if column not in df:
+                continue
+            for rule_column, code, entity in branch:
+                if rule_column in df:
+                    masks.append(self._match(df, rule_column, code))
+                    values.append(entity)
+            default = otherwise
+            break
+        if not masks:
+            return np.full(len(df), default, dtype=object)
+        return np.select(masks, [np.array(v, dtype=object) for v in values], default=default)
+
+    def _match(self, df, column, code):
+        """Monta a máscara das linhas cuja coluna tem um dos valores do código.
+
+        :param df pandas.DataFrame
+        :param column Nome da coluna.
+        :param code Nome do código configurável ou None para qualquer valor.
+
+        :return numpy.ndarray de bool
+        """
+        if code is None:
+            return np.ones(len(df), dtype=bool)
+        return df[column].isin(getattr(self, code)).to_numpy()
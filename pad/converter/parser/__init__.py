@@ -1,11 +1,76 @@
 """Módulo base para os parsers
 """
+import io
+import logging
+import shutil
 import warnings
-from datetime import datetime
-from os import path
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from os import path, makedirs, remove
 
+import numpy as np
 import pandas as pd
 
+from pad.converter.entidade import EntityClassifier
+from pad.converter.parser.decoder import CENTAVOS, CodeDictionary, DateDecoder, MoneyDecoder
+from pad.converter.parser.fwf import NA_VALUES, RecordLayout
+from pad.converter.store import FORMATOS
+
+ENGINES = ('pandas', 'numpy')  # Motores de leitura disponíveis para os txt
+# Inteiro anulável usado no modo compacto para cada largura máxima (em dígitos) dos campos inteiros do _spec.
+INTEIROS_COMPACTOS = (
+    (2, 'Int8'),
+    (4, 'Int16'),
+    (9, 'Int32'),
+)
+LARGURA_CATEGORIA = 2  # Largura máxima dos campos de texto do _spec que viram categorias no modo compacto
+TEXTO_COMPACTO = 'string[pyarrow]'  # Tipo dos demais campos de texto do _spec no modo compacto
+
+
+class LogBuffer:
+    """Logger que guarda as mensagens de um parser executado em outro processo.
+
+    As mensagens são repassadas ao logger de quem criou o processo na ordem da conversão (dos parsers ou das faixas de um
+    arquivo), para que o log não dependa da ordem em que os processos terminam.
+    """
+    records = []  # Lista de (nível, mensagem)
+
+    def __init__(self):
+        """Construtor do logger.
+        """
+        self.records = []
+
+    def log(self, level, msg):
+        self.records.append((level, msg))
+
+    def debug(self, msg):
+        self.log(logging.DEBUG, msg)
+
+    def info(self, msg):
+        self.log(logging.INFO, msg)
+
+    def warning(self, msg):
+        self.log(logging.WARNING, msg)
+
+    def error(self, msg):
+        self.log(logging.ERROR, msg)
+
+
+def read_range(parser_class, options, file, start, end):
+    """Lê uma faixa de linhas de dados de um txt em um processo do pool de ParserBase._read_ranges.
+
+    :param parser_class Classe herdeira de ParserBase.
+    :param options Opções para ParserBase.configure().
+    :param file Caminho para o arquivo txt de dados.
+    :param start Posição (em bytes) do início da faixa, sempre no início de uma linha.
+    :param end Posição (em bytes) do fim da faixa, logo após o fim de uma linha.
+
+    :return Tupla (mensagens de log, pandas.DataFrame com as linhas da faixa).
+    """
+    logger = LogBuffer()
+    parser = parser_class(logger, []).configure(**options)
+    return logger.records, parser.read_range(file, start, end)
+
 
 class ParserBase:
     """Classe base para os parsers.
@@ -14,18 +79,100 @@ class ParserBase:
     _sources = []  # Lista de diretórios de origem dos dados
     _df = None  # pandas.DataFrame com os dados convertidos.
     _cache = 'cache'  # Diretório de cache. Eu sei, ficou estranho pois tem a mesma propriedade em pad.converter.app.App. Vou mudar isso no futuro.
+    _engine = 'pandas'  # Motor de leitura dos txt: 'pandas' (pd.read_fwf) ou 'numpy' (pad.converter.parser.fwf)
+    _chunk_size = None  # Quantidade de linhas por bloco no modo streaming. Se None, o arquivo é lido inteiro.
+    _streamable = True  # Se o _prepare trata cada linha de forma independente e pode ser executado bloco a bloco
+    _entidades = EntityClassifier()  # Classificador que identifica a entidade de cada linha
+    _datas = None  # Decodificador de datas DDMMAAAA da execução, compartilhado pelos parsers do App para aproveitar o cache
+    _contas = None  # Dicionário das contas contábeis da execução, compartilhado pelos parsers do App
+    _money = ()  # Campos de valor com duas casas decimais implícitas, convertidos de uma só vez por _converte_valores
+    _money_signs = {}  # Campo de sinal (+/-) de cada campo de valor que tiver um. Os campos de sinal são removidos.
+    _money_fill = True  # Se os valores ausentes viram 0.0 (True) ou NaN (False)
+    _money_derived = ()  # Colunas de valor calculadas pelo _prepare a partir dos campos de valor
+    _cents = False  # Se os valores ficam em centavos (int64) até os writers. Só tem efeito se _cents_support for True.
+    _cents_support = False  # Se o _prepare sabe calcular as colunas de valor em centavos
+    _compact = False  # Se as colunas ficam nos tipos compactos planejados por _plano_tipos até os writers
+    _workers = None  # Processos para ler em paralelo faixas de um mesmo arquivo. Se None, o arquivo é lido de uma vez.
+    _range_size = 4 * 1024 * 1024  # Tamanho mínimo (em bytes) de cada faixa lida em paralelo
+    _checkpoint = True  # Se a tabela inteira é salva no cache em disco. As partes do modo streaming sempre são.
+    _cache_format = 'pickle'  # Formato dos arquivos do cache, um de pad.converter.store.FORMATOS
+    _categorias = ('cnpj', 'entidade')  # Colunas do cabeçalho e calculadas que viram categorias no modo compacto
+    _options = ('engine', 'chunk_size', 'entidades', 'cents', 'compact', 'workers', 'checkpoint',
+                'cache_format', 'datas', 'contas')  # Opções que podem ser ajustadas por configure()
+
+    def configure(self, **options):
+        """Ajusta as opções de execução do parser.
+
+        :param options Pares nome/valor com as opções listadas em _options.
+
+        :return A própria instância do parser.
+        """
+        for name, value in options.items():
+            if name not in self._options:
+                raise ValueError(f'Opção {name} desconhecida para {self._file_name}.')
+            if name == 'engine' and value not in ENGINES:
+                raise ValueError(f'Motor de leitura {value} desconhecido. Use um de {ENGINES}.')
+            if name == 'chunk_size' and value is not None and (not isinstance(value, int) or value < 1):
+                raise ValueError(f'O tamanho do bloco deve ser um inteiro positivo, mas foi informado {value}.')
+            if name == 'cents' and not isinstance(value, bool):
+                raise ValueError(f'O modo centavos deve ser True ou False, mas foi informado {value}.')
+            if name == 'compact' and not isinstance(value, bool):
+                raise ValueError(f'O modo compacto deve ser True ou False, mas foi informado {value}.')
+            if name == 'checkpoint' and not isinstance(value, bool):
+                raise ValueError(f'O checkpoint deve ser True ou False, mas foi informado {value}.')
+            if name == 'cache_format' and value not in FORMATOS:
+                raise ValueError(f'Formato de cache {value} desconhecido. Use um de {tuple(FORMATOS)}.')
+            if name == 'workers' and value is not None and (not isinstance(value, int) or value < 1):
+                raise ValueError(f'A quantidade de processos deve ser um inteiro positivo, mas foi informado {value}.')
+            if name == 'datas' and not isinstance(value, DateDecoder):
+                raise ValueError(f'O decodificador de datas deve ser um DateDecoder, mas foi informado {value}.')
+            if name == 'contas' and not callable(getattr(value, 'codigos', None)):
+                raise ValueError(f'O dicionário de contas deve ser um CodeDictionary, mas foi informado {value}.')
+            setattr(self, f'_{name}', value)
+        return self
 
     def parse(self):
         """Controlador da conversão.
+
+        :return pandas.DataFrame com os dados convertidos ou None, se o arquivo foi processado em blocos.
         """
+        if self._chunk_size is not None:
+            if self._streamable:
+                return self._parse_chunks()
+            self._logger.debug(f'{self._file_name} não pode ser processado em blocos. Lendo o arquivo inteiro...')
         self._logger.info(f'Processando {self._file_name}.txt ...')
         self._text_to_df()
         self._logger.debug(f'Preparando dados de {self._file_name}')
         self._prepare()
         self._inject_entidade()
-        self._save_to_cache()
+        self._compacta()
+        if self._checkpoint:
+            self._save_to_cache()
         return self._df
 
+    def _parse_chunks(self):
+        """Controlador da conversão em blocos de linhas (modo streaming).
+
+        Cada bloco passa pelas mesmas rotinas de preparação e identificação da entidade e é salvo no cache como uma
+        parte da tabela, de modo que a memória usada depende do tamanho do bloco e não do tamanho do arquivo.
+
+        :return None
+        """
+        self._logger.info(f'Processando {self._file_name}.txt em blocos de {self._chunk_size} linhas...')
+        part = 0
+        for df in self._iter_chunks():
+            self._logger.debug(f'Preparando o bloco {part} de {self._file_name}')
+            self._df = df
+            self._prepare()
+            self._inject_entidade()
+            self._compacta()
+            self._save_to_cache(part)
+            part += 1
+        if part == 0:
+            raise ValueError(f'Nenhum arquivo {self._file_name}.txt encontrado em {self._sources}.')
+        self._df = None
+        return None
+
 
     def _text_to_df(self):
         """Converte os dados de FWF para um pandas.DataFrame.
@@ -37,18 +184,184 @@ class ParserBase:
             f = path.join(s, f'{self._file_name}.txt')
             if not path.exists(f):
                 continue
-            with warnings.catch_warnings(): # Ignora um aviso de que não tem converters para todas as colunas, conforme https://docs.python.org/3/library/warnings.html#temporarily-suppressing-warnings
-                warnings.simplefilter('ignore')
-                df = pd.read_fwf(f, colspecs=self._colspec(), names=self._colnames(), dtype=self._dtypes(), skiprows=1,
-                                 skipfooter=1, skipblanklines=True, encoding_errors='replace',
-                                 converters=self._converters(),
-                                 parse_dates=False,
-                                 keep_default_na=True)
-                header = self._parse_header(f)
-                df = self._inject_header(df, header)
+            df = self._read_file(f)
+            header = self._parse_header(f)
+            df = self._inject_header(df, header)
             self._df.append(df)
         self._df = pd.concat(self._df, axis=0, ignore_index=True)
 
+    def _iter_chunks(self):
+        """Lê os dados de FWF em blocos de no máximo _chunk_size linhas.
+
+        Cada arquivo gera ao menos um bloco, mesmo que vazio, para que a estrutura da tabela chegue ao cache. O índice
+        dos blocos continua a numeração do bloco anterior, como se todos formassem um único pandas.DataFrame.
+
+        :return Gerador de pandas.DataFrame
+        """
+        offset = 0
+        for s in self._sources:
+            f = path.join(s, f'{self._file_name}.txt')
+            if not path.exists(f):
+                continue
+            self._logger.debug(f'Lendo {self._file_name} de {s} em blocos...')
+            header = self._parse_header(f)
+            with open(f, 'rb') as txt:
+                txt.readline()  # Descarta o cabeçalho
+                lines = list(islice(txt, self._chunk_size))
+                while True:
+                    following = list(islice(txt, self._chunk_size))
+                    if not following:
+                        lines = lines[:-1]  # Descarta o finalizador
+                    df = self.read_lines(b''.join(lines))
+                    df.index = pd.RangeIndex(offset, offset + len(df))
+                    offset += len(df)
+                    yield self._inject_header(df, header)
+                    if not following:
+                        break
+                    lines = following
+
+    def _read_file(self, file):
+        """Lê as linhas de dados de um txt, dividindo-o em faixas lidas em paralelo se houver _workers e o arquivo for
+        grande o bastante.
+
+        :param file Caminho para o arquivo txt de dados.
+
+        :return pandas.DataFrame
+        """
+        if self._workers is None or self._workers < 2:
+            return self._read_fwf(file)
+        ranges = self._byte_ranges(file)
+        if len(ranges) < 2:
+            return self._read_fwf(file)
+        return self._read_ranges(file, ranges)
+
+    def _byte_ranges(self, file):
+        """Divide as linhas de dados de um txt, sem o cabeçalho e o finalizador, em até _workers faixas de bytes de
+        pelo menos _range_size bytes, terminando sempre no fim de uma linha.
+
+        O arquivo não é lido inteiro: o fim dos dados é procurado a partir do final do arquivo e cada divisa, a partir
+        da posição proporcional à faixa (tamanho * i / faixas), avançando até o próximo fim de linha.
+
+        :param file Caminho para o arquivo txt de dados.
+
+        :return Lista de tuplas (início, fim) em bytes.
+        """
+        with open(file, 'rb') as txt:
+            txt.readline()  # Descarta o cabeçalho
+            start = txt.tell()
+            size = txt.seek(0, io.SEEK_END) - start
+            block = 64 * 1024
+            while True:  # Procura o início do finalizador nos últimos bytes, aumentando o trecho se preciso.
+                offset = max(size - block, 0)
+                txt.seek(start + offset)
+                tail = txt.read(size - offset)
+                last = len(tail) - 1 if tail.endswith(b'\n') else len(tail)
+                found = tail.rfind(b'\n', 0, last)
+                if found >= 0 or offset == 0:
+                    break
+                block *= 2
+            end = offset + found + 1  # Início do finalizador
+            count = min(self._workers, end // self._range_size)
+            bounds = [0]
+            for i in range(1, count):
+                txt.seek(start + max(end * i // count, bounds[-1]) - 1)
+                txt.readline()  # Avança até o fim da linha
+                bound = txt.tell() - start
+                if 0 < bound < end:
+                    bounds.append(bound)
+        bounds.append(end)
+        return [(start + a, start + b) for a, b in zip(bounds[:-1], bounds[1:]) if b > a]
+
+    def _read_ranges(self, file, ranges):
+        """Lê as faixas de um txt em um pool de processos e as junta na ordem original das linhas.
+
+        As mensagens de log de cada faixa são repassadas na ordem das faixas.
+
+        :param file Caminho para o arquivo txt de dados.
+        :param ranges Lista de tuplas (início, fim) em bytes, como retornada por _byte_ranges.
+
+        :return pandas.DataFrame
+        """
+        self._logger.debug(f'Lendo {file} em {len(ranges)} faixas com {self._workers} processos...')
+        options = {'engine': self._engine, 'cents': self._cents}
+        with ProcessPoolExecutor(max_workers=self._workers) as pool:
+            futures = [pool.submit(read_range, type(self), options, file, start, end) for start, end in ranges]
+            dfs = []
+            for future in futures:
+                records, df = future.result()
+                for level, msg in records:
+                    self._logger.log(level, msg)
+                dfs.append(df)
+        return pd.concat(dfs, axis=0, ignore_index=True)
+
+    def read_range(self, file, start, end):
+        """Lê uma faixa de linhas de dados de um txt.
+
+        :param file Caminho para o arquivo txt de dados.
+        :param start Posição (em bytes) do início da faixa, sempre no início de uma linha.
+        :param end Posição (em bytes) do fim da faixa, logo após o fim de uma linha.
+
+        :return pandas.DataFrame
+        """
+        with open(file, 'rb') as txt:
+            txt.seek(start)
+            return self.read_lines(txt.read(end - start))
+
+    def read_lines(self, lines):
+        """Lê linhas de dados, sem o cabeçalho e o finalizador, com o motor de leitura configurado.
+
+        :param lines bytes com as linhas de dados.
+
+        :return pandas.DataFrame
+        """
+        # As linhas '-' no início e no fim fazem o papel de cabeçalho e finalizador para _read_fwf. Elas não podem
+        # ficar em branco: o pd.read_fwf não lê nada quando há uma única linha de dados entre elas.
+        return self._read_fwf(b'-\n' + lines + b'-\n')
+
+    def _read_fwf(self, file):
+        """Lê as linhas de dados de um txt com o motor de leitura configurado.
+
+        :param file Caminho para o arquivo txt de dados ou bytes com o seu conteúdo, incluindo cabeçalho e finalizador.
+
+        :return pandas.DataFrame
+        """
+        if self._engine == 'numpy':
+            layout = self._record_layout()
+            cents = self._em_centavos()
+            df = layout.parse(file, cents) if isinstance(file, bytes) else layout.read(file, cents)
+            if df is not None:
+                return df
+            self._logger.debug(f'{self._file_name} não tem registros de tamanho fixo. Usando pd.read_fwf...')
+        if isinstance(file, bytes):
+            file = io.BytesIO(file)
+        with warnings.catch_warnings(): # Ignora um aviso de que não tem converters para todas as colunas, conforme https://docs.python.org/3/library/warnings.html#temporarily-suppressing-warnings
+            warnings.simplefilter('ignore')
+            return pd.read_fwf(file, colspecs=self._colspec(), names=self._colnames(), dtype=self._dtypes(), skiprows=1,
+                               skipfooter=1, skipblanklines=True, encoding_errors='replace',
+                               converters=self._converters(),
+                               parse_dates=False,
+                               na_values=list(NA_VALUES), keep_default_na=False)
+
+    @classmethod
+    def _record_layout(cls):
+        """Retorna o layout de registro compilado a partir do _spec, compilando-o somente na primeira chamada.
+
+        :return pad.converter.parser.fwf.RecordLayout
+        """
+        layout = cls.__dict__.get('_compiled_layout')
+        if layout is None:
+            layout = RecordLayout(cls._spec, cls._money_decoder() if cls._money else None)
+            cls._compiled_layout = layout
+        return layout
+
+    @classmethod
+    def _money_decoder(cls):
+        """Cria o decodificador dos campos de valor do parser.
+
+        :return pad.converter.parser.decoder.MoneyDecoder
+        """
+        return MoneyDecoder(cls._money, cls._money_signs, cls._money_fill)
+
 
     def _prepare(self):
         """Executa rotinas de preparação.
@@ -56,6 +369,134 @@ class ParserBase:
         raise NotImplementedError('Este método precisa ser implementado pela classe herdeira!')
 
 
+    def _em_centavos(self):
+        """Indica se os valores deste parser ficam em centavos.
+
+        :return bool
+        """
+        return self._cents and self._cents_support
+
+    def _converte_valores(self):
+        """Converte de uma só vez todos os campos de valor (_money) em decimal e remove os campos de sinal.
+
+        Os campos que o motor 'numpy' já decodificou direto do arquivo são mantidos. Os que estiverem fora do padrão do
+        decodificador são convertidos um a um por _converte_valor.
+
+        No modo centavos, os campos ficam em int64 (ou Int64, com os valores ausentes como pd.NA, se não houver
+        _money_fill) e as colunas de valor da tabela são registradas em df.attrs para que os writers as convertam para
+        reais.
+        """
+        cents = self._em_centavos()
+        decoder = self._money_decoder()
+        decoded = decoder.decode_strings(self._df)
+        for campo in self._money:
+            if campo in decoded:
+                self._df[campo] = (decoder.to_cents if cents else decoder.to_float)(*decoded[campo])
+            elif self._df[campo].dtype == object:
+                self._converte_valor(campo)
+        for sinal in dict.fromkeys(self._money_signs.values()):
+            del self._df[sinal]
+        if cents:
+            self._df.attrs[CENTAVOS] = list(self._money) + list(self._money_derived)
+
+    def _plano_tipos(self):
+        """Planeja o tipo compacto de cada coluna a partir da largura do campo no _spec.
+
+        Campos inteiros ficam com o menor inteiro anulável que comporta a sua quantidade de dígitos, campos de texto
+        curtos (códigos, indicadores e siglas) viram categorias, assim como as colunas de _categorias, e os demais
+        campos de texto ficam em strings do pyarrow.
+
+        :return Dicionário {coluna: tipo}
+        """
+        plano = {}
+        for t in self._spec:
+            largura = t[2] - t[1] + 1
+            if t[3] is int:
+                plano[t[0]] = next((tipo for digitos, tipo in INTEIROS_COMPACTOS if largura <= digitos), 'Int64')
+            elif t[3] is str:
+                plano[t[0]] = 'category' if largura <= LARGURA_CATEGORIA else TEXTO_COMPACTO
+        for coluna in self._categorias:
+            plano[coluna] = 'category'
+        return plano
+
+    def _compacta(self):
+        """Converte as colunas para os tipos planejados por _plano_tipos, se o modo compacto estiver ativo.
+
+        Só são convertidas as colunas que ainda estão no tipo lido do arquivo (int64 ou texto), cujos valores cabem no
+        tipo planejado. As demais colunas de texto, calculadas pelo _prepare, ficam em strings do pyarrow. Os writers
+        voltam as colunas para os tipos padrão.
+        """
+        if not self._compact:
+            return
+        plano = self._plano_tipos()
+        for coluna in self._df.columns.difference(list(plano)):
+            if self._df[coluna].dtype == object and pd.api.types.infer_dtype(self._df[coluna]) == 'string':
+                plano[coluna] = TEXTO_COMPACTO
+        for coluna, tipo in plano.items():
+            if coluna not in self._df:
+                continue
+            valores = self._df[coluna]
+            if tipo in ('category', TEXTO_COMPACTO):
+                if valores.dtype == object:
+                    self._df[coluna] = valores.astype(tipo)
+            elif valores.dtype == np.int64:
+                limites = np.iinfo(tipo.lower())
+                if valores.empty or (valores.min() >= limites.min and valores.max() <= limites.max):
+                    self._df[coluna] = valores.astype(tipo)
+
+    def _decodificador_datas(self):
+        """Retorna o decodificador de datas da execução, criando um só para este parser se nenhum foi configurado.
+
+        :return pad.converter.parser.decoder.DateDecoder
+        """
+        if self._datas is None:
+            self._datas = DateDecoder()
+        return self._datas
+
+    def _dicionario_contas(self):
+        """Retorna o dicionário de contas da execução, criando um só para este parser se nenhum foi configurado.
+
+        :return pad.converter.parser.decoder.CodeDictionary ou o seu proxy, nos parsers executados em outros processos.
+        """
+        if self._contas is None:
+            self._contas = CodeDictionary()
+        return self._contas
+
+    def _conta_contabil(self, *campos):
+        """Remove os zeros à esquerda das contas contábeis, guardando-as como categorias do dicionário da execução.
+
+        Os zeros são removidos somente dos valores únicos, que são codificados de uma só vez pelo dicionário. Os códigos
+        das categorias são os mesmos em todas as tabelas da execução. Os writers convertem as categorias de volta para
+        texto.
+
+        :param campos Nomes das colunas de contas contábeis.
+        """
+        for campo in campos:
+            codes, uniques = pd.factorize(np.asarray(self._df[campo], dtype=object))
+            contas = list(pd.Index(uniques, dtype=object).str.lstrip('0'))
+            contas, categorias = self._dicionario_contas().codigos(contas)
+            codes = np.append(np.asarray(contas, dtype=np.int64), -1)[codes]  # O código -1 (NaN) aponta para o -1.
+            self._df[campo] = pd.Categorical.from_codes(codes, categories=pd.Index(categorias, dtype=object))
+
+    def _converte_valor(self, campo):
+        """Converte um campo de valor em decimal, com operações de texto.
+
+        :param campo Nome do campo de valor.
+        """
+        sinal = self._money_signs.get(campo)
+        if sinal is None:
+            valor = self._df[campo].str.lstrip('0')
+        else:
+            valor = self._df[sinal] + self._df[campo]
+        valor = pd.to_numeric(valor, downcast='integer')
+        if self._em_centavos():
+            valor = valor.fillna(0).astype('int64') if self._money_fill else valor.astype('Int64')
+        else:
+            valor = round(valor / 100, 2)
+            if self._money_fill:
+                valor = valor.fillna(0.0)
+        self._df[campo] = valor
+
     def _colspec(self):
         """Lê as especificações de colunas.
 
@@ -125,9 +566,9 @@ class ParserBase:
             for l in f:
                 h = {
                     'cnpj': l[:14],
-                    'data_inicial': datetime.strptime(l[14:22], '%d%m%Y'),
-                    'data_final': datetime.strptime(l[22:30], '%d%m%Y'),
-                    'data_geracao': datetime.strptime(l[30:38], '%d%m%Y'),
+                    'data_inicial': self._decodificador_datas().decode_one(l[14:22]),
+                    'data_final': self._decodificador_datas().decode_one(l[22:30]),
+                    'data_geracao': self._decodificador_datas().decode_one(l[30:38]),
                     'nome_entidade': l[38:]
                 }
                 break
@@ -136,80 +577,33 @@ class ParserBase:
     def _inject_entidade(self):
         """Identifica para cada linha de dados, qual entidade ela se refere e adiciona essa informação como uma nova coluna.
 
-        ATENÇÃO: se você estiver usando esse programa, terá que adaptar isso para a sua realidade. Se tentar usar do jeito que está, não terá a informação correta.
-        """
-        self._df['entidade'] = None # Insere a coluna entidade.
-        for i, r in self._df.iterrows():# Para cada linha do data frame
-            if self._df.at[i, 'cnpj'] == '12292535000162': # Se houver a coluna cnpj com o valor do CNPJ da câmara.
-                self._df.at[i, 'entidade'] = 'cm' # Identifica como da entidade cm
-            else: # Se o campo cnpj não tiver o valor da câmara
-                if 'fonte_recurso' in self._df: # Verifica pelo campo do fonte_recurso
-                    if self._df.at[i, 'fonte_recurso'] == 800:
-                        self._df.at[i, 'entidade'] = 'fpsm'
-                    elif self._df.at[i, 'fonte_recurso'] == 801:
-                        self._df.at[i, 'entidade'] = 'fpsm'
-                    elif self._df.at[i, 'fonte_recurso'] == 802:
-                        self._df.at[i, 'entidade'] = 'fpsm'
-                    elif self._df.at[i, 'fonte_recurso'] == 803:
-                        self._df.at[i, 'entidade'] = 'fpsm'
-                    else:
-                        if 'orgao' in self._df: # Verifica pelo órgão
-                            if self._df.at[i, 'orgao'] == 12: # do RPPS
-                                self._df.at[i, 'entidade'] = 'fpsm'
-                            else:
-                                if 'fonte_recurso' in self._df:
-                                    if self._df.at[i, 'fonte_recurso'] == 800:
-                                        self._df.at[i, 'entidade'] = 'fpsm'
-                                    elif self._df.at[i, 'fonte_recurso'] == 801:
-                                        self._df.at[i, 'entidade'] = 'fpsm'
-                                    elif self._df.at[i, 'fonte_recurso'] == 802:
-                                        self._df.at[i, 'entidade'] = 'fpsm'
-                                    elif self._df.at[i, 'fonte_recurso'] == 803:
-                                        self._df.at[i, 'entidade'] = 'fpsm'
-                                    else:
-                                        self._df.at[i, 'entidade'] = 'pm'
-                elif 'entidade_empenho' in self._df: # verifica pelo campo entidade_empenho
-                    if self._df.at[i, 'entidade_empenho'] == 1:
-                        self._df.at[i, 'entidade'] = 'fpsm'
-                    else:
-                        self._df.at[i, 'entidade'] = 'pm'
-                elif 'fonte_recurso_suplementacao' in self._df: # Verifica pelo campo do recurso_vinculado
-                    # print(self._df.at[i, 'recurso_vinculado_suplementacao'], type(self._df.at[i, 'recurso_vinculado_suplementacao']))
-                    # exit()
-                    if self._df.at[i, 'fonte_recurso_suplementacao'] == 800:
-                        self._df.at[i, 'entidade'] = 'fpsm'
-                    elif self._df.at[i, 'fonte_recurso_suplementacao'] == 801:
-                        self._df.at[i, 'entidade'] = 'fpsm'
-                    elif self._df.at[i, 'fonte_recurso_suplementacao'] == 802:
-                        self._df.at[i, 'entidade'] = 'fpsm'
-                    elif self._df.at[i, 'fonte_recurso_suplementacao'] == 803:
-                        self._df.at[i, 'entidade'] = 'fpsm'
-                    else:
-                        self._df.at[i, 'entidade'] = 'pm'
-                elif 'fonte_recurso_reducao' in self._df: # Verifica pelo campo do recurso_vinculado
-                    if self._df.at[i, 'fonte_recurso_reducao'] == 800:
-                        self._df.at[i, 'entidade'] = 'fpsm'
-                    elif self._df.at[i, 'recurso_vinculado_reducao'] == 801:
-                        self._df.at[i, 'entidade'] = 'fpsm'
-                    elif self._df.at[i, 'fonte_recurso_reducao'] == 802:
-                        self._df.at[i, 'entidade'] = 'fpsm'
-                    elif self._df.at[i, 'fonte_recurso_reducao'] == 803:
-                        self._df.at[i, 'entidade'] = 'fpsm'
-                    else:
-                        self._df.at[i, 'entidade'] = 'pm'
-                elif 'orgao' in self._df:
-                    if self._df.at[i, 'orgao'] == 1:
-                        self._df.at[i, 'entidade'] = 'cm'
-                    elif self._df.at[i, 'orgao'] == 12:
-                        self._df.at[i, 'entidade'] = 'fpsm'
-                    else:
-                        self._df.at[i, 'entidade'] = 'pm'
-                else: # Se nenhum padrão casar, deixa em branco.
-                    self._df.at[i, 'entidade'] = ''
-
-    def _save_to_cache(self):
+        ATENÇÃO: se você estiver usando esse programa, terá que adaptar isso para a sua realidade, configurando os códigos
+        do classificador (veja pad.converter.entidade). Se tentar usar do jeito que está, não terá a informação correta.
+        """
+        self._df['entidade'] = self._entidades.classify(self._df)
+
+    def _save_to_cache(self, part=None):
         """Salva o pandas.DataFrame em cache.
+
+        No modo streaming, cada bloco é salvo como uma parte em um diretório com o nome da tabela. Restos de uma
+        execução anterior no outro formato são apagados para que a tabela não seja escrita duas vezes.
+
+        :param part Número do bloco no modo streaming. Se None, salva a tabela inteira em um único arquivo.
         """
-        destiny = path.join(self._cache, f'{self._file_name}.pkl')
+        cache_format = FORMATOS[self._cache_format]
+        single = path.join(self._cache, f'{self._file_name}{cache_format.extension}')
+        parts = path.join(self._cache, self._file_name)
+        if part is None:
+            destiny = single
+            if path.isdir(parts):
+                shutil.rmtree(parts)
+        else:
+            destiny = path.join(parts, f'{part:05d}{cache_format.extension}')
+            if part == 0:
+                if path.exists(single):
+                    remove(single)
+                if path.isdir(parts):
+                    shutil.rmtree(parts)
+                makedirs(parts)
         self._logger.debug(f'Salvando {self._file_name} para {destiny}')
-        self._df.to_pickle(destiny)
+        cache_format.write(self._df, destiny)
@@ -0,0 +1,93 @@
+"""Módulo base para os parsers de balancete de verificação (BAL_VER, BVER_ANT e BVER_ENC).
+"""
+import numpy as np
+
+from pad.converter.parser import ParserBase
+from pad.converter.parser.decoder import arredonda
+
+CLASSES_DEVEDORAS = ('1', '3', '5', '7')  # Classes (primeiro dígito da conta contábil) de natureza devedora
+
+
+class BalanceteParser(ParserBase):
+    """Classe base para os parsers de balancete de verificação.
+
+    Os saldos e movimentações são calculados coluna a coluna, a partir da natureza da classe de cada conta contábil.
+    """
+    _money = (
+        'saldo_anterior_devedor',
+        'saldo_anterior_credor',
+        'movimento_devedor',
+        'movimento_credor',
+        'saldo_atual_devedor',
+        'saldo_atual_credor',
+    )
+    _money_derived = (
+        'valor_saldo_inicial',
+        'valor_saldo_final',
+        'saldo_inicial',
+        'debitos',
+        'creditos',
+        'saldo_final',
+    )
+    _categorias = (
+        'cnpj',
+        'entidade',
+        'natureza_saldo_inicial',
+        'natureza_saldo_final',
+    )
+
+    def _prepare(self):
+        self._converte_valores()
+        self._calcula_saldos()
+
+    def _calcula_saldos(self):
+        """Calcula de uma só vez os saldos consolidados (valor e natureza D/C) e os saldos e movimentações pela natureza
+        da conta.
+
+        A classe dos saldos consolidados é lida da conta contábil como veio no arquivo. A dos saldos pela natureza, da
+        conta contábil sem os zeros à esquerda.
+        """
+        devedora = self._classe_devedora()
+        self._consolida_saldo(devedora, 'saldo_anterior', 'saldo_inicial')
+        self._consolida_saldo(devedora, 'saldo_atual', 'saldo_final')
+        self._conta_contabil('conta_contabil')
+        devedora = self._classe_devedora()
+        cents = self._em_centavos()
+        self._df['saldo_inicial'] = arredonda(self._pela_natureza(devedora, 'saldo_anterior_devedor', 'saldo_anterior_credor'), cents)
+        self._df['debitos'] = arredonda(np.where(devedora, 1, -1) * self._df['movimento_devedor'], cents)
+        self._df['creditos'] = arredonda(np.where(devedora, -1, 1) * self._df['movimento_credor'], cents)
+        self._df['saldo_final'] = arredonda(self._pela_natureza(devedora, 'saldo_atual_devedor', 'saldo_atual_credor'), cents)
+
+    def _pela_natureza(self, devedora, devedor, credor):
+        """Calcula um saldo pela natureza da conta: devedor - credor nas contas devedoras e credor - devedor nas credoras.
+
+        A subtração é feita na ordem da natureza, e não com a troca de sinal, para que os saldos zerados das contas
+        credoras fiquem 0.0 e não -0.0.
+
+        :param devedora Máscara das contas de natureza devedora.
+        :param devedor Nome da coluna do saldo devedor.
+        :param credor Nome da coluna do saldo credor.
+
+        :return numpy.ndarray
+        """
+        return np.where(devedora, self._df[devedor] - self._df[credor], self._df[credor] - self._df[devedor])
+
+    def _classe_devedora(self):
+        """Identifica as contas contábeis de natureza devedora.
+
+        :return numpy.ndarray de bool
+        """
+        return self._df['conta_contabil'].str[:1].isin(CLASSES_DEVEDORAS).to_numpy()
+
+    def _consolida_saldo(self, devedora, saldo, destino):
+        """Consolida os saldos devedor e credor em um valor positivo e a sua natureza (D, C ou vazia, se zerado).
+
+        :param devedora Máscara das contas de natureza devedora.
+        :param saldo Prefixo das colunas de saldo devedor e credor (saldo_anterior ou saldo_atual).
+        :param destino Sufixo das colunas valor_ e natureza_ que serão criadas (saldo_inicial ou saldo_final).
+        """
+        diferenca = self._df[f'{saldo}_devedor'] - self._df[f'{saldo}_credor']
+        valor = arredonda(np.where(devedora, diferenca, -diferenca), self._em_centavos())
+        natureza = np.select([valor > 0, valor < 0], [np.where(devedora, 'D', 'C'), np.where(devedora, 'C', 'D')], '')
+        self._df[f'valor_{destino}'] = abs(valor)
+        self._df[f'natureza_{destino}'] = natureza.astype(object)
@@ -1,5 +1,3 @@
-import pandas as pd
-
 from pad.converter.parser import ParserBase
 
 
@@ -37,29 +35,42 @@ class BalDesp(ParserBase):
         # ('acompanhamento_orcamentario', 261, 264, int) #removido a partir de jan/2023
     )
 
+    _money = (
+        'dotacao_inicial',
+        'atualizacao_monetaria',
+        'credito_suplementar',
+        'credito_especial',
+        'credito_extraordinario',
+        'reducao_dotacao',
+        # 'suplementacao_recurso_vinculado', removido a partir de jan/2023
+        # 'reducao_recurso_vinculado', removido a partir de jan/2023
+        'valor_empenhado',
+        'valor_liquidado',
+        'valor_pago',
+        'valor_limitado',
+        'valor_recomposto',
+        'previsao_realizacao',
+        'transferencia',
+        'transposicao',
+        'remanejamento',
+    )
+    _money_derived = (
+        'dotacao_atualizada',
+        'credito_adicional',
+        'dotacao_a_empenhar',
+        'empenhado_a_liquidar',
+        'empenhado_a_pagar',
+        'liquidado_a_pagar',
+    )
+    _cents_support = True
+
     def __init__(self, logger, sources: list):
         self._logger = logger
         self._sources = sources
 
     def _prepare(self):
         # pass
-        self._converte_valor('dotacao_inicial')
-        self._converte_valor('atualizacao_monetaria')
-        self._converte_valor('credito_suplementar')
-        self._converte_valor('credito_especial')
-        self._converte_valor('credito_extraordinario')
-        self._converte_valor('reducao_dotacao')
-        # self._converte_valor('suplementacao_recurso_vinculado') removido a partir de jan/2023
-        # self._converte_valor('reducao_recurso_vinculado') removido a partir de jan/2023
-        self._converte_valor('valor_empenhado')
-        self._converte_valor('valor_liquidado')
-        self._converte_valor('valor_pago')
-        self._converte_valor('valor_limitado')
-        self._converte_valor('valor_recomposto')
-        self._converte_valor('previsao_realizacao')
-        self._converte_valor('transferencia')
-        self._converte_valor('transposicao')
-        self._converte_valor('remanejamento')
+        self._converte_valores()
         self._dotacao_atualizada()
         self._credito_adicional()
         self._dotacao_a_empenhar()
@@ -67,13 +78,6 @@ class BalDesp(ParserBase):
         self._empenhado_a_pagar()
         self._liquidado_a_pagar()
 
-    def _converte_valor(self, campo):
-        """Converte o valor em decimal."""
-        self._df[campo] = self._df[campo].str.lstrip('0')
-        self._df[campo] = pd.to_numeric(self._df[campo], downcast='integer')
-        self._df[campo] = round(self._df[campo] / 100, 2)
-        self._df[campo] = self._df[campo].fillna(0.0)
-
     def _dotacao_atualizada(self):
         self._df['dotacao_atualizada'] = round(
             self._df['dotacao_inicial'].fillna(0.0) + self._df['atualizacao_monetaria'].fillna(0.0) + self._df['credito_suplementar'].fillna(0.0) +
@@ -1,5 +1,3 @@
-import pandas as pd
-
 from pad.converter.parser import ParserBase
 
 
@@ -38,30 +36,34 @@ class BRubAnt(ParserBase):
         ('acompanhamento_orcamentario', 247, 250, int)
     )
 
+    _money = (
+        'empenhado_1bim',
+        'empenhado_2bim',
+        'empenhado_3bim',
+        'empenhado_4bim',
+        'empenhado_5bim',
+        'empenhado_6bim',
+        'liquidado_1bim',
+        'liquidado_2bim',
+        'liquidado_3bim',
+        'liquidado_4bim',
+        'liquidado_5bim',
+        'liquidado_6bim',
+        'pago_1bim',
+        'pago_2bim',
+        'pago_3bim',
+        'pago_4bim',
+        'pago_5bim',
+        'pago_6bim',
+    )
+
     def __init__(self, logger, sources: list):
         self._logger = logger
         self._sources = sources
 
     def _prepare(self):
         # pass
-        self._converte_valor('empenhado_1bim')
-        self._converte_valor('empenhado_2bim')
-        self._converte_valor('empenhado_3bim')
-        self._converte_valor('empenhado_4bim')
-        self._converte_valor('empenhado_5bim')
-        self._converte_valor('empenhado_6bim')
-        self._converte_valor('liquidado_1bim')
-        self._converte_valor('liquidado_2bim')
-        self._converte_valor('liquidado_3bim')
-        self._converte_valor('liquidado_4bim')
-        self._converte_valor('liquidado_5bim')
-        self._converte_valor('liquidado_6bim')
-        self._converte_valor('pago_1bim')
-        self._converte_valor('pago_2bim')
-        self._converte_valor('pago_3bim')
-        self._converte_valor('pago_4bim')
-        self._converte_valor('pago_5bim')
-        self._converte_valor('pago_6bim')
+        self._converte_valores()
         self._empenhado()
         self._liquidado()
         self._pago()
@@ -69,13 +71,6 @@ class BRubAnt(ParserBase):
         self._empenhado_a_pagar()
         self._liquidado_a_pagar()
 
-    def _converte_valor(self, campo):
-        """Converte o valor em decimal."""
-        self._df[campo] = self._df[campo].str.lstrip('0')
-        self._df[campo] = pd.to_numeric(self._df[campo], downcast='integer')
-        self._df[campo] = round(self._df[campo] / 100, 2)
-        self._df[campo] = self._df[campo].fillna(0.0)
-
     def _empenhado(self):
         self._df['valor_empenhado'] = round(self._df.loc[:, 'empenhado_1bim':'empenhado_6bim'].sum(axis=1), 2)
 
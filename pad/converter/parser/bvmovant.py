@@ -1,5 +1,3 @@
-import pandas as pd
-
 from pad.converter.parser import ParserBase
 
 
@@ -23,29 +21,26 @@ class BVMovAnt(ParserBase):
         ('movimento_credito_6bim', 168, 180, str)
     )
 
+    _money = (
+        'movimento_debito_1bim',
+        'movimento_credito_1bim',
+        'movimento_debito_2bim',
+        'movimento_credito_2bim',
+        'movimento_debito_3bim',
+        'movimento_credito_3bim',
+        'movimento_debito_4bim',
+        'movimento_credito_4bim',
+        'movimento_debito_5bim',
+        'movimento_credito_5bim',
+        'movimento_debito_6bim',
+        'movimento_credito_6bim',
+    )
+
     def __init__(self, logger, sources: list):
         self._logger = logger
         self._sources = sources
 
     def _prepare(self):
-        self._df['conta_contabil'] = [el.lstrip('0') for el in self._df['conta_contabil']]
-        self._converte_valor('movimento_debito_1bim')
-        self._converte_valor('movimento_credito_1bim')
-        self._converte_valor('movimento_debito_2bim')
-        self._converte_valor('movimento_credito_2bim')
-        self._converte_valor('movimento_debito_3bim')
-        self._converte_valor('movimento_credito_3bim')
-        self._converte_valor('movimento_debito_4bim')
-        self._converte_valor('movimento_credito_4bim')
-        self._converte_valor('movimento_debito_5bim')
-        self._converte_valor('movimento_credito_5bim')
-        self._converte_valor('movimento_debito_6bim')
-        self._converte_valor('movimento_credito_6bim')
-
-    def _converte_valor(self, campo):
-        """Converte o valor em decimal."""
-        self._df[campo] = self._df[campo].str.lstrip('0')
-        self._df[campo] = pd.to_numeric(self._df[campo], downcast='integer')
-        self._df[campo] = round(self._df[campo] / 100, 2)
-        self._df[campo] = self._df[campo].fillna(0.0)
+        self._conta_contabil('conta_contabil')
+        self._converte_valores()
 
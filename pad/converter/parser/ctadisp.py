@@ -26,4 +26,4 @@ class CtaDisp(ParserBase):
         self._sources = sources
 
     def _prepare(self):
-        self._df['conta_contabil'] = [el.lstrip('0') for el in self._df['conta_contabil']]
+        self._conta_contabil('conta_contabil')
@@ -1,5 +1,3 @@
-import pandas as pd
-
 from pad.converter.parser import ParserBase
 
 
@@ -23,23 +21,22 @@ class CtaOper(ParserBase):
         ('acompanhamento_orcamentario', 113, 116, int)
     )
 
+    _money = (
+        'valor',
+    )
+    _money_signs = {'valor': 'sinal_valor'}
+    _money_fill = False
+
     def __init__(self, logger, sources: list):
         self._logger = logger
         self._sources = sources
 
     def _prepare(self):
-        self._df['conta_contabil'] = [el.lstrip('0') for el in self._df['conta_contabil']]
+        self._conta_contabil('conta_contabil')
         self._data()
-        self._valor()
+        self._converte_valores()
 
 
     def _data(self):
         """Converte DDMMAAAA para o formato de data do Pandas."""
-        self._df['data'] = pd.to_datetime(self._df['data'], format='%d%m%Y', exact=True)
-
-    def _valor(self):
-        """Converte o valor do empenho em decimal e remove o sinal."""
-        self._df['valor'] = self._df['sinal_valor'] + self._df['valor']
-        del self._df['sinal_valor']
-        self._df['valor'] = pd.to_numeric(self._df['valor'], downcast='integer')
-        self._df['valor'] = round(self._df['valor'] / 100, 2)
\ No newline at end of file
+        self._df['data'] = self._decodificador_datas().decode(self._df['data'])
\ No newline at end of file
@@ -0,0 +1,392 @@
+"""Decodificadores em lote dos campos do PAD.
+
+Os valores monetários dos txt do PAD têm duas casas decimais implícitas (0000000012345 é 123,45) e, em algumas
+tabelas, vêm acompanhados de um campo de sinal (+ ou -). Em vez de converter campo a campo com operações de texto, o
+MoneyDecoder junta todos os campos de valor da tabela em uma única matriz de bytes e os transforma em centavos (int64)
+de uma só vez, o que também torna as somas exatas. A visão em float é idêntica à conversão original
+(str.lstrip('0'), pd.to_numeric, / 100 e round(…, 2)).
+
+No modo centavos, as tabelas mantêm os valores em int64 (Int64 nos campos que podem ficar ausentes) até os writers,
+que os convertem para reais com to_reais.
+
+Os bytes podem vir direto do arquivo (motor 'numpy') ou das strings já lidas por pd.read_fwf. Campos fora do padrão
+(caracteres que não são dígitos, sinais diferentes de + e -, mais de 18 dígitos) não são decodificados e quem chamou
+deve convertê-los como antes.
+
+As datas vêm no formato DDMMAAAA e se repetem muito (um ano tem cerca de 365 datas distintas). O DateDecoder converte
+somente os valores únicos de cada coluna e guarda o resultado em cache para as colunas, blocos e arquivos seguintes.
+O App cria um DateDecoder por execução e o repassa aos parsers, então o cache vive só enquanto a conversão.
+
+As contas contábeis também se repetem muito e aparecem em várias tabelas. O CodeDictionary da execução dá a cada conta
+(sem os zeros à esquerda) um código que vale para todas as tabelas, de modo que as contas de PAGAMENT, BAL_VER e das
+demais tabelas podem ser comparadas e juntadas pelos códigos das categorias. Os parsers executados em outros processos
+usam o dicionário do App por meio do ContasManager.
+
+Assim como os valores em centavos, as colunas em tipos compactos (as categorias das contas e, no modo compacto, os
+inteiros anuláveis, as demais categorias e os textos do pyarrow) são convertidas de volta para os tipos padrão pelos
+writers, com to_padrao.
+"""
+import threading
+from multiprocessing.managers import BaseManager
+
+import numpy as np
+import pandas as pd
+
+_ZERO = 48  # Código ASCII do dígito 0
+_PLUS = 43  # Código ASCII do +
+_MINUS = 45  # Código ASCII do -
+_BLANKS = (0, 9, 32)  # \0, tabulação e espaço, que podem cercar os dígitos
+_MAX_DIGITS = 18  # Maior quantidade de dígitos que sempre cabe em int64
+_DATE_FORMAT = '%d%m%Y'  # Formato das datas nos txt do PAD
+_NAT = np.datetime64('NaT', 'ns')  # Data ausente
+
+CENTAVOS = 'centavos'  # Chave de pandas.DataFrame.attrs com os nomes das colunas de valor mantidas em centavos
+
+
+def to_reais(df):
+    """Converte para reais as colunas que uma tabela mantém em centavos, para exibição.
+
+    As colunas são as listadas em df.attrs[CENTAVOS]. A conversão (centavos / 100) é exata na segunda casa decimal.
+
+    :param df pandas.DataFrame
+
+    :return pandas.DataFrame com as colunas em reais (float64), ou o próprio df, se ele não tiver colunas em centavos.
+    """
+    if CENTAVOS not in df.attrs:
+        return df
+    columns = [c for c in df.attrs[CENTAVOS] if c in df]
+    df = df.assign(**{c: df[c].astype('float64') / 100 for c in columns})
+    df.attrs = {k: v for k, v in df.attrs.items() if k != CENTAVOS}
+    return df
+
+
+def to_padrao(df):
+    """Converte para os tipos padrão do pandas as colunas que uma tabela mantém em tipos compactos, para exibição.
+
+    Categorias e textos do pyarrow viram texto (com NaN para os vazios) e inteiros anuláveis viram int64 ou, se tiverem
+    valores ausentes, float64.
+
+    :param df pandas.DataFrame
+
+    :return pandas.DataFrame com as colunas nos tipos padrão, ou o próprio df, se ele não tiver colunas compactas.
+    """
+    columns = {}
+    for name, dtype in df.dtypes.items():
+        if isinstance(dtype, pd.CategoricalDtype):
+            columns[name] = df[name].astype(object)
+        elif isinstance(dtype, pd.StringDtype):
+            columns[name] = df[name].astype(object).where(df[name].notna(), np.nan)
+        elif isinstance(dtype, pd.api.extensions.ExtensionDtype) and dtype.kind in 'iu':
+            columns[name] = df[name].astype('float64' if df[name].hasnans else 'int64')
+    if not columns:
+        return df
+    return df.assign(**columns)
+
+
+def concat_chunks(chunks):
+    """Junta em um único pandas.DataFrame os blocos de uma tabela, com o resultado que pd.concat sempre teve.
+
+    Os blocos vazios são descartados (exceto se todos forem vazios, para manter a estrutura da tabela) e as colunas que
+    estão inteiramente ausentes em um bloco, e por isso ficaram em outro tipo (por exemplo, object em vez de texto do
+    pyarrow no modo compacto), recebem o tipo da coluna nos demais blocos antes da junção.
+
+    :param chunks Iterável de pandas.DataFrame
+
+    :return pandas.DataFrame
+    """
+    chunks = list(chunks)
+    chunks = [c for c in chunks if len(c)] or chunks[:1]
+    dtypes = {}
+    for chunk in chunks:
+        for name, dtype in chunk.dtypes.items():
+            if name not in dtypes and chunk[name].notna().any():
+                dtypes[name] = dtype
+    for i, chunk in enumerate(chunks):
+        columns = {name: dtypes[name] for name, dtype in chunk.dtypes.items()
+                   if name in dtypes and dtype != dtypes[name] and chunk[name].isna().all()
+                   and (isinstance(dtypes[name], pd.api.extensions.ExtensionDtype) or dtypes[name].kind == 'f')}
+        if columns:
+            chunks[i] = chunk.astype(columns)
+    return pd.concat(chunks, axis=0, ignore_index=True)
+
+
+def valor_zero(cents):
+    """Retorna o zero no tipo das colunas de valor, para inicializar as colunas calculadas.
+
+    :param cents Se os valores estão em centavos (int64).
+
+    :return 0 (centavos) ou 0.0 (reais)
+    """
+    return 0 if cents else 0.0
+
+
+def arredonda(valores, cents):
+    """Arredonda valores em reais para os centavos. No modo centavos, os valores já são exatos e voltam como estão.
+
+    :param valores Valor ou valores calculados (numpy.float64, numpy.ndarray ou pandas.Series).
+    :param cents Se os valores estão em centavos (int64).
+
+    :return Valores arredondados.
+    """
+    return valores if cents else np.round(valores, 2)
+
+
+class MoneyDecoder:
+    """Decodificador dos campos de valor de uma tabela para centavos.
+    """
+    _fields = ()  # Campos de valor
+    _signs = {}  # Campo de sinal de cada campo de valor que tiver um
+    _fill = True  # Se os valores ausentes viram 0.0 (True) ou NaN (False) na visão em float
+
+    def __init__(self, fields, signs=None, fill=True):
+        """Construtor do decodificador.
+
+        :param fields Nomes dos campos de valor.
+        :param signs Dicionário com o campo de sinal de cada campo de valor que tiver um.
+        :param fill Se os valores ausentes viram 0.0 (True) ou NaN (False) na visão em float. Sem campo de sinal, valores
+        zerados também são considerados ausentes, como fazia a conversão original com str.lstrip('0').
+        """
+        self._fields = tuple(fields)
+        self._signs = dict(signs or {})
+        self._fill = fill
+
+    def fields(self):
+        """Retorna os campos de valor e os seus campos de sinal.
+
+        :return Tupla (campos de valor, campos de sinal).
+        """
+        return self._fields, tuple(self._signs.values())
+
+    def decode_strings(self, df):
+        """Decodifica os campos de valor de um pandas.DataFrame em que eles ainda são texto.
+
+        :param df pandas.DataFrame com os campos como lidos por pd.read_fwf.
+
+        :return Dicionário {campo: (centavos, ausentes, negativos)} somente com os campos que puderam ser
+        decodificados.
+        """
+        fields = {}
+        signs = {}
+        for name in self._fields:
+            if name not in df or df[name].dtype != object:
+                continue
+            fields[name] = self._to_bytes(df[name])
+            sign = self._signs.get(name)
+            if sign is not None:
+                signs[sign] = self._to_bytes(df[sign]) if sign in df and df[sign].dtype == object else None
+        return self.decode_bytes(fields, signs, len(df))
+
+    def decode_bytes(self, fields, signs, rows):
+        """Decodifica de uma só vez os bytes de todos os campos de valor.
+
+        :param fields Dicionário {campo: matriz uint8 (linhas x bytes) ou None}.
+        :param signs Dicionário {campo de sinal: matriz uint8 (linhas x bytes) ou None}.
+        :param rows Quantidade de linhas.
+
+        :return Dicionário {campo: (centavos, ausentes, negativos)} somente com os campos que puderam ser
+        decodificados. negativos marca os valores com sinal -, inclusive os zerados, que em centavos perdem o sinal.
+        """
+        names = [name for name, raw in fields.items() if raw is not None]
+        if not names:
+            return {}
+        width = max(fields[name].shape[1] for name in names)
+        stacked = np.zeros((rows, len(names), width), dtype=np.uint8)  # \0 completa os campos mais estreitos
+        for i, name in enumerate(names):
+            stacked[:, i, :fields[name].shape[1]] = fields[name]
+        digits = stacked - np.uint8(_ZERO)
+        is_digit = digits < 10
+        is_blank = np.isin(stacked, _BLANKS)
+        starts = is_digit.copy()
+        starts[:, :, 1:] &= ~is_digit[:, :, :-1]
+        # Cada campo deve ter somente dígitos contíguos, cercados ou não de brancos.
+        valid = ((is_digit | is_blank).all(axis=2) & (starts.sum(axis=2) <= 1)
+                 & (is_digit.sum(axis=2) <= _MAX_DIGITS))
+        cents = np.zeros((rows, len(names)), dtype=np.int64)
+        for j in range(width):
+            cents = np.where(is_digit[:, :, j], cents * 10 + digits[:, :, j], cents)
+        present = is_digit.any(axis=2)
+        result = {}
+        for i, name in enumerate(names):
+            if not valid[:, i].all():
+                continue
+            values = cents[:, i]
+            sign = self._signs.get(name)
+            if sign is None:
+                missing = values == 0  # Sem dígitos ou zerado
+                negative = np.zeros(rows, dtype=bool)
+            else:
+                negative = self._decode_sign(signs.get(sign), rows)
+                if negative is None:
+                    continue
+                missing = ~present[:, i] | (negative < 0)
+                negative = (negative == 1) & ~missing
+                values = np.where(negative, -values, values)
+            result[name] = (np.where(missing, 0, values), missing, negative)
+        return result
+
+    def to_cents(self, cents, missing, negative):
+        """Gera a visão em centavos de um campo decodificado.
+
+        Sem _fill, o campo fica em um inteiro anulável (Int64), com os valores ausentes como pd.NA, nas mesmas linhas
+        em que a visão em float tem NaN. Os zeros com sinal - viram 0, já que int64 não tem zero negativo.
+
+        :param cents numpy.ndarray de int64 com os centavos.
+        :param missing numpy.ndarray de bool com os valores ausentes.
+        :param negative numpy.ndarray de bool com os valores com sinal -.
+
+        :return numpy.ndarray de int64 ou pandas.arrays.IntegerArray
+        """
+        if self._fill:
+            return cents
+        return pd.arrays.IntegerArray(cents, missing.copy())
+
+    def to_float(self, cents, missing, negative):
+        """Gera a visão em float (em reais) de um campo decodificado.
+
+        Os zeros com sinal - viram -0.0, como na conversão original (pd.to_numeric('-000')), e são escritos como -0,0.
+
+        :param cents numpy.ndarray de int64 com os centavos.
+        :param missing numpy.ndarray de bool com os valores ausentes.
+        :param negative numpy.ndarray de bool com os valores com sinal -.
+
+        :return numpy.ndarray de float64
+        """
+        values = np.copysign(cents / 100, np.where(negative, -1.0, 1.0))
+        if not self._fill:
+            values[missing] = np.nan
+        return values
+
+    def _decode_sign(self, raw, rows):
+        """Decodifica um campo de sinal.
+
+        :param raw Matriz uint8 (linhas x bytes) com o campo de sinal ou None.
+        :param rows Quantidade de linhas.
+
+        :return numpy.ndarray de int8 com 0 para +, 1 para - e -1 para sinal ausente ou None se o campo estiver fora do
+        padrão.
+        """
+        if raw is None:
+            return None
+        is_blank = np.isin(raw, _BLANKS)
+        is_sign = (raw == _PLUS) | (raw == _MINUS)
+        if not (is_blank | is_sign).all() or (is_sign.sum(axis=1) > 1).any():
+            return None
+        negative = np.full(rows, -1, dtype=np.int8)
+        negative[(raw == _PLUS).any(axis=1)] = 0
+        negative[(raw == _MINUS).any(axis=1)] = 1
+        return negative
+
+    def _to_bytes(self, series):
+        """Converte uma coluna de texto (com NaN para os vazios) em uma matriz de bytes.
+
+        :param series pandas.Series de objetos.
+
+        :return Matriz uint8 (linhas x bytes) ou None, se algum valor não for texto ASCII.
+        """
+        values = series.to_numpy(dtype=object)
+        missing = pd.isna(values)
+        if missing.any():
+            values = values.copy()
+            values[missing] = ''
+        try:
+            raw = values.astype(np.bytes_)
+        except (UnicodeEncodeError, TypeError, ValueError):
+            return None
+        return raw.view(np.uint8).reshape(len(values), raw.dtype.itemsize)
+
+
+class DateDecoder:
+    """Decodificador de datas DDMMAAAA com cache dos valores já convertidos.
+    """
+    _cache = {}  # Data (numpy.datetime64) de cada texto já convertido com sucesso
+
+    def __init__(self):
+        """Construtor do decodificador.
+        """
+        self._cache = {}
+
+    def decode(self, values, errors='raise'):
+        """Converte uma coluna de datas DDMMAAAA.
+
+        O resultado é o mesmo de pd.to_datetime(values, format='%d%m%Y', exact=True, errors=errors), mas somente os
+        valores únicos que ainda não estão no cache são convertidos.
+
+        :param values pandas.Series (ou sequência) de textos, com NaN para os vazios.
+        :param errors 'raise' para levantar ValueError com datas inválidas ou 'coerce' para convertê-las em NaT.
+
+        :return numpy.ndarray de datetime64[ns]
+        """
+        codes, uniques = pd.factorize(np.asarray(values, dtype=object))
+        new = [u for u in uniques if u not in self._cache]
+        if new:
+            parsed = pd.to_datetime(pd.Series(new, dtype=object), format=_DATE_FORMAT, exact=True, errors=errors)
+            for text, date in zip(new, parsed.to_numpy(dtype='datetime64[ns]')):
+                if not np.isnat(date):
+                    self._cache[text] = date
+        table = np.array([self._cache.get(u, _NAT) for u in uniques] + [_NAT], dtype='datetime64[ns]')
+        return table[codes]  # O código -1 (NaN) aponta para o NaT no final da tabela.
+
+    def decode_one(self, text):
+        """Converte uma única data DDMMAAAA, como as do cabeçalho dos arquivos.
+
+        :param text Texto com a data.
+
+        :return datetime.datetime
+        """
+        return pd.Timestamp(self.decode([text])[0]).to_pydatetime()
+
+
+class CodeDictionary:
+    """Dicionário das contas contábeis (sem os zeros à esquerda) de uma execução, compartilhado pelos parsers.
+
+    O dicionário só cresce: o código de uma conta nunca muda, então as categorias de uma tabela são sempre o início das
+    categorias das tabelas convertidas depois dela e as colunas de contas de tabelas diferentes podem ser alinhadas com
+    set_categories sem mudar os códigos.
+    """
+    _index = {}  # Código de cada conta
+    _contas = []  # Contas, na ordem dos códigos
+    _lock = None  # threading.Lock que protege o dicionário, usado ao mesmo tempo por várias etapas do App
+
+    def __init__(self, contas=()):
+        """Construtor do dicionário.
+
+        :param contas Contas já codificadas, na ordem dos códigos, como as de uma execução anterior.
+        """
+        self._contas = list(contas)
+        self._index = {conta: code for code, conta in enumerate(self._contas)}
+        self._lock = threading.Lock()
+
+    def codigos(self, contas):
+        """Retorna o código de cada conta, incluindo no dicionário as que ainda não estão nele.
+
+        :param contas Lista de contas sem os zeros à esquerda.
+
+        :return Tupla (lista com o código de cada conta, lista com todas as contas do dicionário na ordem dos códigos).
+        """
+        with self._lock:
+            codes = []
+            for conta in contas:
+                code = self._index.get(conta)
+                if code is None:
+                    code = self._index[conta] = len(self._contas)
+                    self._contas.append(conta)
+                codes.append(code)
+            return codes, list(self._contas)
+
+    def contas(self):
+        """Retorna as contas do dicionário, na ordem dos códigos.
+
+        :return list
+        """
+        with self._lock:
+            return list(self._contas)
+
+
+class ContasManager(BaseManager):
+    """Processo que mantém o CodeDictionary de uma execução para os parsers executados em outros processos.
+
+    O proxy criado por ContasManager().CodeDictionary() pode ser repassado aos processos como o próprio dicionário.
+    """
+
+
+ContasManager.register('CodeDictionary', CodeDictionary)
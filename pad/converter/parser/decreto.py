@@ -1,5 +1,3 @@
-import pandas as pd
-
 from pad.converter.parser import ParserBase
 
 
@@ -26,28 +24,25 @@ class Decreto(ParserBase):
         ('fonte_recurso_reducao', 133, 135, int)
     )
 
+    _money = (
+        'valor_credito_adicional',
+        'valor_reducao_dotacoes',
+        'valor_alteracao_orcamentaria',
+        'valor_reaberto',
+    )
+
     def __init__(self, logger, sources: list):
         self._logger = logger
         self._sources = sources
 
     def _prepare(self):
         # pass
-        self._converte_valor('valor_credito_adicional')
-        self._converte_valor('valor_reducao_dotacoes')
-        self._converte_valor('valor_alteracao_orcamentaria')
-        self._converte_valor('valor_reaberto')
+        self._converte_valores()
         self._converte_data('data_lei')
         self._converte_data('data_decreto')
         self._converte_data('data_reabertura')
 
 
-    def _converte_valor(self, campo):
-        """Converte o valor em decimal."""
-        self._df[campo] = self._df[campo].str.lstrip('0')
-        self._df[campo] = pd.to_numeric(self._df[campo], downcast='integer')
-        self._df[campo] = round(self._df[campo] / 100, 2)
-        self._df[campo] = self._df[campo].fillna(0.0)
-
     def _converte_data(self, campo):
         """Converte DDMMAAAA para o formato de data do Pandas."""
-        self._df[campo] = pd.to_datetime(self._df[campo], format='%d%m%Y', exact=True, errors='coerce')
+        self._df[campo] = self._decodificador_datas().decode(self._df[campo], errors='coerce')
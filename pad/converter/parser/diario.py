@@ -1,5 +1,3 @@
-import pandas as pd
-
 from pad.converter.parser import ParserBase
 
 
@@ -27,22 +25,19 @@ class DiarioContabil(ParserBase):
         ('codigo_acompanhamento_orcamentario', 269, 272, int)
     )
 
+    _money = (
+        'valor',
+    )
+
     def __init__(self, logger, sources: list):
         self._logger = logger
         self._sources = sources
 
     def _prepare(self):
-        self._df['conta_contabil'] = [el.lstrip('0') for el in self._df['conta_contabil']]
-        self._converte_valor('valor')
+        self._conta_contabil('conta_contabil')
+        self._converte_valores()
         self._data_lancamento()
 
-    def _converte_valor(self, campo):
-        """Converte o valor em decimal."""
-        self._df[campo] = self._df[campo].str.lstrip('0')
-        self._df[campo] = pd.to_numeric(self._df[campo], downcast='integer')
-        self._df[campo] = round(self._df[campo] / 100, 2)
-        self._df[campo] = self._df[campo].fillna(0.0)
-
     def _data_lancamento(self):
         """Converte DDMMAAAA para o formato de data do Pandas."""
-        self._df['data_lancamento'] = pd.to_datetime(self._df['data_lancamento'], format='%d%m%Y', exact=True)
\ No newline at end of file
+        self._df['data_lancamento'] = self._decodificador_datas().decode(self._df['data_lancamento'])
\ No newline at end of file
@@ -1,5 +1,3 @@
-import pandas as pd
-
 from pad.converter.parser import ParserBase
 
 
@@ -39,21 +37,21 @@ class Empenho(ParserBase):
         ('codigo_acompanhamento_orcamentario', 734, 737, int)
     )
 
+    _money = (
+        'valor_empenho',
+    )
+    _money_signs = {'valor_empenho': 'sinal_valor'}
+    _money_fill = False
+    _cents_support = True
+
     def __init__(self, logger, sources: list):
         self._logger = logger
         self._sources = sources
 
     def _prepare(self):
         self._data_empenho()
-        self._valor_empenho()
+        self._converte_valores()
 
     def _data_empenho(self):
         """Converte DDMMAAAA para o formato de data do Pandas."""
-        self._df['data_empenho'] = pd.to_datetime(self._df['data_empenho'], format='%d%m%Y', exact=True)
-
-    def _valor_empenho(self):
-        """Converte o valor do empenho em decimal e remove o sinal."""
-        self._df['valor_empenho'] = self._df['sinal_valor'] + self._df['valor_empenho']
-        del self._df['sinal_valor']
-        self._df['valor_empenho'] = pd.to_numeric(self._df['valor_empenho'], downcast='integer')
-        self._df['valor_empenho'] = round(self._df['valor_empenho'] / 100, 2)
\ No newline at end of file
+        self._df['data_empenho'] = self._decodificador_datas().decode(self._df['data_empenho'])
\ No newline at end of file
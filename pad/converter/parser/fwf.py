@@ -0,0 +1,237 @@
+"""Leitor nativo de arquivos de largura fixa (FWF).
+
+É uma alternativa ao pandas.read_fwf para os txt do PAD. Como todas as linhas de dados de um arquivo do PAD têm o
+mesmo tamanho, o _spec de cada parser é compilado uma única vez em um layout de registro e as colunas são recortadas
+diretamente de um único buffer de bytes com NumPy, sem passar pelo parser em Python puro do pandas.
+
+O resultado é idêntico ao de pd.read_fwf, exceto pelos campos de valor informados em um MoneyDecoder, que já saem
+decodificados direto dos bytes do arquivo. Sempre que o arquivo foge do formato esperado (linhas de tamanhos
+diferentes, linhas em branco, caracteres multibyte válidos, inteiros que não cabem em int64 etc.), o leitor
+retorna None e quem chamou deve usar pd.read_fwf.
+"""
+import numpy as np
+import pandas as pd
+
+_SPACE = 32  # Código ASCII do espaço
+_TAB = 9  # Código ASCII da tabulação
+_LF = 10  # Código ASCII do \n
+_CR = 13  # Código ASCII do \r
+_ZERO = 48  # Código ASCII do dígito 0
+_STRIP = ' \t\r\n'  # Caracteres removidos das pontas de cada campo, como faz o pd.read_fwf
+# Valores de texto lidos como NaN pelos dois motores: os mesmos que o pandas trata como NaN por padrão
+NA_VALUES = ('', '#N/A', '#N/A N/A', '#NA', '-1.#IND', '-1.#QNAN', '-NaN', '-nan', '1.#IND', '1.#QNAN', '<NA>', 'N/A',
+             'NA', 'NULL', 'NaN', 'None', 'n/a', 'nan', 'null')
+_NA_MAX_LENGTH = max(len(v) for v in NA_VALUES)  # Tamanho do maior desses valores
+
+
+class RecordLayout:
+    """Layout compilado de um registro de largura fixa.
+    """
+    _names = []  # Nomes das colunas
+    _starts = []  # Posição inicial (0-indexed) de cada coluna
+    _ends = []  # Limite superior externo de cada coluna
+    _types = []  # Tipo de dados de cada coluna
+    _converters = False  # Se alguma coluna possui converter
+    _decoder = None  # pad.converter.parser.decoder.MoneyDecoder dos campos de valor, se houver
+    _money = ()  # Campos de valor decodificados pelo _decoder
+    _signs = ()  # Campos de sinal usados pelo _decoder
+
+    def __init__(self, spec, decoder=None):
+        """Compila o layout a partir do _spec de um parser.
+
+        :param spec Tupla de especificações das colunas no formato (nome, início, fim, tipo[, converter]).
+        :param decoder pad.converter.parser.decoder.MoneyDecoder para os campos de valor. Se None, eles são lidos como
+        texto.
+        """
+        self._names = [t[0] for t in spec]
+        self._starts = [t[1] - 1 for t in spec]
+        self._ends = [t[2] for t in spec]
+        self._types = [t[3] for t in spec]
+        self._converters = any(len(t) == 5 for t in spec)
+        if decoder is not None:
+            self._decoder = decoder
+            self._money, self._signs = decoder.fields()
+
+    def read(self, file, cents=False):
+        """Lê os dados de um arquivo txt do PAD, ignorando a primeira (cabeçalho) e a última (finalizador) linhas.
+
+        :param file Caminho para o arquivo txt de dados.
+        :param cents Se os campos de valor decodificados ficam em centavos (int64) em vez de reais (float64).
+
+        :return pandas.DataFrame ou None, se o arquivo não puder ser lido por este layout.
+        """
+        with open(file, 'rb') as f:
+            buffer = f.read()
+        return self.parse(buffer, cents)
+
+    def parse(self, buffer, cents=False):
+        """Converte o conteúdo bruto de um arquivo txt do PAD em um pandas.DataFrame.
+
+        :param buffer bytes com o conteúdo do arquivo, incluindo cabeçalho e finalizador.
+        :param cents Se os campos de valor decodificados ficam em centavos (int64) em vez de reais (float64).
+
+        :return pandas.DataFrame ou None, se o conteúdo não puder ser lido por este layout.
+        """
+        if self._converters:
+            return None
+        records = self._records(buffer)
+        if records is None:
+            return None
+        data = {}
+        money = {}  # Bytes dos campos de valor
+        signs = {}  # Bytes dos campos de sinal
+        blank = np.ones(len(records), dtype=bool)  # Linhas cujos campos estão todos em branco
+        for name, start, end, typ in zip(self._names, self._starts, self._ends, self._types):
+            field = self._field(records, start, end)
+            if name in self._signs:
+                signs[name] = field
+            if name in self._money:
+                money[name] = field
+                blank &= ((field == _SPACE) | (field == _TAB)).all(axis=1)
+                data[name] = None  # Decodificado abaixo, mantendo a ordem das colunas
+                continue
+            if typ is int:
+                values, empty = self._to_int(field)
+            elif typ is str:
+                values, empty = self._to_str(field)
+            else:
+                return None
+            if values is None:
+                return None
+            blank &= empty
+            data[name] = values
+        if blank.any():  # O pd.read_fwf descarta linhas em branco.
+            return None
+        if money:
+            decoded = self._decoder.decode_bytes(money, signs, len(records))
+            for name, field in money.items():
+                if name in decoded:
+                    data[name] = (self._decoder.to_cents if cents else self._decoder.to_float)(*decoded[name])
+                else:  # Fora do padrão: fica como texto para a conversão original.
+                    data[name], empty = self._to_str(field)
+        return pd.DataFrame(data, copy=False)
+
+    def _records(self, buffer):
+        """Monta a matriz (linhas x bytes) dos registros, descartando cabeçalho e finalizador pelo deslocamento em bytes.
+
+        Também verifica se todos os registros têm o mesmo tamanho e se cada caractere corresponde a exatamente um
+        byte, como ocorre quando o pd.read_fwf decodifica em utf-8 (com encoding_errors='replace') um arquivo ASCII ou
+        latin-1.
+
+        :param buffer bytes com o conteúdo do arquivo.
+
+        :return numpy.ndarray de uint8 (uma linha por registro) ou None se o conteúdo não puder ser lido pelo layout.
+        """
+        start = buffer.find(b'\n') + 1  # Fim do cabeçalho
+        if start == 0:
+            return None
+        last = len(buffer) - 1 if buffer.endswith(b'\n') else len(buffer)
+        end = buffer.rfind(b'\n', start, last) + 1  # Início do finalizador
+        stride = buffer.find(b'\n', start, end) - start + 1
+        if end <= start or stride <= 0:
+            return None
+        n = (end - start) // stride
+        if n * stride != end - start:
+            return None
+        body = np.frombuffer(buffer, dtype=np.uint8, count=end - start, offset=start)
+        raw = body.reshape(n, stride)
+        terminator = 2 if stride > 1 and raw[0, -2] == _CR else 1
+        if not (raw[:, -1] == _LF).all() or (terminator == 2 and not (raw[:, -2] == _CR).all()):
+            return None
+        control = body[np.flatnonzero(body < _SPACE)]  # \n, \r ou \0 fora do terminador quebrariam as linhas.
+        if (np.count_nonzero(control == _LF) != n or np.count_nonzero(control == _CR) != (n if terminator == 2 else 0)
+                or np.count_nonzero(control == 0)):
+            return None
+        high = np.flatnonzero(body > 127)
+        if len(high):  # Um byte inicial de utf-8 seguido de um de continuação formaria um caractere multibyte.
+            pairs = high[:-1][np.diff(high) == 1]
+            if ((body[pairs] >= 0xC2) & (body[pairs] <= 0xF4) & (body[pairs + 1] <= 0xBF)).any():
+                return None
+        return raw[:, :stride - terminator]
+
+    def _field(self, records, start, end):
+        """Recorta os bytes de uma coluna, completando com espaços o que passar do fim do registro.
+
+        :param records Matriz de registros.
+        :param start Posição inicial (0-indexed).
+        :param end Limite superior externo.
+
+        :return numpy.ndarray de uint8 com uma linha por registro.
+        """
+        stop = max(min(end, records.shape[1]), start)
+        field = records[:, start:stop]
+        if stop < end:
+            pad = np.full((len(records), end - stop), _SPACE, dtype=np.uint8)
+            field = np.hstack([field, pad])
+        return field
+
+    def _to_str(self, field):
+        """Converte uma coluna de bytes em strings, com as mesmas regras de espaços e NaN do pd.read_fwf.
+
+        :param field Matriz de bytes da coluna.
+
+        :return Tupla (numpy.ndarray de objetos, máscara de campos vazios).
+        """
+        field = np.ascontiguousarray(field)
+        edges = field[:, [0, -1]]
+        if ((edges == _SPACE) | (edges == _TAB)).any():  # Campos totalmente preenchidos dispensam o strip.
+            stripped = np.char.strip(field.view(np.dtype(('S', field.shape[1])))[:, 0], _STRIP.encode())
+            field = stripped.view(np.uint8).reshape(len(field), -1)  # O que foi removido vira \0 no final.
+            used = np.flatnonzero(field.any(axis=0))  # Descarta as colunas que só têm \0 (campos largos e curtos).
+            field = field[:, :used[-1] + 1 if len(used) else 1]
+        codes = field.astype(np.uint32)
+        if field.max() > 127:  # Bytes não ASCII viram o caractere de substituição, como no utf-8 com 'replace'.
+            np.copyto(codes, np.uint32(0xFFFD), where=field > 127)
+        text = codes.view(np.dtype(('U', field.shape[1])))[:, 0]
+        empty = text == ''
+        values = text.astype(object)
+        na = np.char.str_len(text) <= _NA_MAX_LENGTH  # Só strings curtas podem ser um dos valores de NaN.
+        if na.any():
+            na[na] = np.isin(text[na], NA_VALUES)
+        values[na] = np.nan
+        return values, empty
+
+    def _to_int(self, field):
+        """Converte uma coluna de bytes em int64.
+
+        Aceita somente um bloco contínuo de dígitos, com espaços opcionais nas pontas.
+
+        :param field Matriz de bytes da coluna.
+
+        :return Tupla (numpy.ndarray de int64 ou None, máscara de campos vazios).
+        """
+        width = field.shape[1]
+        digits = field - _ZERO
+        is_digit = digits < 10
+        if is_digit.all():  # Caso comum: campo todo preenchido com dígitos.
+            if width > 18 and (digits[:, :width - 18] != 0).any():
+                return None, None
+            return self._digits_to_int(digits), np.zeros(len(field), dtype=bool)
+        is_blank = (field == _SPACE) | (field == _TAB)
+        if not (is_digit | is_blank).all():
+            return None, None
+        runs = is_digit.copy()
+        runs[:, 1:] &= ~is_digit[:, :-1]
+        if not (runs.sum(axis=1) == 1).all():
+            return None, None
+        if width > 18:  # Garante que o valor cabe em int64.
+            significant = is_digit & np.logical_or.accumulate(is_digit & (digits > 0), axis=1)
+            if (significant.sum(axis=1) > 18).any():
+                return None, None
+        values = np.zeros(len(field), dtype=np.int64)
+        for j in range(width):
+            values = np.where(is_digit[:, j], values * 10 + digits[:, j], values)
+        return values, np.zeros(len(field), dtype=bool)
+
+    def _digits_to_int(self, digits):
+        """Converte uma matriz de dígitos (sem espaços) em int64.
+
+        :param digits Matriz de dígitos (0 a 9), com o mais significativo à esquerda.
+
+        :return numpy.ndarray de int64.
+        """
+        width = digits.shape[1]
+        weights = np.zeros(width, dtype=np.int64)
+        exponents = np.arange(width - 1, -1, -1)
+        weights[exponents <= 18] = 10 ** exponents[exponents <= 18].astype(np.int64)
+        return digits.astype(np.int64) @ weights
@@ -1,5 +1,3 @@
-import pandas as pd
-
 from pad.converter.parser import ParserBase
 
 
@@ -26,21 +24,21 @@ class Liquidac(ParserBase):
         ('tipo_instrumento_contratual', 709, 709, str)
     )
 
+    _money = (
+        'valor_liquidacao',
+    )
+    _money_signs = {'valor_liquidacao': 'sinal_valor'}
+    _money_fill = False
+    _cents_support = True
+
     def __init__(self, logger, sources: list):
         self._logger = logger
         self._sources = sources
 
     def _prepare(self):
         self._data_liquidacao()
-        self._valor_liquidacao()
+        self._converte_valores()
 
     def _data_liquidacao(self):
         """Converte DDMMAAAA para o formato de data do Pandas."""
-        self._df['data_liquidacao'] = pd.to_datetime(self._df['data_liquidacao'], format='%d%m%Y', exact=True)
-
-    def _valor_liquidacao(self):
-        """Converte o valor em decimal e remove o sinal."""
-        self._df['valor_liquidacao'] = self._df['sinal_valor'] + self._df['valor_liquidacao']
-        del self._df['sinal_valor']
-        self._df['valor_liquidacao'] = pd.to_numeric(self._df['valor_liquidacao'], downcast='integer')
-        self._df['valor_liquidacao'] = round(self._df['valor_liquidacao'] / 100, 2)
+        self._df['data_liquidacao'] = self._decodificador_datas().decode(self._df['data_liquidacao'])
@@ -1,5 +1,3 @@
-import pandas as pd
-
 from pad.converter.parser import ParserBase
 
 
@@ -25,23 +23,22 @@ class Pagament(ParserBase):
         ('numero_liquidacao', 654, 673, int)
     )
 
+    _money = (
+        'valor_pagamento',
+    )
+    _money_signs = {'valor_pagamento': 'sinal_valor'}
+    _money_fill = False
+    _cents_support = True
+
     def __init__(self, logger, sources: list):
         self._logger = logger
         self._sources = sources
 
     def _prepare(self):
         self._data_pagamento()
-        self._valor_pagamento()
-        self._df['conta_contabil_debito'] = [el.lstrip('0') for el in self._df['conta_contabil_debito']]
-        self._df['conta_contabil_credito'] = [el.lstrip('0') for el in self._df['conta_contabil_credito']]
+        self._converte_valores()
+        self._conta_contabil('conta_contabil_debito', 'conta_contabil_credito')
 
     def _data_pagamento(self):
         """Converte DDMMAAAA para o formato de data do Pandas."""
-        self._df['data_pagamento'] = pd.to_datetime(self._df['data_pagamento'], format='%d%m%Y', exact=True)
-
-    def _valor_pagamento(self):
-        """Converte o valor em decimal e remove o sinal."""
-        self._df['valor_pagamento'] = self._df['sinal_valor'] + self._df['valor_pagamento']
-        del self._df['sinal_valor']
-        self._df['valor_pagamento'] = pd.to_numeric(self._df['valor_pagamento'], downcast='integer')
-        self._df['valor_pagamento'] = round(self._df['valor_pagamento'] / 100, 2)
+        self._df['data_pagamento'] = self._decodificador_datas().decode(self._df['data_pagamento'])
@@ -1,5 +1,3 @@
-import pandas as pd
-
 from pad.converter.parser import ParserBase
 
 
@@ -15,18 +13,16 @@ class RDExtra(ParserBase):
         # ('recurso_vinculado', 41, 44, int) #removido a partir de jan/2023
     )
 
+    _money = (
+        'valor_movimento',
+    )
+
     def __init__(self, logger, sources: list):
         self._logger = logger
         self._sources = sources
 
     def _prepare(self):
-        self._df['conta_contabil'] = [el.lstrip('0') for el in self._df['conta_contabil']]
-        self._converte_valor('valor_movimento')
+        self._conta_contabil('conta_contabil')
+        self._converte_valores()
 
 
-    def _converte_valor(self, campo):
-        """Converte o valor em decimal."""
-        self._df[campo] = self._df[campo].str.lstrip('0')
-        self._df[campo] = pd.to_numeric(self._df[campo], downcast='integer')
-        self._df[campo] = round(self._df[campo] / 100, 2)
-        self._df[campo] = self._df[campo].fillna(0.0)
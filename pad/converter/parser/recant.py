@@ -1,9 +1,7 @@
-import pandas as pd
+from pad.converter.parser.receitas import ReceitaParser
 
-from pad.converter.parser import ParserBase
 
-
-class RecAnt(ParserBase):
+class RecAnt(ReceitaParser):
     _file_name = 'REC_ANT'
     _spec = (
         ('codigo_receita', 1, 20, str),
@@ -29,76 +27,34 @@ class RecAnt(ParserBase):
         ('codigo_acompanhamento_orcamentario', 196, 199, int)
     )
 
+    _money = (
+        'realizada_jan',
+        'realizada_fev',
+        'realizada_mar',
+        'realizada_abr',
+        'realizada_mai',
+        'realizada_jun',
+        'realizada_jul',
+        'realizada_ago',
+        'realizada_set',
+        'realizada_out',
+        'realizada_nov',
+        'realizada_dez',
+    )
+    _money_fill = False
+
     def __init__(self, logger, sources: list):
         self._logger = logger
         self._sources = sources
 
     def _prepare(self):
-        self._converte_valor('realizada_jan')
-        self._converte_valor('realizada_fev')
-        self._converte_valor('realizada_mar')
-        self._converte_valor('realizada_abr')
-        self._converte_valor('realizada_mai')
-        self._converte_valor('realizada_jun')
-        self._converte_valor('realizada_jul')
-        self._converte_valor('realizada_ago')
-        self._converte_valor('realizada_set')
-        self._converte_valor('realizada_out')
-        self._converte_valor('realizada_nov')
-        self._converte_valor('realizada_dez')
+        self._converte_valores()
         self._receita_realizada()
         self._codigo_receita()
         self._receita_base()
         self._receita_filtro()
         self._classe_receita()
-        self._tipo_receita()
+        self._tipo_receita(self._df['fonte_recurso'] > 0)
 
     def _receita_realizada(self):
         self._df['receita_realizada'] = round(self._df.loc[:, 'realizada_jan':'realizada_dez'].sum(axis=1), 2)
-
-
-    def _converte_valor(self, campo):
-        """Converte o valor em decimal."""
-        self._df[campo] = self._df[campo].str.lstrip('0')
-        self._df[campo] = pd.to_numeric(self._df[campo], downcast='integer')
-        self._df[campo] = round(self._df[campo] / 100, 2)
-
-    def _codigo_receita(self):
-        self._df['codigo_receita'] = self._df['codigo_receita'].str.lstrip('0')
-
-    def _receita_base(self):
-        self._df['receita_base'] = ''
-        for i, r in self._df.iterrows():
-            if self._df.at[i, 'codigo_receita'][:1] == '7':
-                self._df.at[i, 'receita_base'] = '1' + self._df.at[i, 'codigo_receita'][1:]
-            elif self._df.at[i, 'codigo_receita'][:1] == '8':
-                self._df.at[i, 'receita_base'] = '2' + self._df.at[i, 'codigo_receita'][1:]
-            elif self._df.at[i, 'codigo_receita'][:1] == '9':
-                self._df.at[i, 'receita_base'] = self._df.at[i, 'codigo_receita'][1:]
-            else:
-                self._df['receita_base'] = self._df['codigo_receita']
-
-    def _receita_filtro(self):
-        self._df['filtro'] = self._df['codigo_receita'].str.rstrip('0')
-        self._df['filtro_base'] = self._df['receita_base'].str.rstrip('0')
-
-    def _classe_receita(self):
-        self._df['classe_receita'] = ''
-        for i, r in self._df.iterrows():
-            if self._df.at[i, 'codigo_receita'][:1] == '7':
-                self._df.at[i, 'classe_receita'] = 'intra'
-            elif self._df.at[i, 'codigo_receita'][:1] == '8':
-                self._df.at[i, 'classe_receita'] = 'intra'
-            elif self._df.at[i, 'codigo_receita'][:1] == '9':
-                self._df.at[i, 'classe_receita'] = 'dedutora'
-            else:
-                self._df['classe_receita'] = 'normal'
-
-    def _tipo_receita(self):
-        self._df['tipo_receita'] = ''
-        for i, r in self._df.iterrows():
-            t = int(self._df.at[i, 'receita_base'][7:8])
-            if (t == 0) and (self._df.at[
-                                 i, 'fonte_recurso'] > 0):  # Considera como principal, mesmo que o tipo_receita seja 0, porque tem receitas que foram cadastradas com 0 em vez de 1
-                t = 1
-            self._df.at[i, 'tipo_receita'] = t
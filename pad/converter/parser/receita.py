@@ -1,9 +1,11 @@
+import numpy as np
 import pandas as pd
 
-from pad.converter.parser import ParserBase
+from pad.converter.parser.decoder import arredonda
+from pad.converter.parser.receitas import ReceitaParser
 
 
-class Receita(ParserBase):
+class Receita(ReceitaParser):
     _file_name = 'RECEITA'
     _spec = (
         ('codigo_receita', 1, 20, str),
@@ -35,29 +37,52 @@ class Receita(ParserBase):
         ('codigo_acompanhamento_orcamentario', 268, 271, int)
     )
 
+    _money = (
+        'realizada_jan',
+        'realizada_fev',
+        'realizada_mar',
+        'realizada_abr',
+        'realizada_mai',
+        'realizada_jun',
+        'realizada_jul',
+        'realizada_ago',
+        'realizada_set',
+        'realizada_out',
+        'realizada_nov',
+        'realizada_dez',
+        'meta_1bim',
+        'meta_2bim',
+        'meta_3bim',
+        'meta_4bim',
+        'meta_5bim',
+        'meta_6bim',
+    )
+    _money_fill = False
+    _money_derived = (
+        'meta_total',
+        'receita_realizada',
+        'meta_a_arrecadar',
+        'meta_jan',
+        'meta_fev',
+        'meta_mar',
+        'meta_abr',
+        'meta_mai',
+        'meta_jun',
+        'meta_jul',
+        'meta_ago',
+        'meta_set',
+        'meta_out',
+        'meta_nov',
+        'meta_dez',
+    )
+    _cents_support = True
+
     def __init__(self, logger, sources: list):
         self._logger = logger
         self._sources = sources
 
     def _prepare(self):
-        self._converte_valor('realizada_jan')
-        self._converte_valor('realizada_fev')
-        self._converte_valor('realizada_mar')
-        self._converte_valor('realizada_abr')
-        self._converte_valor('realizada_mai')
-        self._converte_valor('realizada_jun')
-        self._converte_valor('realizada_jul')
-        self._converte_valor('realizada_ago')
-        self._converte_valor('realizada_set')
-        self._converte_valor('realizada_out')
-        self._converte_valor('realizada_nov')
-        self._converte_valor('realizada_dez')
-        self._converte_valor('meta_1bim')
-        self._converte_valor('meta_2bim')
-        self._converte_valor('meta_3bim')
-        self._converte_valor('meta_4bim')
-        self._converte_valor('meta_5bim')
-        self._converte_valor('meta_6bim')
+        self._converte_valores()
         self._meta_total()
         self._receita_realizada()
         self._receita_a_arrecadar()
@@ -65,7 +90,7 @@ class Receita(ParserBase):
         self._receita_base()
         self._receita_filtro()
         self._classe_receita()
-        self._tipo_receita()
+        self._tipo_receita(self._df['fonte_recurso'] > 0)
         self._metas_mensais()
 
     def _meta_total(self):
@@ -77,82 +102,47 @@ class Receita(ParserBase):
     def _receita_a_arrecadar(self):
         self._df['meta_a_arrecadar'] = round(self._df['meta_total'] - self._df['receita_realizada'], 2)
 
-
-    def _converte_valor(self, campo):
-        """Converte o valor em decimal."""
-        self._df[campo] = self._df[campo].str.lstrip('0')
-        self._df[campo] = pd.to_numeric(self._df[campo], downcast='integer')
-        self._df[campo] = round(self._df[campo] / 100, 2)
-
-    def _codigo_receita(self):
-        self._df['codigo_receita'] = self._df['codigo_receita'].str.lstrip('0')
-
-    def _receita_base(self):
-        self._df['receita_base'] = ''
-        for i, r in self._df.iterrows():
-            if self._df.at[i, 'codigo_receita'][:1] == '7':
-                self._df.at[i, 'receita_base'] = '1' + self._df.at[i, 'codigo_receita'][1:]
-            elif self._df.at[i, 'codigo_receita'][:1] == '8':
-                self._df.at[i, 'receita_base'] = '2' + self._df.at[i, 'codigo_receita'][1:]
-            elif self._df.at[i, 'codigo_receita'][:1] == '9':
-                self._df.at[i, 'receita_base'] = self._df.at[i, 'codigo_receita'][1:]
-            else:
-                self._df['receita_base'] = self._df['codigo_receita']
-
-    def _receita_filtro(self):
-        self._df['filtro'] = self._df['codigo_receita'].str.rstrip('0')
-        self._df['filtro_base'] = self._df['receita_base'].str.rstrip('0')
-
-    def _classe_receita(self):
-        self._df['classe_receita'] = ''
-        for i, r in self._df.iterrows():
-            if self._df.at[i, 'codigo_receita'][:1] == '7':
-                self._df.at[i, 'classe_receita'] = 'intra'
-            elif self._df.at[i, 'codigo_receita'][:1] == '8':
-                self._df.at[i, 'classe_receita'] = 'intra'
-            elif self._df.at[i, 'codigo_receita'][:1] == '9':
-                self._df.at[i, 'classe_receita'] = 'dedutora'
-            else:
-                self._df['classe_receita'] = 'normal'
-
-    def _tipo_receita(self):
-        self._df['tipo_receita'] = ''
-        for i, r in self._df.iterrows():
-            t = int(self._df.at[i, 'receita_base'][7:8])
-            if (t == 0) and (self._df.at[
-                                 i, 'fonte_recurso'] > 0):  # Considera como principal, mesmo que o tipo_receita seja 0, porque tem receitas que foram cadastradas com 0 em vez de 1
-                t = 1
-            self._df.at[i, 'tipo_receita'] = t
-
     def _metas_mensais(self):
-        self._df['meta_jan'] = 0.0
-        self._df['meta_fev'] = 0.0
-        self._df['meta_mar'] = 0.0
-        self._df['meta_abr'] = 0.0
-        self._df['meta_mai'] = 0.0
-        self._df['meta_jun'] = 0.0
-        self._df['meta_jul'] = 0.0
-        self._df['meta_ago'] = 0.0
-        self._df['meta_set'] = 0.0
-        self._df['meta_out'] = 0.0
-        self._df['meta_nov'] = 0.0
-        self._df['meta_dez'] = 0.0
-        for i, r in self._df.iterrows():
-            m1b = round(r['meta_1bim']/2, 2)
-            m2b = round(r['meta_2bim'] / 2, 2)
-            m3b = round(r['meta_3bim'] / 2, 2)
-            m4b = round(r['meta_4bim'] / 2, 2)
-            m5b = round(r['meta_5bim'] / 2, 2)
-            m6b = round(r['meta_6bim'] / 2, 2)
-            self._df.at[i, 'meta_jan'] = m1b
-            self._df.at[i, 'meta_fev'] = round(r['meta_1bim'] - m1b, 2)
-            self._df.at[i, 'meta_mar'] = m2b
-            self._df.at[i, 'meta_abr'] = round(r['meta_2bim'] - m2b, 2)
-            self._df.at[i, 'meta_mai'] = m3b
-            self._df.at[i, 'meta_jun'] = round(r['meta_3bim'] - m3b, 2)
-            self._df.at[i, 'meta_jul'] = m4b
-            self._df.at[i, 'meta_ago'] = round(r['meta_4bim'] - m4b, 2)
-            self._df.at[i, 'meta_set'] = m5b
-            self._df.at[i, 'meta_out'] = round(r['meta_5bim'] - m5b, 2)
-            self._df.at[i, 'meta_nov'] = m6b
-            self._df.at[i, 'meta_dez'] = round(r['meta_6bim'] - m6b, 2)
+        """Divide a meta de cada bimestre entre os seus dois meses."""
+        meses = (('meta_1bim', 'meta_jan', 'meta_fev'), ('meta_2bim', 'meta_mar', 'meta_abr'),
+                 ('meta_3bim', 'meta_mai', 'meta_jun'), ('meta_4bim', 'meta_jul', 'meta_ago'),
+                 ('meta_5bim', 'meta_set', 'meta_out'), ('meta_6bim', 'meta_nov', 'meta_dez'))
+        for bimestre, primeiro, segundo in meses:
+            meta = self._df[bimestre]
+            metade = self._metade(meta)
+            self._df[primeiro] = metade
+            self._df[segundo] = arredonda(meta - metade, self._em_centavos())
+
+    def _metade(self, meta):
+        """Calcula a metade da meta de um bimestre, que vai para o primeiro mês dele.
+
+        Reproduz o round(meta / 2, 2) da conversão original. Quando a meta tem um número ímpar de centavos, a metade cai
+        no meio de dois centavos e o round desempata pela representação binária da meta: arredonda para cima se ela
+        estiver acima do valor exato em centavos e para o centavo par se ela for exata. Isso é verificado com inteiros,
+        pela mantissa e pelo expoente da meta.
+        No modo centavos, a meta em reais é centavos / 100, a mesma da visão em float, então a metade também é a mesma.
+
+        :param meta pandas.Series com a meta do bimestre.
+
+        :return numpy.ndarray (ou pandas.arrays.IntegerArray, no modo centavos) com a meta do primeiro mês do bimestre.
+        """
+        if self._em_centavos():
+            presentes = ~meta.isna().to_numpy()
+            centavos = meta.to_numpy(dtype=np.int64, na_value=0)
+            valores = centavos / 100
+        else:
+            valores = meta.to_numpy(dtype=float)
+            presentes = ~np.isnan(valores)
+            centavos = np.zeros(len(valores), dtype=np.int64)
+            centavos[presentes] = np.rint(valores[presentes] * 100)
+        metade = centavos // 2
+        impar = centavos % 2 == 1
+        mantissa, expoente = np.frexp(valores[impar])
+        inteiro = (mantissa * 2.0 ** 53).astype(np.int64)  # meta = inteiro / 2 ** (53 - expoente), sem perda
+        exato = np.left_shift(centavos[impar], 53 - expoente)
+        # Metas exatas em binário (final ,25 ou ,75) empatam de fato, e o round desempata para o centavo par.
+        acima = (inteiro * 100 > exato) | ((inteiro * 100 == exato) & (metade[impar] % 2 == 1))
+        metade[impar] += acima
+        if self._em_centavos():
+            return pd.arrays.IntegerArray(metade, ~presentes) if meta.dtype == 'Int64' else metade
+        return np.where(presentes, metade / 100, np.nan)
@@ -0,0 +1,81 @@
+"""Módulo base para os parsers de receita (RECEITA, REC_ANT, BAL_REC e BREC_ANT).
+"""
+import numpy as np
+
+from pad.converter.parser import ParserBase
+
+# Prefixos do código da receita que não são de receita normal.
+# Cada um é (prefixo, prefixo que o substitui na receita_base, classe_receita).
+PREFIXOS_RECEITA = (
+    ('7', '1', 'intra'),
+    ('8', '2', 'intra'),
+    ('9', '', 'dedutora'),
+)
+CLASSE_NORMAL = 'normal'  # Classe das receitas cujo código não começa com um dos PREFIXOS_RECEITA
+
+
+class ReceitaParser(ParserBase):
+    """Classe base para os parsers de receita.
+
+    As colunas derivadas do código da receita são calculadas coluna a coluna, a partir do primeiro dígito do código.
+    """
+    _streamable = False  # _receita_base e _classe_receita dependem da última receita normal do arquivo
+    _categorias = ('cnpj', 'entidade', 'classe_receita')  # Colunas do cabeçalho e calculadas que viram categorias no modo compacto
+
+    def _codigo_receita(self):
+        self._df['codigo_receita'] = self._df['codigo_receita'].str.lstrip('0')
+
+    def _receita_base(self):
+        """Monta a receita_base, trocando o primeiro dígito das receitas intra-orçamentárias e dedutoras.
+
+        Mantém o comportamento original: as linhas até a última receita normal do arquivo recebem o próprio código da
+        receita, pois a conversão linha a linha sobrescrevia a coluna inteira a cada receita normal.
+        """
+        codigo = self._df['codigo_receita']
+        prefixo = codigo.str[:1]
+        resto = codigo.str[1:]
+        base = codigo.copy()
+        for digito, substituto, classe in PREFIXOS_RECEITA:
+            base[prefixo == digito] = substituto + resto[prefixo == digito]
+        self._df['receita_base'] = self._ate_ultima_normal(base, codigo, prefixo)
+
+    def _receita_filtro(self):
+        self._df['filtro'] = self._df['codigo_receita'].str.rstrip('0')
+        self._df['filtro_base'] = self._df['receita_base'].str.rstrip('0')
+
+    def _classe_receita(self):
+        """Classifica as receitas em normal, intra (intra-orçamentária) ou dedutora.
+
+        Assim como em _receita_base, as linhas até a última receita normal do arquivo ficam como normal.
+        """
+        prefixo = self._df['codigo_receita'].str[:1]
+        condicoes = [(prefixo == digito).to_numpy() for digito, substituto, classe in PREFIXOS_RECEITA]
+        classes = [classe for digito, substituto, classe in PREFIXOS_RECEITA]
+        classe = np.select(condicoes, classes, CLASSE_NORMAL).astype(object)
+        self._df['classe_receita'] = self._ate_ultima_normal(classe, CLASSE_NORMAL, prefixo)
+
+    def _tipo_receita(self, principal):
+        """Identifica o tipo da receita (oitavo dígito da receita_base).
+
+        :param principal Máscara das linhas consideradas como principal (tipo 1) mesmo que o tipo seja 0, porque tem
+        receitas que foram cadastradas com 0 em vez de 1.
+        """
+        tipo = self._df['receita_base'].str[7:8].astype(int).to_numpy()
+        tipo = np.where((tipo == 0) & np.asarray(principal), 1, tipo)
+        self._df['tipo_receita'] = tipo.astype(object)
+
+    def _ate_ultima_normal(self, valores, normal, prefixo):
+        """Substitui os valores das linhas até a última receita normal (inclusive).
+
+        :param valores Valores calculados para cada linha.
+        :param normal Valor (ou valores de cada linha) das linhas até a última receita normal.
+        :param prefixo pandas.Series com o primeiro dígito do código de cada receita.
+
+        :return numpy.ndarray de objetos
+        """
+        valores = np.asarray(valores, dtype=object).copy()
+        normais = np.flatnonzero(~prefixo.isin([digito for digito, substituto, classe in PREFIXOS_RECEITA]).to_numpy())
+        if len(normais):
+            fim = normais[-1] + 1
+            valores[:fim] = np.asarray(normal, dtype=object)[:fim] if np.ndim(normal) else normal
+        return valores
@@ -0,0 +1,228 @@
+"""Escalonador das etapas do conversor.
+
+Cada etapa (um parser, uma tabela derivada, a escrita de uma tabela) declara as etapas de que depende e começa assim
+que todas elas terminam, sem esperar pelas demais. Com mais de uma thread, as etapas prontas rodam ao mesmo tempo, as de
+maior prioridade primeiro. Cada etapa pode pertencer a um grupo (como os parsers ou os writers de um formato) com um
+limite de etapas do grupo rodando ao mesmo tempo.
+
+Para que o log não dependa da ordem em que as etapas terminam, as mensagens de cada etapa são guardadas em um
+pad.converter.parser.LogBuffer e repassadas ao logger na ordem em que as etapas foram declaradas. Se alguma etapa
+falhar, as que dependem dela não são executadas e, depois que as demais terminam, é levantada a exceção da primeira
+etapa com falha na ordem de declaração.
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from pad.converter.parser import LogBuffer
+
+
+class StageLogger:
+    """Logger que direciona as mensagens de cada etapa para o LogBuffer da thread que a executa.
+
+    Fora das etapas, ou quando as etapas rodam uma de cada vez, as mensagens vão direto para o logger original.
+    """
+    _logger = None  # Logger original
+    _local = None  # threading.local com o LogBuffer da etapa em execução na thread
+
+    def __init__(self, logger):
+        """Construtor do logger.
+
+        :param logger Logger original.
+        """
+        self._logger = logger
+        self._local = threading.local()
+
+    def redirect(self, buffer):
+        """Direciona as mensagens da thread atual para um LogBuffer.
+
+        :param buffer pad.converter.parser.LogBuffer ou None para voltar ao logger original.
+        """
+        self._local.buffer = buffer
+
+    def log(self, level, msg):
+        target = getattr(self._local, 'buffer', None)
+        (target if target is not None else self._logger).log(level, msg)
+
+    def debug(self, msg):
+        self.log(logging.DEBUG, msg)
+
+    def info(self, msg):
+        self.log(logging.INFO, msg)
+
+    def warning(self, msg):
+        self.log(logging.WARNING, msg)
+
+    def error(self, msg):
+        self.log(logging.ERROR, msg)
+
+
+class Stage:
+    """Etapa do escalonador.
+    """
+    name = ''  # Nome da etapa
+    function = None  # Função sem parâmetros que executa a etapa
+    inputs = ()  # Nomes das etapas de que ela depende
+    priority = 0  # Etapas prontas de maior prioridade começam antes
+    group = None  # Grupo da etapa, para o limite de etapas do grupo rodando ao mesmo tempo
+
+    def __init__(self, name, function, inputs=(), priority=0, group=None):
+        """Construtor da etapa.
+
+        :param name Nome da etapa.
+        :param function Função sem parâmetros que executa a etapa.
+        :param inputs Nomes das etapas de que ela depende.
+        :param priority Etapas prontas de maior prioridade começam antes.
+        :param group Grupo da etapa ou None.
+        """
+        self.name = name
+        self.function = function
+        self.inputs = tuple(inputs)
+        self.priority = priority
+        self.group = group
+
+
+class StageScheduler:
+    """Executa as etapas assim que as etapas de que elas dependem terminam.
+    """
+    _logger = None  # Objeto logger
+    _threads = 1  # Quantidade de etapas executadas ao mesmo tempo
+    _stages = {}  # Etapas por nome, na ordem de declaração
+    _limits = {}  # Quantidade máxima de etapas de cada grupo executadas ao mesmo tempo
+
+    def __init__(self, logger, threads=1, limits=None):
+        """Construtor do escalonador.
+
+        :param logger Objeto logger. Se for um StageLogger, as mensagens das etapas são repassadas na ordem de
+        declaração, mesmo com mais de uma thread.
+        :param threads Quantidade de etapas executadas ao mesmo tempo.
+        :param limits Dicionário {grupo: quantidade máxima de etapas do grupo executadas ao mesmo tempo}. Os grupos
+        que não estão nele não têm limite além de threads.
+        """
+        self._logger = logger
+        self._threads = threads
+        self._stages = {}
+        self._limits = dict(limits or {})
+
+    def add(self, name, function, inputs=(), priority=0, group=None):
+        """Declara uma etapa.
+
+        :param name Nome da etapa.
+        :param function Função sem parâmetros que executa a etapa.
+        :param inputs Nomes das etapas de que ela depende, que devem ter sido declaradas antes.
+        :param priority Etapas prontas de maior prioridade começam antes.
+        :param group Grupo da etapa, para o limite de etapas do grupo executadas ao mesmo tempo.
+        """
+        if name in self._stages:
+            raise ValueError(f'A etapa {name} já foi declarada.')
+        for i in inputs:
+            if i not in self._stages:
+                raise ValueError(f'A etapa {name} depende da etapa {i}, que não foi declarada antes dela.')
+        self._stages[name] = Stage(name, function, inputs, priority, group)
+
+    def run(self):
+        """Executa todas as etapas.
+
+        Com uma única thread, as etapas são executadas na ordem de declaração.
+        """
+        if self._threads > 1:
+            errors = self._run_threads()
+        else:
+            errors = self._run_sequential()
+        for stage in self._stages.values():
+            if stage.name in errors:
+                raise errors[stage.name]
+
+    def _run_sequential(self):
+        """Executa as etapas uma de cada vez, na ordem de declaração.
+
+        :return Dicionário {etapa: exceção} das etapas que falharam.
+        """
+        errors = {}
+        failed = set()
+        for stage in self._stages.values():
+            if failed.intersection(stage.inputs):
+                failed.add(stage.name)
+                continue
+            try:
+                stage.function()
+            except Exception as e:
+                errors[stage.name] = e
+                failed.add(stage.name)
+        return errors
+
+    def _run_threads(self):
+        """Executa as etapas em um pool de threads, começando cada uma assim que as suas dependências terminam.
+
+        :return Dicionário {etapa: exceção} das etapas que falharam.
+        """
+        order = list(self._stages)
+        position = {name: i for i, name in enumerate(order)}  # Posição de cada etapa na ordem de declaração
+        waiting = {name: set(stage.inputs) for name, stage in self._stages.items()}
+        records = {}  # Mensagens de log das etapas terminadas
+        errors = {}
+        failed = set()
+        flushed = 0  # Quantidade de etapas, na ordem de declaração, cujas mensagens já foram repassadas
+        running = {}
+        groups = {}  # Quantidade de etapas de cada grupo em execução
+        with ThreadPoolExecutor(max_workers=self._threads) as pool:
+            while waiting or running:
+                ready = sorted((name for name, inputs in waiting.items() if not inputs),
+                               key=lambda name: (-self._stages[name].priority, position[name]))
+                for name in ready:
+                    if len(running) >= self._threads:
+                        break
+                    group = self._stages[name].group
+                    if group in self._limits and groups.get(group, 0) >= self._limits[group]:
+                        continue
+                    groups[group] = groups.get(group, 0) + 1
+                    del waiting[name]
+                    running[pool.submit(self._run_stage, self._stages[name])] = name
+                if not running:
+                    break  # Só restam etapas que dependem de etapas com falha.
+                done, pending = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    groups[self._stages[name].group] -= 1
+                    records[name], error = future.result()
+                    if error is not None:
+                        errors[name] = error
+                        failed.add(name)
+                    for other in list(waiting):
+                        waiting[other].discard(name)
+                    for other in list(waiting):
+                        if failed.intersection(self._stages[other].inputs):
+                            failed.add(other)
+                            records[other] = []
+                            del waiting[other]
+                while flushed < len(order) and order[flushed] in records:
+                    self._flush(records.pop(order[flushed]))
+                    flushed += 1
+        return errors
+
+    def _run_stage(self, stage):
+        """Executa uma etapa em uma thread do pool, guardando as suas mensagens de log.
+
+        :param stage Stage
+
+        :return Tupla (mensagens de log, exceção levantada pela etapa ou None).
+        """
+        buffer = LogBuffer()
+        if isinstance(self._logger, StageLogger):
+            self._logger.redirect(buffer)
+        try:
+            stage.function()
+        except Exception as e:
+            return buffer.records, e
+        finally:
+            if isinstance(self._logger, StageLogger):
+                self._logger.redirect(None)
+        return buffer.records, None
+
+    def _flush(self, records):
+        """Repassa as mensagens de uma etapa para o logger original.
+
+        :param records Lista de (nível, mensagem).
+        """
+        for level, msg in records:
+            self._logger.log(level, msg)
@@ -0,0 +1,450 @@
+"""Armazém das tabelas de uma execução do conversor.
+
+As etapas do App (tabelas derivadas e writers) pegam as tabelas do armazém em vez de ler o cache em disco a cada uso.
+As tabelas convertidas no próprio processo já entram na memória. As que só existem em disco (convertidas em outro
+processo) são lidas uma única vez, na primeira vez que alguma etapa precisa delas.
+
+O cache em disco passa a ser opcional: com checkpoint, cada tabela também é salva nele, como ponto de controle. As
+tabelas processadas em blocos (modo streaming) continuam somente no disco, para que a memória usada dependa do tamanho
+do bloco, e são juntadas na memória somente se alguma etapa precisar da tabela inteira.
+
+Com o cache em disco, o armazém também mantém um manifesto com a chave de cada tabela salva, para o modo incremental:
+uma tabela cuja chave não mudou desde a última execução é reaproveitada do cache em vez de ser convertida de novo. Junto
+com o manifesto fica o dicionário das contas contábeis, para que os códigos das contas das tabelas reaproveitadas
+continuem valendo na execução seguinte.
+
+O formato dos arquivos do cache é escolhido em FORMATOS: pickle (padrão) ou Arrow IPC (Feather v2), que é lido por
+mapeamento de memória, sem copiar as colunas numéricas, e pode ser lido ao mesmo tempo por vários processos sem duplicar
+a tabela na memória. Como um arquivo mapeado não pode ser substituído no Windows, o armazém salva as tabelas que já
+estão no cache nesse formato com um novo nome e registra no manifesto o arquivo atual de cada uma.
+"""
+import hashlib
+import inspect
+import json
+import os
+import shutil
+import threading
+import uuid
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from pad.converter.parser.decoder import concat_chunks
+
+ATTRS = b'pad.attrs'  # Chave dos metadados do esquema Arrow com os pandas.DataFrame.attrs
+MANIFESTO = 'manifest.json'  # Arquivo, no diretório do cache, com a chave de cada tabela salva
+CONTAS = 'contas.json'  # Arquivo, no diretório do cache, com as contas do dicionário, na ordem dos códigos
+BLOCO_LEITURA = 1024 * 1024  # Bytes lidos de cada vez para calcular o hash de um arquivo
+
+
+def digest(*parts):
+    """Calcula o hash de uma sequência de valores.
+
+    :param parts Valores (str, bytes ou qualquer objeto com repr estável).
+
+    :return str com o hash em hexadecimal.
+    """
+    h = hashlib.blake2b(digest_size=16)
+    for p in parts:
+        h.update(p if isinstance(p, bytes) else repr(p).encode('utf-8'))
+        h.update(b'\0')
+    return h.hexdigest()
+
+
+def file_digest(file):
+    """Calcula o hash do conteúdo de um arquivo.
+
+    :param file Caminho do arquivo.
+
+    :return str com o hash em hexadecimal ou '' se o arquivo não existir.
+    """
+    if not os.path.exists(file):
+        return ''
+    h = hashlib.blake2b(digest_size=16)
+    with open(file, 'rb') as f:
+        for block in iter(lambda: f.read(BLOCO_LEITURA), b''):
+            h.update(block)
+    return h.hexdigest()
+
+
+def source_digest(*modules):
+    """Calcula o hash do código-fonte de módulos, como impressão digital do código que gera uma tabela.
+
+    :param modules Módulos Python.
+
+    :return str com o hash em hexadecimal.
+    """
+    return digest(*(file_digest(inspect.getsourcefile(m)) for m in modules))
+
+
+class PickleFormat:
+    """Cache em arquivos pickle. Cada leitura desserializa e copia a tabela inteira.
+    """
+    extension = '.pkl'  # Extensão dos arquivos do cache
+    mapped = False  # Se as tabelas lidas continuam presas ao arquivo, que então não pode ser substituído no Windows
+
+    def write(self, df, file):
+        """Salva uma tabela no cache.
+
+        :param df pandas.DataFrame
+        :param file Caminho do arquivo.
+        """
+        df.to_pickle(file)
+
+    def read(self, file):
+        """Lê uma tabela do cache.
+
+        :param file Caminho do arquivo.
+
+        :return pandas.DataFrame
+        """
+        return pd.read_pickle(file)
+
+
+class ArrowFormat:
+    """Cache em arquivos Arrow IPC (Feather v2) sem compressão, para que possam ser mapeados na memória.
+
+    As colunas numéricas sem valores ausentes são lidas sem cópia, direto das páginas do arquivo, que ficam no cache do
+    sistema operacional e são compartilhadas entre os processos que leem a mesma tabela. Os tipos do pandas são
+    restaurados pelos metadados que o pyarrow grava e os df.attrs (como as colunas em centavos) vão em ATTRS. As colunas
+    object voltam como object e com NaN nos valores ausentes, como no pickle, mesmo que o Arrow as leia com outro tipo.
+    """
+    extension = '.arrow'  # Extensão dos arquivos do cache
+    mapped = True  # Se as tabelas lidas continuam presas ao arquivo, que então não pode ser substituído no Windows
+
+    def write(self, df, file):
+        """Salva uma tabela no cache.
+
+        O arquivo é escrito ao lado e só então substitui o anterior, para que uma escrita interrompida não deixe um
+        arquivo pela metade. O arquivo anterior não pode estar mapeado na memória: para substituir uma tabela já lida,
+        o TableStore a salva com outro nome.
+
+        :param df pandas.DataFrame
+        :param file Caminho do arquivo.
+        """
+        table = pa.Table.from_pandas(df)
+        metadata = dict(table.schema.metadata or {})
+        metadata[ATTRS] = json.dumps(df.attrs).encode('utf-8')
+        table = table.replace_schema_metadata(metadata)
+        with pa.OSFile(f'{file}.tmp', 'wb') as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        os.replace(f'{file}.tmp', file)
+
+    def read(self, file):
+        """Lê uma tabela do cache por mapeamento de memória.
+
+        :param file Caminho do arquivo.
+
+        :return pandas.DataFrame
+        """
+        with pa.memory_map(file) as source:
+            table = pa.ipc.open_file(source).read_all()
+        df = table.to_pandas(split_blocks=True)
+        metadata = table.schema.metadata or {}
+        if ATTRS in metadata:
+            df.attrs = json.loads(metadata[ATTRS])
+        pandas_metadata = table.schema.pandas_metadata or {}
+        for column in pandas_metadata.get('columns', []):
+            name = column['name']
+            if column['numpy_type'] != 'object' or name not in df:
+                continue
+            nulls = table.column(name).null_count
+            if df[name].dtype == object and nulls == 0:
+                continue
+            values = df[name].to_numpy(dtype=object, copy=True)
+            if nulls:
+                values[table.column(name).is_null().to_numpy(zero_copy_only=False)] = np.nan
+            df[name] = values
+        return df
+
+
+FORMATOS = {'pickle': PickleFormat(), 'arrow': ArrowFormat()}  # Formatos do cache em disco
+
+
+class TableStore:
+    """Tabelas de uma execução, compartilhadas pelas etapas do App.
+
+    As tabelas entregues por get são compartilhadas entre as etapas e não devem ser alteradas no lugar.
+    """
+    _dir = 'cache'  # Diretório do cache em disco
+    _checkpoint = True  # Se as tabelas guardadas com put também são salvas no cache em disco
+    _format = FORMATOS['pickle']  # Formato dos arquivos do cache em disco (um dos FORMATOS)
+    _tables = {}  # pandas.DataFrame de cada tabela já na memória
+    _lock = None  # threading.Lock que protege _tables, _loading e _consumers
+    _loading = {}  # threading.Lock de cada tabela, para que ela seja lida do disco uma única vez
+    _consumers = {}  # Quantidade de etapas que ainda vão ler cada tabela registrada com expect
+    _manifest = {}  # Chave de cada tabela salva no cache em disco, lida do manifesto da execução anterior
+    _files = {}  # Arquivo atual de cada tabela salva com outro nome para não substituir um arquivo mapeado
+
+    def __init__(self, dirname='cache', checkpoint=True, cache_format='pickle'):
+        """Construtor do armazém.
+
+        :param dirname Diretório do cache em disco.
+        :param checkpoint Se as tabelas guardadas com put também são salvas no cache em disco.
+        :param cache_format Formato dos arquivos do cache em disco, um dos FORMATOS.
+        """
+        self._dir = dirname
+        self._checkpoint = checkpoint
+        self._format = FORMATOS[cache_format]
+        self._tables = {}
+        self._lock = threading.Lock()
+        self._loading = {}
+        self._consumers = {}
+        self._manifest = {}
+        self._files = {}
+        file = os.path.join(dirname, MANIFESTO)
+        if os.path.exists(file):
+            with open(file, encoding='utf-8') as f:
+                manifest = json.load(f)
+            self._manifest = manifest.get('chaves', {})
+            self._files = {name: file for name, file in manifest.get('arquivos', {}).items()
+                           if file.endswith(self._format.extension)}  # Somente os do formato desta execução
+            self._purge()
+
+    def put(self, name, df, save=True):
+        """Guarda uma tabela inteira na memória e, com checkpoint, no cache em disco, substituindo as partes se ela
+        tinha sido salva em blocos.
+
+        :param name Nome da tabela.
+        :param df pandas.DataFrame
+        :param save Se False, a tabela não é salva em disco, como quando o parser já a salvou.
+        """
+        with self._lock:
+            self._tables[name] = df
+        if save and self._checkpoint:
+            dirname = os.path.join(self._dir, name)
+            if os.path.isdir(dirname):
+                shutil.rmtree(dirname)
+            if self._format.mapped and os.path.exists(self.file(name)):
+                self._swap(name, df)
+            else:
+                self._format.write(df, self.file(name))
+
+    def _swap(self, name, df):
+        """Salva uma tabela em um arquivo novo e passa a usá-lo no lugar do anterior, que pode estar mapeado na memória
+        por quem o leu. O anterior é apagado se possível e, se não, fica para a próxima execução.
+
+        :param name Nome da tabela.
+        :param df pandas.DataFrame
+        """
+        novo = f'{name}.{uuid.uuid4().hex[:8]}{self._format.extension}'
+        self._format.write(df, os.path.join(self._dir, novo))
+        with self._lock:
+            anterior = self.file(name)
+            self._files[name] = novo
+            self._save_manifest()
+        self._remove(anterior)
+
+    def get(self, name):
+        """Retorna uma tabela, lendo-a do cache em disco somente se ela ainda não estiver na memória.
+
+        :param name Nome da tabela.
+
+        :return pandas.DataFrame
+        """
+        with self._lock:
+            if name in self._tables:
+                return self._tables[name]
+            loading = self._loading.setdefault(name, threading.Lock())
+        with loading:
+            with self._lock:
+                if name in self._tables:
+                    return self._tables[name]
+            dirname = os.path.join(self._dir, name)
+            if os.path.isdir(dirname):
+                df = concat_chunks(self.read(p) for p in self.parts(name))
+            else:
+                df = self.read(self.file(name))
+            with self._lock:
+                self._tables[name] = df
+            return df
+
+    def expect(self, name, consumers):
+        """Registra quantas etapas ainda vão ler uma tabela, para que release a libere da memória depois da última.
+
+        :param name Nome da tabela.
+        :param consumers Quantidade de etapas que leem a tabela.
+        """
+        with self._lock:
+            self._consumers[name] = consumers
+
+    def release(self, name):
+        """Registra que uma das etapas que leem uma tabela terminou e, se era a última, tira a tabela da memória.
+
+        Com checkpoint ou em blocos, a tabela continua no cache em disco e get volta a lê-la se ela for pedida de novo.
+        As tabelas sem leitores registrados com expect ficam na memória.
+
+        :param name Nome da tabela.
+        """
+        with self._lock:
+            if name not in self._consumers:
+                return
+            self._consumers[name] -= 1
+            if self._consumers[name] > 0:
+                return
+            del self._consumers[name]
+            self._tables.pop(name, None)
+
+    def loaded(self, name):
+        """Indica se uma tabela já está na memória.
+
+        :param name Nome da tabela.
+
+        :return bool
+        """
+        with self._lock:
+            return name in self._tables
+
+    def chunked(self, name):
+        """Indica se uma tabela está no cache em disco em blocos.
+
+        :param name Nome da tabela.
+
+        :return bool
+        """
+        return os.path.isdir(os.path.join(self._dir, name))
+
+    def parts(self, name):
+        """Lista, em ordem, os arquivos das partes de uma tabela salva em blocos no cache.
+
+        :param name Nome da tabela.
+
+        :return Lista com os caminhos dos arquivos.
+        """
+        dirname = os.path.join(self._dir, name)
+        extension = self._format.extension
+        return sorted(f.path for f in os.scandir(dirname) if f.is_file() and f.name.endswith(extension))
+
+    def file(self, name):
+        """Retorna o caminho do arquivo de uma tabela salva inteira no cache.
+
+        :param name Nome da tabela.
+
+        :return str
+        """
+        return os.path.join(self._dir, self._files.get(name, f'{name}{self._format.extension}'))
+
+    def read(self, file):
+        """Lê um arquivo do cache no formato do armazém, como as partes listadas por parts.
+
+        :param file Caminho do arquivo.
+
+        :return pandas.DataFrame
+        """
+        return self._format.read(file)
+
+    def fresh(self, name, key):
+        """Indica se a tabela salva no cache em disco foi gerada com a chave informada.
+
+        :param name Nome da tabela.
+        :param key Chave esperada da tabela.
+
+        :return bool
+        """
+        with self._lock:
+            if self._manifest.get(name) != key:
+                return False
+        return (self.chunked(name) and len(self.parts(name)) > 0) or os.path.exists(self.file(name))
+
+    def record(self, name, key):
+        """Registra no manifesto a chave da tabela que acabou de ser salva no cache em disco.
+
+        :param name Nome da tabela.
+        :param key Chave da tabela.
+        """
+        with self._lock:
+            self._manifest[name] = key
+            self._save_manifest()
+
+    def forget(self, name):
+        """Remove a tabela do manifesto antes de ela ser gerada de novo, para que uma execução interrompida no meio não
+        deixe no cache uma tabela com a chave antiga.
+
+        :param name Nome da tabela.
+        """
+        with self._lock:
+            file = self._files.pop(name, None)
+            if self._manifest.pop(name, None) is not None or file is not None:
+                self._save_manifest()
+        if file is not None:
+            self._remove(os.path.join(self._dir, file))
+
+    def contas(self):
+        """Lê as contas do dicionário salvo no cache em disco.
+
+        :return Lista com as contas, na ordem dos códigos, vazia se o dicionário não foi salvo.
+        """
+        file = os.path.join(self._dir, CONTAS)
+        if not os.path.exists(file):
+            return []
+        with open(file, encoding='utf-8') as f:
+            return json.load(f)
+
+    def save_contas(self, contas):
+        """Salva as contas do dicionário no cache em disco, substituindo as anteriores de uma só vez.
+
+        Deve ser chamado antes de registrar no manifesto uma tabela que usa os códigos do dicionário.
+
+        :param contas Lista com as contas, na ordem dos códigos.
+        """
+        file = os.path.join(self._dir, CONTAS)
+        with self._lock:
+            with open(f'{file}.tmp', 'w', encoding='utf-8') as f:
+                json.dump(contas, f)
+            os.replace(f'{file}.tmp', file)
+
+    def clear(self):
+        """Apaga as tabelas da memória e do cache em disco, junto com o manifesto.
+
+        São apagados somente os arquivos do cache, em qualquer um dos FORMATOS: as tabelas salvas inteiras, os
+        diretórios das tabelas salvas em blocos, o manifesto e o dicionário das contas. Outros arquivos do diretório
+        são mantidos.
+        """
+        with self._lock:
+            self._tables.clear()
+            self._consumers.clear()
+            self._manifest = {}
+            self._files = {}
+        if not os.path.isdir(self._dir):
+            return
+        extensions = tuple(f.extension for f in FORMATOS.values())
+        for entry in os.scandir(self._dir):
+            if entry.is_dir():
+                if all(f.is_file() and f.name.endswith(extensions) for f in os.scandir(entry.path)):
+                    shutil.rmtree(entry.path)
+            elif entry.name.endswith(extensions) or entry.name in (MANIFESTO, CONTAS) or entry.name in (
+                    f'{MANIFESTO}.tmp', f'{CONTAS}.tmp'):
+                os.remove(entry.path)
+
+    def _purge(self):
+        """Apaga os arquivos de tabelas que não são mais o arquivo atual de nenhuma tabela, como os que ainda estavam
+        mapeados quando foram substituídos na execução anterior.
+        """
+        atuais = set(self._files.values())
+        extensions = tuple(f.extension for f in FORMATOS.values())
+        for entry in os.scandir(self._dir):
+            stem, extension = os.path.splitext(entry.name)
+            substituido = '.' in stem or stem in self._files  # Salvo com outro nome ou com o nome padrão
+            if entry.is_file() and extension in extensions and substituido and entry.name not in atuais:
+                self._remove(entry.path)
+
+    @staticmethod
+    def _remove(file):
+        """Apaga um arquivo do cache, se ele não estiver em uso.
+
+        :param file Caminho do arquivo.
+        """
+        try:
+            os.remove(file)
+        except OSError:  # Ainda mapeado na memória (no Windows) ou já apagado.
+            pass
+
+    def _save_manifest(self):
+        """Salva o manifesto, substituindo o anterior de uma só vez. Deve ser chamado com _lock adquirido.
+        """
+        file = os.path.join(self._dir, MANIFESTO)
+        with open(f'{file}.tmp', 'w', encoding='utf-8') as f:
+            json.dump({'chaves': self._manifest, 'arquivos': self._files}, f, indent=2, sort_keys=True)
+        os.replace(f'{file}.tmp', file)
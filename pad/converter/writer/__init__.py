@@ -3,27 +3,119 @@
 Um writer nada mais é do que uma classe que salva um pandas.DataFrame em algum outro formato.
 
 É necessário que ela possua um método write que recebe o data frame e um nome.
+
+Opcionalmente, ela pode possuir um método write_chunks, que recebe um iterável de data frames (os blocos de uma
+tabela processada em modo streaming) e um nome, e escreve os blocos à medida que eles chegam.
+
+Os atributos _format e _processes orientam a escrita concorrente do App (veja o parâmetro writer_workers): _format
+identifica o formato, para o limite de escritas simultâneas de cada formato, e _processes indica que a escrita usa
+principalmente CPU em Python (segurando o GIL) e rende mais em um pool de processos do que em threads. Nesse caso, o
+writer é copiado para o processo com o _logger trocado, então ele não deve guardar outro estado que não possa ser
+copiado.
+
+Tabelas processadas no modo centavos chegam com os valores em int64. Os writers os convertem para reais antes de
+escrever, com pad.converter.parser.decoder.to_reais. Da mesma forma, as colunas em tipos compactos (contas contábeis
+como categorias e, no modo compacto, inteiros anuláveis) são convertidas para os tipos padrão com
+pad.converter.parser.decoder.to_padrao.
 """
 import csv
-from os import path, makedirs
+import json
+import shutil
+import uuid
+from datetime import datetime
+from fnmatch import fnmatchcase
+from os import path, linesep, makedirs, remove, rename, replace, walk
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font
+
+from pad.converter.parser.decoder import concat_chunks, to_reais, to_padrao
+
+CHAVES_NATURAIS = ('numero_empenho', 'conta_contabil', 'data_*')  # Chaves para ordenar as tabelas no parquet (sort_by)
+LINHAS_XLSX = 1048576  # Limite de linhas de uma planilha do Excel, contando a do cabeçalho
+NOME_PLANILHA = 31  # Limite de caracteres do nome de uma planilha do Excel
+DIALETO_CSV = {'sep': ';', 'decimal': ',', 'quoting': csv.QUOTE_NONNUMERIC, 'date_format': '%d-%m-%Y'}  # Formato dos CSV
+COMPRESSAO_CSV = {None: '.csv', 'gzip': '.csv.gz', 'zstd': '.csv.zst'}  # Extensão dos CSV de cada compressão
+MANIFESTO_DATASET = '_manifest.json'  # Manifesto, no diretório de cada tabela do dataset parquet, com os meses gravados
+COLUNAS_PERIODO = ('ano', 'mes')  # Colunas das partições de período do dataset parquet
+
+
+def open_dataset(dirname, name):
+    """Abre o histórico de uma tabela gravada pelo ParquetWriter no modo dataset como um único pyarrow.dataset.Dataset.
+
+    Os arquivos vêm do manifesto da tabela, e não da listagem do diretório, de modo que os arquivos de uma gravação em
+    andamento ou interrompida nunca são lidos. As partições (ano, mes e as de partition_cols) viram colunas do dataset e
+    os filtros sobre elas, como ds.field('ano') == 2023, descartam os outros meses sem abrir os seus arquivos. O schema é
+    a união dos schemas dos meses, para aceitar colunas que mudaram de tipo ou surgiram de um mês para outro.
+
+    :param dirname Diretório do dataset (o dirname do ParquetWriter).
+    :param name Nome da tabela.
+
+    :return pyarrow.dataset.Dataset
+    """
+    root = path.join(dirname, name)
+    with open(path.join(root, MANIFESTO_DATASET), encoding='utf-8') as f:
+        manifest = json.load(f)
+    files = [path.join(root, *file.split('/'))
+             for key in sorted(manifest['periodos']) for file in manifest['periodos'][key]['arquivos']]
+    dataset = ds.dataset(files, format='parquet', partitioning='hive', partition_base_dir=root)
+    schemas = [pq.read_schema(f) for f in files]
+    columns = set().union(*(s.names for s in schemas))
+    schemas.append(pa.schema([f for f in dataset.schema if f.name not in columns]))
+    schema = pa.unify_schemas(schemas, promote_options='permissive')
+    return ds.dataset(files, schema=schema, format='parquet', partitioning='hive', partition_base_dir=root)
+
 
 class CsvWriter:
     """Writer para arquivos CSV.
+
+    Os arquivos seguem o DIALETO_CSV: separador ponto e vírgula, vírgula decimal, datas no formato dia-mês-ano e
+    aspas em tudo o que não for número (os valores decimais, já com a vírgula, também vão entre aspas).
+
+    Com engine='pandas' (padrão), o CSV é montado pelo pandas.DataFrame.to_csv, que formata valor a valor em Python. Com
+    engine='arrow', as colunas são formatadas em lotes de batch_size linhas pelo pyarrow.compute (aspas, vírgula
+    decimal, datas) e as linhas são montadas e gravadas direto dos buffers do Arrow, com o mesmo resultado, byte a
+    byte, do pandas. Os lotes com colunas de outros tipos (como textos misturados com números) são escritos pelo pandas.
+
+    Os arquivos podem ser comprimidos durante a escrita com gzip ou zstd (TABELA.csv.gz ou TABELA.csv.zst).
     """
     _logger = None # Objeto logger
     _dir = '' # Diretório onde os arquivos CSV serão salvos.
+    _format = 'csv' # Formato dos arquivos, para o limite de escritas simultâneas de cada formato
+    _processes = False # Escreve em threads: o pandas monta o CSV em C
+    _engine = 'pandas' # Quem monta o CSV: pandas (to_csv) ou arrow (colunas formatadas em lotes pelo pyarrow)
+    _compression = None # Compressão dos arquivos: None, gzip ou zstd
+    _batch_size = 50000 # Linhas formatadas de cada vez com engine='arrow'
 
-    def __init__(self, logger, dirname: str) -> None:
+    def __init__(self, logger, dirname: str, engine: str = 'pandas', compression: str = None,
+                 batch_size: int = 50000) -> None:
         """Construtor do writer
 
         :param logger: Objeto logger
         :param dirname: Diretório onde os arquivos CSV serão salvos.
+        :param engine: Quem monta o CSV: pandas (to_csv) ou arrow (colunas formatadas em lotes pelo pyarrow).
+        :param compression: Compressão dos arquivos: None, gzip ou zstd.
+        :param batch_size: Linhas formatadas de cada vez com engine='arrow'.
         """
+        if engine not in ('pandas', 'arrow'):
+            raise ValueError(f'O engine {engine} não é suportado. Use pandas ou arrow.')
+        if compression not in COMPRESSAO_CSV:
+            raise ValueError(f'A compressão {compression} não é suportada. Use None, gzip ou zstd.')
         self._logger = logger
         self._dir = dirname
+        self._engine = engine
+        self._compression = compression
+        self._batch_size = batch_size
         # Verifica se o diretório existe, se não, cria ele.
         if not path.exists(dirname):
-            logger.warn(f'{dirname} não existe e será criado...')
+            logger.warning(f'{dirname} não existe e será criado...')
             makedirs(dirname)
 
     def write(self, df, filename):
@@ -32,11 +124,132 @@ class CsvWriter:
         :param df pandas.DataFrame
         :param filename Um nome de arquivo sem a extensão.
         """
-        destination = path.join(self._dir, f'{filename}.csv')
+        df = to_padrao(to_reais(df))
+        destination = self._destination(filename)
         self._logger.debug(f'Escrevendo {len(df)} linhas para {destination} ...')
-        df.to_csv(destination, sep=';', header=True, index=False, decimal=',', encoding='utf-8', quoting=csv.QUOTE_NONNUMERIC, date_format='%d-%m-%Y', errors='replace')
+        if self._engine == 'pandas' and self._compression is None:
+            df.to_csv(destination, header=True, index=False, encoding='utf-8', errors='replace', **DIALETO_CSV)
+        else:
+            with self._open(destination) as f:
+                self._write_frame(f, df, header=True)
         self.write_metadata(df, filename)
 
+    def write_chunks(self, chunks, filename):
+        """Salva os blocos de uma tabela, um após o outro, no mesmo arquivo CSV.
+
+        :param chunks Iterável de pandas.DataFrame
+        :param filename Um nome de arquivo sem a extensão.
+        """
+        destination = self._destination(filename)
+        self._logger.debug(f'Escrevendo blocos para {destination} ...')
+        first = None
+        with self._open(destination) as f:
+            for df in chunks:
+                df = to_padrao(to_reais(df))
+                self._write_frame(f, df, header=first is None)
+                if first is None:
+                    first = df
+        self.write_metadata(first, filename)
+
+    def _destination(self, filename):
+        """Monta o caminho do arquivo de uma tabela, com a extensão da compressão, e apaga o que a tabela teve em uma
+        execução anterior com outra compressão, para que os leitores não encontrem os dois.
+
+        :param filename Um nome de arquivo sem a extensão.
+
+        :return str
+        """
+        for compression, extension in COMPRESSAO_CSV.items():
+            file = path.join(self._dir, f'{filename}{extension}')
+            if compression != self._compression and path.exists(file):
+                remove(file)
+        return path.join(self._dir, f'{filename}{COMPRESSAO_CSV[self._compression]}')
+
+    def _open(self, destination):
+        """Abre o arquivo de destino para escrita binária, comprimindo o que for escrito, se for o caso.
+
+        :param destination Caminho do arquivo.
+
+        :return Arquivo binário aberto.
+        """
+        if self._compression is None:
+            return open(destination, 'wb')
+        return pa.CompressedOutputStream(destination, self._compression)
+
+    def _write_frame(self, f, df, header):
+        """Escreve as linhas de um pandas.DataFrame em um arquivo binário, pelo engine do writer.
+
+        :param f Arquivo binário aberto.
+        :param df pandas.DataFrame
+        :param header Se escreve também a linha do cabeçalho.
+        """
+        if self._engine == 'pandas' or len(df.columns) == 0:
+            df.to_csv(f, mode='wb', header=header, index=False, encoding='utf-8', errors='replace', **DIALETO_CSV)
+            return
+        if header:
+            df.iloc[:0].to_csv(f, mode='wb', header=True, index=False, encoding='utf-8', **DIALETO_CSV)
+        for start in range(0, len(df), self._batch_size):
+            batch = df.iloc[start:start + self._batch_size]
+            try:
+                lines = self._lines(batch)
+            except (TypeError, UnicodeError, pa.ArrowException) as e:
+                self._logger.debug(f'Lote escrito pelo pandas: {e}')
+                batch.to_csv(f, mode='wb', header=False, index=False, encoding='utf-8', errors='replace', **DIALETO_CSV)
+                continue
+            f.write(lines)
+
+    def _lines(self, df):
+        """Monta as linhas do CSV de um lote, formatando coluna a coluna no pyarrow.
+
+        :param df pandas.DataFrame
+
+        :return pyarrow.Buffer com as linhas, já codificadas em UTF-8.
+        """
+        columns = [self._format_column(df[c]) for c in df.columns]
+        lines = pc.binary_join_element_wise(*columns, DIALETO_CSV['sep'])
+        lines = pc.binary_join_element_wise(lines, linesep, '')
+        # As linhas ficam uma depois da outra no buffer de dados do array, na ordem, sem separação.
+        offsets = np.frombuffer(lines.buffers()[1], dtype=np.int32)[lines.offset:lines.offset + len(lines) + 1]
+        return lines.buffers()[2].slice(int(offsets[0]), int(offsets[-1] - offsets[0]))
+
+    @staticmethod
+    def _format_column(values):
+        """Formata uma coluna como o pandas.DataFrame.to_csv a formataria no DIALETO_CSV.
+
+        Textos e datas vão entre aspas, com as aspas internas dobradas. Decimais são escritos como o str do Python,
+        com vírgula no lugar do ponto, e também vão entre aspas. Inteiros e booleanos vão sem aspas. Valores ausentes
+        viram "".
+
+        :param values pandas.Series
+
+        :return pyarrow.Array de textos.
+
+        :raise TypeError Se a coluna tiver um tipo que não é formatado aqui.
+        """
+        if isinstance(values.dtype, pd.api.extensions.ExtensionDtype):
+            raise TypeError(f'Tipo {values.dtype} da coluna {values.name} não suportado.')
+        kind = values.dtype.kind
+        array = values.to_numpy()
+        if kind in 'iu':
+            return pc.cast(pa.array(array), pa.string())
+        if kind == 'b':
+            return pa.array(np.where(array, 'True', 'False'))
+        if kind == 'f':
+            text = pa.array(array.astype(str), mask=np.isnan(array))
+            text = pc.replace_substring(text, '.', DIALETO_CSV['decimal'], max_replacements=1)
+        elif kind == 'M':
+            text = pc.strftime(pa.array(array), format=DIALETO_CSV['date_format'])
+        elif kind == 'O':
+            text = pa.array(array, from_pandas=True)
+            if pa.types.is_null(text.type):
+                text = text.cast(pa.string())
+            if not pa.types.is_string(text.type):
+                raise TypeError(f'A coluna {values.name} tem valores que não são textos.')
+            text = pc.replace_substring(text, '"', '""')
+        else:
+            raise TypeError(f'Tipo {values.dtype} da coluna {values.name} não suportado.')
+        return pc.binary_join_element_wise('', text, '', '"').fill_null('""')
+
     def write_metadata(self, df, filename):
         """Salva metadados
 
@@ -45,8 +258,7 @@ class CsvWriter:
         """
 
         metadata_dir = path.join(self._dir, 'metadata')
-        if not path.exists(metadata_dir):
-            makedirs(metadata_dir)
+        makedirs(metadata_dir, exist_ok=True)  # Outra tabela pode estar criando o diretório ao mesmo tempo.
         destination = path.join(metadata_dir, f'{filename}.txt')
         self._logger.debug(f'Escrevendo meta dados de {filename} para {destination} ...')
         with open(destination, 'w') as f:
@@ -60,6 +272,8 @@ class PickleWriter:
     """
     _logger = None # Objeto logger
     _dir = '' # Diretório onde os arquivos pickle serão salvos.
+    _format = 'pickle' # Formato dos arquivos, para o limite de escritas simultâneas de cada formato
+    _processes = False # Escreve em threads: a serialização é feita em C
 
     def __init__(self, logger, dirname: str) -> None:
         """Construtor do writer
@@ -71,7 +285,7 @@ class PickleWriter:
         self._dir = dirname
         # Verifica se o diretório existe, se não, cria ele.
         if not path.exists(dirname):
-            logger.warn(f'{dirname} não existe e será criado...')
+            logger.warning(f'{dirname} não existe e será criado...')
             makedirs(dirname)
 
     def write(self, df, filename):
@@ -80,11 +294,24 @@ class PickleWriter:
         :param df pandas.DataFrame
         :param filename Um nome de arquivo sem a extensão.
         """
+        df = to_padrao(to_reais(df))
         destination = path.join(self._dir, f'{filename}.pickle')
         self._logger.debug(f'Escrevendo {len(df)} linhas para {destination} ...')
         df.to_pickle(destination)
         self.write_metadata(df, filename)
 
+    def write_chunks(self, chunks, filename):
+        """Salva os blocos de uma tabela em um arquivo pickle.
+
+        Esta escrita não tem a memória limitada pelo bloco: um pickle guarda um único objeto, então todos os blocos são
+        juntados na memória em um único pandas.DataFrame (com concat_chunks, que descarta os blocos vazios) antes de
+        salvar, como em write.
+
+        :param chunks Iterável de pandas.DataFrame
+        :param filename Um nome de arquivo sem a extensão.
+        """
+        self.write(concat_chunks(chunks), filename)
+
     def write_metadata(self, df, filename):
         """Salva metadados
 
@@ -93,8 +320,7 @@ class PickleWriter:
         """
 
         metadata_dir = path.join(self._dir, 'metadata')
-        if not path.exists(metadata_dir):
-            makedirs(metadata_dir)
+        makedirs(metadata_dir, exist_ok=True)  # Outra tabela pode estar criando o diretório ao mesmo tempo.
         destination = path.join(metadata_dir, f'{filename}.txt')
         self._logger.debug(f'Escrevendo meta dados de {filename} para {destination} ...')
         with open(destination, 'w') as f:
@@ -104,50 +330,315 @@ class PickleWriter:
 
 class ParquetWriter:
     """Writer para arquivos Parquet.
+
+    Por padrão, cada tabela vira um único arquivo com as opções padrão do pyarrow. As opções permitem escolher a
+    compressão, o tamanho dos row groups e as colunas com dicionário, ordenar as linhas por chaves (como
+    CHAVES_NATURAIS), para que as estatísticas de cada row group descartem a maior parte deles nas consultas por essas
+    chaves, e particionar as tabelas no estilo hive (TABELA/entidade=pm/...), para que os leitores leiam somente as
+    partições de que precisam.
+
+    No modo dataset (com ano e mes), dirname guarda o histórico de todos os meses: cada tabela é um dataset
+    TABELA/ano=2023/mes=12/... e cada execução grava somente a partição do seu mês, substituindo a de uma execução
+    anterior do mesmo mês. A partição é escrita em um diretório oculto ao lado e só então trocada pela anterior, e o
+    manifesto da tabela (MANIFESTO_DATASET), com os arquivos de cada mês, é atualizado de uma só vez no fim. Os leitores
+    abrem o histórico com open_dataset.
     """
     _logger = None # Objeto logger
     _dir = '' # Diretório onde os arquivos parquet serão salvos.
+    _format = 'parquet' # Formato dos arquivos, para o limite de escritas simultâneas de cada formato
+    _processes = False # Escreve em threads: o pyarrow solta o GIL na conversão e na compressão
+    _compression = 'snappy' # Codec de compressão (snappy, zstd, gzip, brotli, lz4 ou none)
+    _compression_level = None # Nível de compressão do codec. Se None, o padrão do codec.
+    _row_group_size = None # Linhas por row group. Se None, o padrão do pyarrow.
+    _dictionary = True # Codificação por dicionário: True (todas as colunas), False ou lista de colunas
+    _sort_by = () # Colunas (ou padrões como data_*) pelas quais as linhas são ordenadas, as que existirem na tabela
+    _partition_cols = () # Colunas das partições hive, as que existirem na tabela
+    _period = None # Tupla (ano, mês) da partição gravada no modo dataset. Se None, grava cada tabela inteira.
 
-    def __init__(self, logger, dirname: str) -> None:
+    def __init__(self, logger, dirname: str, compression: str = 'snappy', compression_level: int = None,
+                 row_group_size: int = None, dictionary=True, sort_by=None, partition_cols=None, ano: int = None,
+                 mes: int = None) -> None:
         """Construtor do writer
 
         :param logger: Objeto logger
         :param dirname: Diretório onde os arquivos parquet serão salvos.
+        :param compression: Codec de compressão (snappy, zstd, gzip, brotli, lz4 ou none).
+        :param compression_level: Nível de compressão do codec. Se None, o padrão do codec.
+        :param row_group_size: Linhas por row group. Se None, o padrão do pyarrow.
+        :param dictionary: Codificação por dicionário: True (todas as colunas), False ou lista de colunas, como as de códigos.
+        :param sort_by: Colunas ou padrões (como CHAVES_NATURAIS) pelas quais as linhas são ordenadas. Se None, mantém a ordem.
+        :param partition_cols: Colunas das partições hive, como ('entidade', 'orgao'). Se None, grava um único arquivo.
+        :param ano: Ano da partição gravada no modo dataset. Com mes, liga o modo dataset.
+        :param mes: Mês da partição gravada no modo dataset. Com ano, liga o modo dataset.
         """
         self._logger = logger
         self._dir = dirname
+        self._compression = compression
+        self._compression_level = compression_level
+        self._row_group_size = row_group_size
+        self._dictionary = dictionary
+        self._sort_by = tuple(sort_by or ())
+        self._partition_cols = tuple(partition_cols or ())
+        if (ano is None) != (mes is None):
+            raise ValueError('O modo dataset precisa do ano e do mês.')
+        if ano is not None:
+            if not 1 <= int(mes) <= 12:
+                raise ValueError(f'O mês {mes} deve estar entre 1 e 12, inclusive.')
+            self._period = (int(ano), int(mes))
         # Verifica se o diretório existe, se não, cria ele.
         if not path.exists(dirname):
-            logger.warn(f'{dirname} não existe e será criado...')
+            logger.warning(f'{dirname} não existe e será criado...')
             makedirs(dirname)
 
     def write(self, df, filename):
-        """Salva um pandas.DataFrame para um arquivo parquet.
+        """Salva um pandas.DataFrame para um arquivo parquet ou, com partições, para um diretório com um arquivo por
+        partição.
 
         :param df pandas.DataFrame
         :param filename Um nome de arquivo sem a extensão.
         """
-        destination = path.join(self._dir, f'{filename}.parquet')
+        if self._period is not None:
+            self._write_period([df], filename)
+            return
+        df = self._sort(to_padrao(to_reais(df)))
+        partitions = self._partitions(df)
+        destination = self._destination(filename, partitions)
         self._logger.debug(f'Escrevendo {len(df)} linhas para {destination} ...')
-        df.to_parquet(destination)
+        if partitions:
+            df.to_parquet(destination, partition_cols=partitions, row_group_size=self._row_group_size, **self._options())
+        else:
+            df.to_parquet(destination, row_group_size=self._row_group_size, **self._options())
+
+    def write_chunks(self, chunks, filename):
+        """Salva os blocos de uma tabela como row groups de um mesmo arquivo parquet ou, com partições, como arquivos
+        de cada partição.
+
+        O schema é definido pelo primeiro bloco. Colunas de texto que vierem vazias nele são gravadas como string,
+        para aceitar os valores dos blocos seguintes. Com sort_by, as linhas são ordenadas dentro de cada bloco, já que
+        a tabela inteira não é carregada.
+
+        :param chunks Iterável de pandas.DataFrame
+        :param filename Um nome de arquivo sem a extensão.
+        """
+        if self._period is not None:
+            self._write_period(chunks, filename)
+        else:
+            self._write_chunks(chunks, lambda partitions: self._destination(filename, partitions))
+
+    def _write_chunks(self, chunks, destination):
+        """Escreve os blocos de uma tabela em um arquivo ou, com partições, em um diretório.
+
+        :param chunks Iterável de pandas.DataFrame
+        :param destination Função que recebe as colunas de partição da tabela e retorna o caminho do arquivo (sem
+        partições) ou do diretório (com partições).
+
+        :return Quantidade de linhas escritas.
+        """
+        writer = None
+        schema = None
+        partitions = None
+        target = None
+        rows = 0
+        try:
+            for n, df in enumerate(chunks):
+                df = self._sort(to_padrao(to_reais(df)))
+                if schema is None:
+                    schema = pa.Schema.from_pandas(df, preserve_index=False)
+                    for i, field in enumerate(schema):
+                        if pa.types.is_null(field.type):
+                            schema = schema.set(i, field.with_type(pa.string()))
+                    partitions = self._partitions(df)
+                    target = destination(partitions)
+                    self._logger.debug(f'Escrevendo blocos para {target} ...')
+                    if not partitions:
+                        writer = pq.ParquetWriter(target, schema, **self._options())
+                table = pa.Table.from_pandas(df, schema=schema, preserve_index=False)
+                if partitions:
+                    pq.write_to_dataset(table, target, partition_cols=partitions,
+                                        basename_template=f'part-{n}-{{i}}.parquet',
+                                        row_group_size=self._row_group_size, **self._options())
+                else:
+                    writer.write_table(table, row_group_size=self._row_group_size)
+                rows += len(df)
+        finally:
+            if writer is not None:
+                writer.close()
+        return rows
+
+    def _write_period(self, chunks, filename):
+        """Grava a partição do mês de uma tabela no dataset, substituindo a de uma execução anterior do mesmo mês.
+
+        A partição é escrita em um diretório oculto (que os leitores do dataset ignoram) ao lado da definitiva. Só
+        depois que todos os blocos foram escritos, a partição anterior é afastada, a nova toma o seu lugar e o
+        manifesto é atualizado. Se a escrita falhar, o diretório oculto é apagado e a partição anterior continua
+        valendo.
+
+        :param chunks Iterável de pandas.DataFrame
+        :param filename Nome da tabela.
+        """
+        ano, mes = self._period
+        root = path.join(self._dir, filename)
+        parent = path.join(root, f'ano={ano}')
+        final = path.join(parent, f'mes={mes}')
+        token = uuid.uuid4().hex
+        staging = path.join(parent, f'.mes={mes}.{token}.tmp')
+        makedirs(staging)
+        try:
+            rows = self._write_chunks(self._check_period(chunks, filename),
+                                      lambda partitions: staging if partitions else path.join(staging, 'part-0.parquet'))
+        except BaseException:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+        old = None
+        if path.isdir(final):
+            old = path.join(parent, f'.mes={mes}.{token}.old')
+            rename(final, old)
+        rename(staging, final)
+        self._update_manifest(root, final, rows)
+        if old is not None:
+            shutil.rmtree(old, ignore_errors=True)
+        self._logger.debug(f'Partição {final} gravada com {rows} linhas.')
+
+    @staticmethod
+    def _check_period(chunks, filename):
+        """Repassa os blocos, recusando as tabelas com colunas que colidem com as partições de período.
+
+        :param chunks Iterável de pandas.DataFrame
+        :param filename Nome da tabela.
+
+        :return Gerador de pandas.DataFrame
+        """
+        for df in chunks:
+            columns = [c for c in COLUNAS_PERIODO if c in df.columns]
+            if columns:
+                raise ValueError(f'A tabela {filename} tem as colunas {columns}, reservadas às partições do dataset.')
+            yield df
+
+    def _update_manifest(self, root, partition, rows):
+        """Registra no manifesto da tabela os arquivos da partição do mês, substituindo o manifesto de uma só vez.
+
+        :param root Diretório da tabela no dataset.
+        :param partition Diretório da partição do mês.
+        :param rows Quantidade de linhas da partição.
+        """
+        ano, mes = self._period
+        file = path.join(root, MANIFESTO_DATASET)
+        manifest = {'periodos': {}}
+        if path.exists(file):
+            with open(file, encoding='utf-8') as f:
+                manifest = json.load(f)
+        files = sorted(path.relpath(path.join(d, f), root).replace(path.sep, '/')
+                       for d, _, names in walk(partition) for f in names if f.endswith('.parquet'))
+        manifest['periodos'][f'{ano:04d}-{mes:02d}'] = {
+            'ano': ano,
+            'mes': mes,
+            'linhas': rows,
+            'arquivos': files,
+            'gravado_em': datetime.now().isoformat(timespec='seconds'),
+        }
+        with open(f'{file}.tmp', 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2, sort_keys=True)
+        replace(f'{file}.tmp', file)
+
+    def _options(self):
+        """Monta as opções de escrita comuns ao pandas.DataFrame.to_parquet e ao pyarrow.
+
+        :return Dicionário
+        """
+        return {'compression': self._compression, 'compression_level': self._compression_level,
+                'use_dictionary': self._dictionary}
+
+    def _sort(self, df):
+        """Ordena as linhas pelas colunas de sort_by que existirem na tabela, mantendo a ordem original nos empates.
+
+        :param df pandas.DataFrame
+
+        :return pandas.DataFrame
+        """
+        keys = []
+        for pattern in self._sort_by:
+            keys += [c for c in df.columns if fnmatchcase(str(c), pattern) and c not in keys]
+        if not keys:
+            return df
+        # Um índice 0..n-1 continua assim, para não virar uma coluna no parquet.
+        return df.sort_values(keys, kind='stable', na_position='last', ignore_index=isinstance(df.index, pd.RangeIndex))
+
+    def _partitions(self, df):
+        """Lista as colunas de partição que existem na tabela.
+
+        As colunas com valores ausentes ficam como colunas comuns, porque a partição desses valores
+        (__HIVE_DEFAULT_PARTITION__) impede a leitura do diretório pelo pandas.read_parquet. No modo streaming, a decisão
+        é tomada pelo primeiro bloco.
+
+        :param df pandas.DataFrame
+
+        :return Lista com os nomes das colunas.
+        """
+        partitions = []
+        for c in self._partition_cols:
+            if c not in df.columns:
+                continue
+            if df[c].isna().any():
+                self._logger.warning(f'A coluna {c} tem valores em branco e não será usada como partição.')
+                continue
+            partitions.append(c)
+        return partitions
+
+    def _destination(self, filename, partitions):
+        """Prepara o destino de uma tabela: o arquivo TABELA.parquet ou, com partições, o diretório TABELA.
+
+        A saída que a tabela teve em uma execução anterior, no outro formato ou com outras partições, é apagada antes,
+        para que os leitores não encontrem as duas.
+
+        :param filename Um nome de arquivo sem a extensão.
+        :param partitions Colunas de partição da tabela.
+
+        :return Caminho do arquivo ou do diretório.
+        """
+        file = path.join(self._dir, f'{filename}.parquet')
+        dirname = path.join(self._dir, filename)
+        if path.isdir(dirname):
+            shutil.rmtree(dirname)
+        if partitions:
+            if path.exists(file):
+                remove(file)
+            return dirname
+        return file
 
 class XlsxWriter:
     """Writer para arquivos Excel xlsx.
+
+    As tabelas com mais linhas do que cabem em uma planilha (LINHAS_XLSX, com o cabeçalho) continuam em planilhas
+    numeradas: TABELA, TABELA_2, TABELA_3...
+
+    No modo streaming, a pasta de trabalho é aberta em modo write-only do openpyxl, que grava as linhas em um arquivo
+    temporário à medida que elas chegam, e as linhas são convertidas em lotes de batch_size, de modo que a memória
+    usada não depende do tamanho da tabela. Os valores entram com o seu tipo (números, datas, textos) e os ausentes
+    ficam em branco.
     """
     _logger = None # Objeto logger
     _dir = '' # Diretório onde os arquivos xlsx serão salvos.
+    _format = 'xlsx' # Formato dos arquivos, para o limite de escritas simultâneas de cada formato
+    _processes = True # Escreve no pool de processos: o openpyxl monta a planilha em Python puro
+    _streaming = False # Se True, escreve em modo write-only, em lotes, com a memória limitada
+    _batch_size = 10000 # Linhas convertidas de cada vez no modo streaming
+    _max_rows = LINHAS_XLSX # Linhas de cada planilha, com a do cabeçalho
 
-    def __init__(self, logger, dirname: str) -> None:
+    def __init__(self, logger, dirname: str, streaming: bool = False, batch_size: int = 10000) -> None:
         """Construtor do writer
 
         :param logger: Objeto logger
         :param dirname: Diretório onde os arquivos xlsx serão salvos.
+        :param streaming: Se True, escreve em modo write-only, em lotes, com a memória limitada.
+        :param batch_size: Linhas convertidas de cada vez no modo streaming.
         """
         self._logger = logger
         self._dir = dirname
+        self._streaming = streaming
+        self._batch_size = batch_size
         # Verifica se o diretório existe, se não, cria ele.
         if not path.exists(dirname):
-            logger.warn(f'{dirname} não existe e será criado...')
+            logger.warning(f'{dirname} não existe e será criado...')
             makedirs(dirname)
 
     def write(self, df, filename):
@@ -156,6 +647,107 @@ class XlsxWriter:
         :param df pandas.DataFrame
         :param filename Um nome de arquivo sem a extensão.
         """
+        df = to_padrao(to_reais(df))
         destination = path.join(self._dir, f'{filename}.xlsx')
         self._logger.debug(f'Escrevendo {len(df)} linhas para {destination} ...')
-        df.to_excel(destination, sheet_name=filename, index=False)
\ No newline at end of file
+        self._write_sheets([df], filename, destination)
+
+    def write_chunks(self, chunks, filename):
+        """Salva os blocos de uma tabela, um abaixo do outro, na mesma planilha xlsx.
+
+        :param chunks Iterável de pandas.DataFrame
+        :param filename Um nome de arquivo sem a extensão.
+        """
+        destination = path.join(self._dir, f'{filename}.xlsx')
+        self._logger.debug(f'Escrevendo blocos para {destination} ...')
+        self._write_sheets((to_padrao(to_reais(df)) for df in chunks), filename, destination)
+
+    def _write_sheets(self, chunks, filename, destination):
+        """Escreve os blocos de uma tabela no arquivo, pelo modo configurado.
+
+        :param chunks Iterável de pandas.DataFrame já nos tipos padrão.
+        :param filename Nome da tabela, usado no nome das planilhas.
+        :param destination Caminho do arquivo xlsx.
+        """
+        if self._streaming:
+            self._write_streaming(chunks, filename, destination)
+            return
+        with pd.ExcelWriter(destination) as writer:
+            for sheet, row, df in self._split(chunks):
+                df.to_excel(writer, sheet_name=self._sheet_name(filename, sheet), index=False, header=row == 0,
+                            startrow=row + (1 if row > 0 else 0))  # Os blocos seguintes ficam abaixo do cabeçalho
+
+    def _write_streaming(self, chunks, filename, destination):
+        """Escreve os blocos de uma tabela em modo write-only, em lotes de _batch_size linhas.
+
+        :param chunks Iterável de pandas.DataFrame já nos tipos padrão.
+        :param filename Nome da tabela, usado no nome das planilhas.
+        :param destination Caminho do arquivo xlsx.
+        """
+        workbook = Workbook(write_only=True)
+        worksheet = None
+        current = None  # Planilha em que as linhas estão sendo escritas
+        for sheet, row, df in self._split(chunks):
+            if sheet != current:
+                worksheet = workbook.create_sheet(self._sheet_name(filename, sheet))
+                header = []
+                for column in df.columns:
+                    cell = WriteOnlyCell(worksheet, value=str(column))
+                    cell.font = Font(bold=True)
+                    header.append(cell)
+                worksheet.append(header)
+                current = sheet
+            for start in range(0, len(df), self._batch_size):
+                for values in self._rows(df.iloc[start:start + self._batch_size]):
+                    worksheet.append(values)
+        workbook.save(destination)
+
+    def _split(self, chunks):
+        """Divide os blocos de uma tabela entre as planilhas, respeitando o limite de linhas de cada uma.
+
+        :param chunks Iterável de pandas.DataFrame
+
+        :return Gerador de (número da planilha, linhas da planilha já escritas, sem o cabeçalho, pandas.DataFrame). Uma
+        tabela sem linhas gera uma única planilha vazia, somente com o cabeçalho.
+        """
+        rows = self._max_rows - 1  # Linhas de dados de cada planilha
+        sheet = 0
+        used = 0
+        first = None
+        for df in chunks:
+            if first is None:
+                first = df
+            start = 0
+            while start < len(df):
+                if used == rows:
+                    sheet += 1
+                    used = 0
+                n = min(rows - used, len(df) - start)
+                yield sheet, used, df.iloc[start:start + n]
+                used += n
+                start += n
+        if first is not None and sheet == 0 and used == 0:
+            yield 0, 0, first
+
+    def _rows(self, df):
+        """Converte um lote de linhas para os valores das células, com o tipo nativo de cada coluna.
+
+        :param df pandas.DataFrame
+
+        :return Iterável de tuplas, uma por linha, com None nos valores ausentes.
+        """
+        columns = [s.astype(object).where(s.notna(), None).tolist() for _, s in df.items()]
+        return zip(*columns)
+
+    def _sheet_name(self, filename, sheet):
+        """Monta o nome de uma planilha da tabela.
+
+        :param filename Nome da tabela.
+        :param sheet Número da planilha, a partir de 0.
+
+        :return str
+        """
+        if sheet == 0:
+            return filename[:NOME_PLANILHA]
+        suffix = f'_{sheet + 1}'
+        return filename[:NOME_PLANILHA - len(suffix)] + suffix
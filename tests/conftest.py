@@ -0,0 +1,206 @@
+"""Fixtures dos testes: txt sintéticos do PAD montados a partir do _spec de cada parser.
+
+Os arquivos seguem o formato dos txt do PAD (cabeçalho, linhas de tamanho fixo e finalizador) e têm somente caracteres
+ASCII, para que sejam lidos da mesma forma com qualquer codificação padrão do sistema. Os empenhos de LIQUIDAC e
+PAGAMENT existem em EMPENHO e as linhas de um mesmo empenho repetem os dados dele, como nos txt de verdade.
+"""
+import logging
+import random
+from os import makedirs, path
+
+import numpy as np
+import pytest
+
+from pad.converter.parser import balrec, baldesp, balver, brecant, brubant, bver_ant, bverenc, bvmovant, credor, \
+    ctadisp, ctaoper, decreto, diario, empenho, liquidac, orgao, pagament, programa, projativ, rdextra, recant, \
+    receita, recurso, rubrica, uniorcam
+
+ANO = 2023  # Ano dos txt sintéticos
+MES = '12'  # Mês dos txt sintéticos, como o App o recebe do main.py
+LINHAS = 40  # Linhas de dados de cada txt
+ENTIDADES = (('pm', '87612826000190'), ('cm', '12292535000162'))  # Diretório e CNPJ de cada entidade
+PALAVRAS = ('PAGAMENTO', 'REFERENTE', 'A', 'NF', 'SERVICOS', 'MATERIAL', 'NA', 'CONSUMO', 'OBRAS', 'DE', 'nan')
+
+# Classes de todos os parsers
+PARSERS = [
+    empenho.Empenho, liquidac.Liquidac, pagament.Pagament, balrec.BalRec, receita.Receita, baldesp.BalDesp,
+    diario.DiarioContabil, balver.BalVer, bverenc.BVerEnc, rdextra.RDExtra, decreto.Decreto, brecant.BRecAnt,
+    recant.RecAnt, brubant.BRubAnt, bver_ant.BVerAnt, bvmovant.BVMovAnt, orgao.Orgao, uniorcam.UniOrcam,
+    programa.Programa, projativ.ProjAtiv, rubrica.Rubrica, recurso.Recurso, credor.Credor, ctadisp.CtaDisp,
+    ctaoper.CtaOper,
+]
+# Campos de EMPENHO que mudam entre as linhas de um mesmo empenho
+CAMPOS_MOVIMENTO = ('data_empenho', 'valor_empenho', 'sinal_valor', 'historico_empenho')
+# Campos que identificam o empenho em EMPENHO, LIQUIDAC e PAGAMENT
+CAMPOS_EMPENHO = ('numero_empenho', 'ano_empenho', 'entidade_empenho', 'empenho')
+
+
+def valor_campo(parser_class, nome, largura, tipo, r):
+    """Sorteia o texto de um campo.
+
+    :param parser_class Classe do parser.
+    :param nome Nome do campo.
+    :param largura Largura do campo.
+    :param tipo int ou str, como no _spec.
+    :param r random.Random
+
+    :return str com no máximo largura caracteres.
+    """
+    if nome in parser_class._money_signs.values():
+        return r.choice('++-')
+    if nome in parser_class._money:
+        if r.random() < 0.1:
+            return r.choice(('', '0' * largura))
+        return str(r.randint(0, 10 ** min(largura - 2, 9))).zfill(largura)
+    if nome.startswith('data') and largura == 8:
+        return f'{r.randint(1, 28):02d}{r.randint(1, 12):02d}{r.choice((ANO, ANO, ANO - 1, ANO - 2))}'
+    if nome.startswith('conta_contabil') or nome.startswith('codigo_receita'):
+        codigo = r.choice('12345678') + ''.join(r.choice('0123456789') for _ in range(r.randint(8, 12)))
+        return codigo.ljust(largura, '0')[:largura]
+    if nome in ('rubrica', 'elemento'):
+        return ''.join(r.choice('0123456789') for _ in range(largura))
+    if nome.startswith('tipo_nivel'):
+        return r.choice('SA')
+    if nome == 'escrituracao':
+        return r.choice('SN')
+    if nome == 'natureza_informacao':
+        return r.choice('PFOC')
+    if nome == 'indicador_superavit_financeiro':
+        return r.choice('FP')
+    if tipo is str:
+        if r.random() < 0.05:
+            return ''
+        return ' '.join(r.choice(PALAVRAS) for _ in range(r.randint(1, 6)))[:largura]
+    if nome.startswith('orgao'):
+        return str(r.choice((1, 2, 5, 12))).zfill(largura)
+    if nome.startswith('fonte_recurso'):
+        return str(r.choice((500, 501, 540, 800, 801))).zfill(largura)
+    return str(r.randint(0, 10 ** min(largura, 6) - 1)).zfill(largura)
+
+
+def monta_linha(parser_class, r, fixos=None):
+    """Monta uma linha de dados a partir do _spec do parser.
+
+    :param parser_class Classe do parser.
+    :param r random.Random
+    :param fixos Dicionário {campo: texto} com os campos que não são sorteados.
+
+    :return str
+    """
+    fixos = fixos or {}
+    linha = [' '] * max(t[2] for t in parser_class._spec)
+    for nome, inicio, fim, tipo in (t[:4] for t in parser_class._spec):
+        largura = fim - inicio + 1
+        texto = fixos[nome] if nome in fixos else valor_campo(parser_class, nome, largura, tipo, r)
+        numero = tipo is int or nome in parser_class._money
+        linha[inicio - 1:fim] = texto.rjust(largura) if numero else texto.ljust(largura)
+    return ''.join(linha)
+
+
+def campos_empenho(numero):
+    """Textos dos campos que identificam um empenho.
+
+    :param numero Tupla (ano, entidade, sequencial) do empenho.
+
+    :return Dicionário {campo: texto}
+    """
+    ano, entidade, sequencial = numero
+    return {'numero_empenho': f'{ano:04d}{entidade:02d}{sequencial:06d}', 'ano_empenho': f'{ano:04d}',
+            'entidade_empenho': f'{entidade:02d}', 'empenho': f'{sequencial:06d}'}
+
+
+def sorteia_numeros(r):
+    """Sorteia os números dos empenhos de uma entidade.
+
+    :param r random.Random
+
+    :return Lista de tuplas (ano, entidade, sequencial), como em campos_empenho.
+    """
+    return [(r.choice((ANO, ANO, ANO - 1, ANO - 2)), r.choice((0, 1)), i + 1) for i in range(LINHAS // 3)]
+
+
+def gera_txt(dirname, cnpj, r, numeros=None):
+    """Gera os txt de todos os parsers de uma entidade.
+
+    :param dirname Diretório dos txt.
+    :param cnpj CNPJ do cabeçalho.
+    :param r random.Random
+    :param numeros Números dos empenhos, de sorteia_numeros. Se None, são sorteados.
+    """
+    makedirs(dirname)
+    numeros = numeros if numeros is not None else sorteia_numeros(r)
+    empenhos = {}  # Linha base de cada empenho
+    for parser_class in PARSERS:
+        linhas = []
+        for _ in range(LINHAS):
+            if parser_class is empenho.Empenho:
+                numero = r.choice(numeros)
+                if numero not in empenhos:
+                    empenhos[numero] = monta_linha(parser_class, r, campos_empenho(numero))
+                base = empenhos[numero]
+                fixos = {t[0]: base[t[1] - 1:t[2]].strip() for t in parser_class._spec if t[0] not in CAMPOS_MOVIMENTO}
+                linhas.append(monta_linha(parser_class, r, fixos))
+            elif parser_class in (liquidac.Liquidac, pagament.Pagament):
+                linhas.append(monta_linha(parser_class, r, campos_empenho(r.choice(numeros))))
+            else:
+                linhas.append(monta_linha(parser_class, r))
+        with open(path.join(dirname, f'{parser_class._file_name}.txt'), 'wb') as f:
+            f.write(f'{cnpj}0101{ANO}3112{ANO}0502{ANO + 1}ENTIDADE TESTE\r\n'.encode('ascii'))
+            for linha in linhas:
+                f.write(f'{linha}\r\n'.encode('ascii'))
+            f.write(f'FINALIZADOR{len(linhas):010d}\r\n'.encode('ascii'))
+
+
+def ausentes_nan(df):
+    """Troca os None das colunas de texto por NaN, que é como eles voltam das categorias. Para os writers, os dois são
+    o mesmo valor ausente.
+
+    :param df pandas.DataFrame
+
+    :return pandas.DataFrame
+    """
+    texto = df.select_dtypes(object)
+    return df.assign(**{c: texto[c].where(texto[c].notna(), np.nan) for c in texto})
+
+
+@pytest.fixture(scope='session')
+def fontes(tmp_path_factory):
+    """Diretórios com os txt sintéticos da prefeitura e da câmara.
+
+    :return Lista de diretórios, como em App.
+    """
+    base = tmp_path_factory.mktemp('pad')
+    r = random.Random(2023)
+    dirs = []
+    for nome, cnpj in ENTIDADES:
+        dirs.append(str(base / nome))
+        gera_txt(dirs[-1], cnpj, r)
+    return dirs
+
+
+@pytest.fixture(scope='session')
+def fontes_golden(tmp_path_factory):
+    """Diretórios com os txt sintéticos da prefeitura e da câmara que geraram as saídas de referência em tests/golden.
+
+    As duas entidades usam os mesmos números de empenho, com dados e valores diferentes, como acontece com os txt de
+    verdade, em que cada entidade numera os seus empenhos.
+
+    :return Lista de diretórios, como em App.
+    """
+    base = tmp_path_factory.mktemp('golden')
+    r = random.Random(2024)
+    numeros = sorteia_numeros(r)
+    dirs = []
+    for nome, cnpj in ENTIDADES:
+        dirs.append(str(base / nome))
+        gera_txt(dirs[-1], cnpj, r, numeros)
+    return dirs
+
+
+@pytest.fixture
+def logger():
+    """Logger dos parsers, writers e do App.
+
+    :return logging.Logger
+    """
+    return logging.getLogger('pad.tests')
@@ -0,0 +1,160 @@
+"""Equivalência das opções do App e dos writers: as tabelas e os arquivos gerados são os mesmos da execução padrão, e a
+execução padrão gera os mesmos arquivos que o código original (as saídas de referência em tests/golden)."""
+import logging
+import os
+from os import path
+
+import pandas as pd
+import pytest
+from openpyxl import load_workbook
+
+from pad.converter import app, writer
+from pad.converter.parser import ParserBase
+from pad.converter.parser.decoder import to_padrao
+
+from conftest import ANO, MES, ausentes_nan
+
+# Saídas de referência: os CSV escritos pelo App e pelo CsvWriter originais (o commit baseline) a partir dos txt de
+# fontes_golden, com cada entidade sozinha (golden/pm e golden/cm) e, nas tabelas em que o código original junta as
+# duas entidades, com as duas (golden/pm+cm).
+GOLDEN = path.join(path.dirname(__file__), 'golden')
+
+
+def executa(dirname, fontes, writers, **options):
+    """Executa o App com o diretório de trabalho em dirname, onde ficam o cache e as saídas.
+
+    :param dirname Diretório de trabalho.
+    :param fontes Diretórios dos txt.
+    :param writers Função que recebe o logger e retorna a lista de writers.
+    :param options Opções para App.
+
+    :return pad.converter.app.App executado.
+    """
+    logger = logging.getLogger('pad.tests')
+    cwd = os.getcwd()
+    os.makedirs(path.join(dirname, 'cache'))
+    os.chdir(dirname)
+    try:
+        executado = app.App(logger, fontes, writers(logger), MES, ANO, **options)
+        executado.run()
+    finally:
+        os.chdir(cwd)
+    return executado
+
+
+def tabelas(dirname):
+    """Lê as tabelas salvas pelo PickleWriter.
+
+    :param dirname Diretório dos pickle.
+
+    :return Dicionário {tabela: pandas.DataFrame}
+    """
+    return {f[:-len('.pickle')]: pd.read_pickle(path.join(dirname, f))
+            for f in os.listdir(dirname) if f.endswith('.pickle')}
+
+
+@pytest.fixture(scope='module')
+def padrao(fontes, tmp_path_factory):
+    """Tabelas da execução com as opções padrão.
+
+    :return Dicionário {tabela: pandas.DataFrame}
+    """
+    dirname = tmp_path_factory.mktemp('padrao')
+    executa(dirname, fontes, lambda logger: [writer.PickleWriter(logger, 'pickle')])
+    return tabelas(dirname / 'pickle')
+
+
+@pytest.mark.parametrize('options', [
+    {'engine': 'numpy'},
+    {'cents': True},
+    {'compact': True, 'chunk_size': 7},
+    {'workers': 2, 'file_workers': 2},
+    {'checkpoint': False, 'cache_format': 'arrow'},
+], ids=lambda options: '-'.join(options))
+def test_opcoes(options, padrao, fontes, tmp_path, monkeypatch):
+    monkeypatch.setattr(ParserBase, '_range_size', 512)  # Divide os txt em faixas quando há file_workers.
+    executa(tmp_path, fontes, lambda logger: [writer.PickleWriter(logger, 'pickle')], **options)
+    resultado = tabelas(tmp_path / 'pickle')
+    assert resultado.keys() == padrao.keys()
+    for nome, esperado in padrao.items():
+        assert len(esperado), nome
+        pd.testing.assert_frame_equal(ausentes_nan(resultado[nome]), ausentes_nan(esperado), obj=nome)
+
+
+@pytest.mark.parametrize('options', [{}, {'checkpoint': False, 'writer_workers': 2}], ids=['checkpoint', 'memoria'])
+def test_libera_tabelas(options, padrao, fontes, tmp_path, monkeypatch):
+    executado = executa(tmp_path, fontes, lambda logger: [writer.PickleWriter(logger, 'pickle')], **options)
+    assert [nome for nome in padrao if executado._store.loaded(nome)] == []
+    assert executado._index is None and executado._dimension is None
+    if executado._checkpoint:  # A tabela liberada volta a ser lida do cache em disco.
+        monkeypatch.chdir(tmp_path)
+        pd.testing.assert_frame_equal(ausentes_nan(to_padrao(executado._store.get('MOVIEMP'))),
+                                      ausentes_nan(padrao['MOVIEMP']))
+
+
+def test_csv_arrow(fontes, tmp_path):
+    executa(tmp_path, fontes, lambda logger: [writer.CsvWriter(logger, 'pandas'),
+                                              writer.CsvWriter(logger, 'arrow', engine='arrow')])
+    arquivos = sorted(f for f in os.listdir(tmp_path / 'pandas') if f.endswith('.csv'))
+    assert arquivos == sorted(f for f in os.listdir(tmp_path / 'arrow') if f.endswith('.csv'))
+    for arquivo in arquivos:
+        assert (tmp_path / 'arrow' / arquivo).read_bytes() == (tmp_path / 'pandas' / arquivo).read_bytes(), arquivo
+
+
+def test_xlsx_streaming(fontes, tmp_path, monkeypatch):
+    monkeypatch.setattr(writer.XlsxWriter, '_max_rows', 30)  # Divide as tabelas em várias planilhas.
+    executa(tmp_path, fontes, lambda logger: [writer.XlsxWriter(logger, 'regular'),
+                                              writer.XlsxWriter(logger, 'streaming', streaming=True, batch_size=7)])
+    arquivos = sorted(os.listdir(tmp_path / 'regular'))
+    assert arquivos == sorted(os.listdir(tmp_path / 'streaming'))
+    for arquivo in arquivos:
+        # Sem read_only, que completaria as linhas até a dimensão declarada, que o modo write-only não grava.
+        esperado = load_workbook(tmp_path / 'regular' / arquivo)
+        resultado = load_workbook(tmp_path / 'streaming' / arquivo)
+        assert resultado.sheetnames == esperado.sheetnames, arquivo
+        for planilha in esperado.sheetnames:
+            assert list(resultado[planilha].values) == list(esperado[planilha].values), f'{arquivo} {planilha}'
+
+
+def linhas(arquivo):
+    """Lê as linhas de um arquivo, sem decodificá-las.
+
+    :param arquivo Caminho do arquivo.
+
+    :return Lista de bytes.
+    """
+    with open(arquivo, 'rb') as f:
+        return f.read().splitlines()
+
+
+def referencia(entidades, arquivo):
+    """Linhas esperadas de um CSV de referência.
+
+    Com várias entidades, as linhas são as de cada entidade sozinha, uma entidade após a outra, como os parsers juntam
+    os txt. Isso vale também para LIQUIDAC, PAGAMENT, RESTOS_PAGAR e MOVIEMP: como as entidades usam os mesmos números
+    de empenho, o código original misturava os empenhos delas, e cada entidade precisa ficar com os seus. As tabelas
+    que o código original calcula com as entidades juntas têm a sua própria referência em golden/pm+cm.
+
+    :param entidades Tupla com os nomes das entidades (diretórios de fontes_golden).
+    :param arquivo Nome do CSV.
+
+    :return Lista de bytes.
+    """
+    juntas = path.join(GOLDEN, '+'.join(entidades), arquivo)
+    if len(entidades) > 1 and path.exists(juntas):
+        return linhas(juntas)
+    esperado = []
+    for entidade in entidades:
+        esperado += linhas(path.join(GOLDEN, entidade, arquivo))[1 if esperado else 0:]  # Um único cabeçalho
+    return esperado
+
+
+@pytest.mark.parametrize('entidades', [('pm',), ('cm',), ('pm', 'cm')], ids='+'.join)
+def test_referencia(entidades, fontes_golden, tmp_path):
+    fontes = [f for f in fontes_golden if path.basename(f) in entidades]
+    executa(tmp_path, fontes, lambda logger: [writer.CsvWriter(logger, 'csv')])
+    arquivos = sorted(os.listdir(path.join(GOLDEN, entidades[0])))
+    assert 'BVER_ENC.csv' in arquivos
+    assert sorted(f for f in os.listdir(tmp_path / 'csv') if f.endswith('.csv')) == arquivos
+    for arquivo in arquivos:
+        assert linhas(tmp_path / 'csv' / arquivo) == referencia(entidades, arquivo), arquivo
@@ -0,0 +1,59 @@
+"""Índice e dimensão dos empenhos: cada entidade (cnpj) tem os seus empenhos, mesmo com números repetidos."""
+import logging
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from pad.converter.empenhos import COLUNAS_EMPENHO, EmpenhoDimension, EmpenhoIndex
+
+PM, CM = '87612826000190', '12292535000162'
+
+
+def tabela(data, valor, linhas):
+    """Monta uma tabela de empenho com as colunas usadas pelo índice.
+
+    :param data Nome da coluna de data.
+    :param valor Nome da coluna de valor.
+    :param linhas Lista de (cnpj, numero_empenho, data, valor).
+
+    :return pandas.DataFrame
+    """
+    return pd.DataFrame(linhas, columns=['cnpj', 'numero_empenho', data, valor])
+
+
+def test_mesmo_numero_em_entidades_diferentes():
+    empenho = tabela('data_empenho', 'valor_empenho', [
+        (PM, '202100000032', datetime(2021, 3, 1), 100.0),
+        (CM, '202100000032', datetime(2021, 5, 1), 40.0),
+        (PM, '202100000032', datetime(2023, 2, 1), -10.0),
+        (CM, '202100000033', datetime(2021, 6, 1), 7.5),
+    ])
+    liquidac = tabela('data_liquidacao', 'valor_liquidacao', [
+        (CM, '202100000032', datetime(2022, 1, 1), 30.0),
+        (PM, '202100000032', datetime(2022, 2, 1), 60.0),
+    ])
+    pagament = tabela('data_pagamento', 'valor_pagamento', [(PM, '202100000032', datetime(2023, 3, 1), 20.0)])
+    indice = EmpenhoIndex(empenho, liquidac, pagament)
+
+    chaves = pd.DataFrame({'cnpj': [PM, CM, CM, PM], 'numero_empenho': ['202100000032'] * 2 + ['202100000033', None]})
+    np.testing.assert_array_equal(indice.sums('EMPENHO', 'valor_empenho', chaves=chaves), [90.0, 40.0, 7.5, 0.0])
+    np.testing.assert_array_equal(indice.sums('LIQUIDAC', 'valor_liquidacao', chaves=chaves), [60.0, 30.0, 0.0, 0.0])
+    np.testing.assert_array_equal(indice.sums('PAGAMENT', 'valor_pagamento', chaves=chaves), [20.0, 0.0, 0.0, 0.0])
+    assert indice.balance('EMPENHO', PM, '202100000032', datetime(2023, 1, 1)) == 100.0
+    assert indice.balance('EMPENHO', CM, '202100000032', datetime(2023, 1, 1)) == 40.0
+    assert indice.movement('LIQUIDAC', CM, '202100000032', datetime(2022, 1, 1), datetime(2023, 1, 1)) == 30.0
+    assert list(indice.rows('EMPENHO', CM, '202100000032')['valor_empenho']) == [40.0]
+    assert indice.rows('PAGAMENT', CM, '202100000032').empty
+
+
+def test_dimensao_com_dados_diferentes(caplog):
+    empenho = pd.DataFrame({c: [1, 1, 1] for c in COLUNAS_EMPENHO})
+    empenho['cnpj'] = [PM, PM, CM]
+    empenho['numero_empenho'] = '202100000032'
+    empenho['credor'] = [10, 20, 30]  # O mesmo empenho da prefeitura com dois credores
+    with caplog.at_level(logging.WARNING):
+        dimensao = EmpenhoDimension(logging.getLogger('pad.tests'), empenho)
+    assert list(dimensao.frame['credor']) == [10, 30]
+    assert list(dimensao.chaves['cnpj']) == [PM, CM]
+    assert f'{PM}/202100000032' in caplog.text
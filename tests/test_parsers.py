@@ -0,0 +1,89 @@
+"""Equivalência das opções de execução dos parsers: cada opção muda como a tabela é lida e guardada, nunca o resultado."""
+import warnings
+from os import path
+
+import pandas as pd
+import pytest
+
+from pad.converter.parser import ParserBase
+from pad.converter.parser import balver, pagament
+from pad.converter.parser.decoder import CENTAVOS, CodeDictionary, ContasManager, concat_chunks, to_padrao, to_reais
+
+from conftest import PARSERS, ausentes_nan
+
+
+def converte(parser_class, fontes, logger, **options):
+    """Converte os txt de um parser, sem o cache em disco.
+
+    :param parser_class Classe do parser.
+    :param fontes Diretórios dos txt.
+    :param logger Objeto logger.
+    :param options Opções para ParserBase.configure().
+
+    :return pandas.DataFrame
+    """
+    return parser_class(logger, fontes).configure(checkpoint=False, **options).parse()
+
+
+@pytest.fixture(params=PARSERS, ids=lambda c: c._file_name)
+def parser_class(request):
+    return request.param
+
+
+def test_motor_numpy(parser_class, fontes, logger):
+    esperado = converte(parser_class, fontes, logger, engine='pandas')
+    pd.testing.assert_frame_equal(converte(parser_class, fontes, logger, engine='numpy'), esperado)
+
+
+def test_centavos(parser_class, fontes, logger):
+    esperado = converte(parser_class, fontes, logger)
+    df = converte(parser_class, fontes, logger, cents=True)
+    if parser_class._cents_support:
+        assert set(df.attrs[CENTAVOS]) == set(parser_class._money) | set(parser_class._money_derived)
+    pd.testing.assert_frame_equal(to_reais(df), esperado)
+
+
+def test_compacto(parser_class, fontes, logger):
+    esperado = to_padrao(converte(parser_class, fontes, logger))  # As contas contábeis são categorias nos dois modos.
+    df = converte(parser_class, fontes, logger, compact=True)
+    pd.testing.assert_frame_equal(ausentes_nan(to_padrao(df)), ausentes_nan(esperado))
+
+
+def test_faixas(parser_class, fontes, logger, monkeypatch):
+    esperado = converte(parser_class, fontes, logger)
+    monkeypatch.setattr(ParserBase, '_range_size', 512)  # Divide até os txt pequenos em faixas.
+    for engine in ('pandas', 'numpy'):
+        parser = parser_class(logger, fontes).configure(checkpoint=False, engine=engine, workers=3)
+        for fonte in fontes:
+            assert len(parser._byte_ranges(path.join(fonte, f'{parser_class._file_name}.txt'))) == 3
+        pd.testing.assert_frame_equal(parser.parse(), esperado)
+
+
+def test_concat_chunks(parser_class, fontes, logger):
+    df = converte(parser_class, fontes, logger, compact=True)
+    ausente = df.iloc[:1].copy()
+    for coluna, tipo in df.dtypes.items():  # Colunas ausentes no bloco, em object, como nos blocos do _prepare
+        if (isinstance(tipo, pd.api.extensions.ExtensionDtype) or tipo.kind == 'f') and df[coluna].iloc[1:].notna().any():
+            ausente[coluna] = pd.Series([None], index=ausente.index, dtype=object)
+    blocos = [df.iloc[:0], ausente, df.iloc[1:]]
+    with warnings.catch_warnings():
+        warnings.simplefilter('error', FutureWarning)
+        junto = concat_chunks(blocos)
+    assert list(junto.dtypes) == list(df.dtypes)
+    assert junto.iloc[1:].reset_index(drop=True).equals(df.iloc[1:].reset_index(drop=True))
+
+
+@pytest.mark.parametrize('compartilhado', ['local', 'processo'])
+def test_contas_compartilhadas(compartilhado, fontes, logger):
+    with ContasManager() as manager:
+        contas = manager.CodeDictionary() if compartilhado == 'processo' else CodeDictionary()
+        colunas = []
+        for parser_class, campos in ((balver.BalVer, ('conta_contabil',)),
+                                     (pagament.Pagament, ('conta_contabil_debito', 'conta_contabil_credito'))):
+            df = converte(parser_class, fontes, logger, contas=contas)
+            colunas += [df[campo] for campo in campos]
+        categorias = contas.contas()
+    for coluna in colunas:
+        assert list(coluna.cat.categories) == categorias[:len(coluna.cat.categories)]
+        codigos = coluna.cat.codes[coluna.notna()]
+        assert [categorias[c] for c in codigos] == list(coluna[coluna.notna()])
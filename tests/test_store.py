@@ -0,0 +1,36 @@
+"""Cache em disco do armazém: as tabelas salvas de novo e o manifesto do modo incremental."""
+import os
+
+import pandas as pd
+
+from pad.converter import store
+from pad.converter.store import TableStore
+
+
+def test_arrow_nao_substitui_arquivo_lido(tmp_path, monkeypatch):
+    lidos = set()  # Arquivos mapeados na memória, que o Windows não deixa substituir
+    read, replace = store.ArrowFormat.read, os.replace
+
+    def mapeia(self, file):
+        lidos.add(os.path.abspath(file))
+        return read(self, file)
+
+    def substitui(src, dst):
+        assert os.path.abspath(dst) not in lidos, dst
+        replace(src, dst)
+
+    monkeypatch.setattr(store.ArrowFormat, 'read', mapeia)
+    monkeypatch.setattr(store.os, 'replace', substitui)
+    armazem = TableStore(str(tmp_path), cache_format='arrow')
+    primeira = pd.DataFrame({'valor': [1.0, 2.0]})
+    store.FORMATOS['arrow'].write(primeira, armazem.file('TABELA'))  # Como os parsers salvam a tabela
+    pd.testing.assert_frame_equal(armazem.get('TABELA'), primeira)
+    segunda = pd.DataFrame({'valor': [3.0]})
+    armazem.put('TABELA', segunda)
+    armazem.record('TABELA', 'chave')
+    pd.testing.assert_frame_equal(armazem.read(armazem.file('TABELA')), segunda)
+
+    seguinte = TableStore(str(tmp_path), cache_format='arrow')  # Próxima execução, no modo incremental
+    assert seguinte.fresh('TABELA', 'chave')
+    pd.testing.assert_frame_equal(seguinte.get('TABELA'), segunda)
+    assert sorted(f for f in os.listdir(tmp_path) if f.endswith('.arrow')) == [os.path.basename(seguinte.file('TABELA'))]